@@ -0,0 +1,36 @@
+# accounts/jobs.py
+#
+# Background handlers for the accounts app (run by the run_jobs worker).
+
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from jobs.queue import register
+
+User = get_user_model()
+
+THUMBNAIL_SIZE = (128, 128)
+
+
+@register("accounts.avatar_thumbnail")
+def avatar_thumbnail(job):
+    user = User.objects.get(pk=job.payload["user_id"])
+    if not user.avatar:
+        return {"skipped": "no avatar"}
+
+    with user.avatar.open("rb") as fh:
+        image = Image.open(fh)
+        image.thumbnail(THUMBNAIL_SIZE)
+        buffer = BytesIO()
+        image.convert("RGBA").save(buffer, format="PNG")
+
+    # Fixed name per user, so re-running the job just overwrites it
+    name = f"avatars/thumbs/{user.pk}.png"
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+    return {"thumbnail": default_storage.url(name)}
@@ -2,6 +2,7 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from jobs.queue import enqueue
 from .serializers import UserAvatarSerializer
 
 class MyProfileView(APIView):
@@ -20,5 +21,13 @@ class MyProfileView(APIView):
             partial=True
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        user = serializer.save()
+        if "avatar" in request.FILES:
+            # thumbnailing happens off the request path
+            enqueue(
+                "accounts.avatar_thumbnail",
+                {"user_id": user.pk},
+                key=f"accounts.avatar_thumbnail:{user.pk}:{user.avatar.name}",
+                created_by=user,
+            )
         return Response(serializer.data)
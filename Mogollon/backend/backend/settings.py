@@ -1,4 +1,5 @@
 # backend/settings.py
+import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     "inventory.apps.InventoryConfig",
     "accounts",
     "rfqs",
+    "jobs",
 ]
 
 MIDDLEWARE = [
@@ -84,6 +86,21 @@ DATABASES = {
     }
 }
 
+# SPLIT_DATABASES=1 moves the inventory ledger (and the movement rollups)
+# into their own SQLite files so their writes stop blocking RFQ and account
+# edits; see inventory/routers.py. Migrate each: `manage.py migrate
+# --database ledger` and `--database analytics`.
+if os.getenv("SPLIT_DATABASES") == "1":
+    DATABASES["ledger"] = {
+        "ENGINE":  "django.db.backends.sqlite3",
+        "NAME":    BASE_DIR / "ledger.sqlite3",
+    }
+    DATABASES["analytics"] = {
+        "ENGINE":  "django.db.backends.sqlite3",
+        "NAME":    BASE_DIR / "analytics.sqlite3",
+    }
+DATABASE_ROUTERS = ["inventory.routers.InventoryRouter"]
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -104,5 +121,26 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Outgoing mail (RFQ dispatch, sent by the run_jobs worker). In development
+# point this at a local SMTP stand-in, e.g. `python -m aiosmtpd -n -l localhost:1025`
+EMAIL_BACKEND       = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST          = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT          = int(os.getenv("EMAIL_PORT", "1025"))
+EMAIL_HOST_USER     = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS       = os.getenv("EMAIL_USE_TLS", "") == "1"
+EMAIL_TIMEOUT       = 30
+DEFAULT_FROM_EMAIL  = os.getenv("DEFAULT_FROM_EMAIL", "rfq@mogollon.local")
+
+# Stock-movement webhook for the ERP (inventory/outbox.py), delivered by
+# `manage.py deliver_inventory_events`. In development point this at the
+# local stand-in: `manage.py run_webhook_standin` -> http://localhost:8089/
+INVENTORY_WEBHOOK_URL    = os.getenv("INVENTORY_WEBHOOK_URL", "")
+INVENTORY_WEBHOOK_SECRET = os.getenv("INVENTORY_WEBHOOK_SECRET", "")
+
+# Columnar ledger snapshot for offline analytics (inventory/snapshot.py),
+# kept current by `manage.py snapshot_ledger`
+INVENTORY_SNAPSHOT_DIR = Path(os.getenv("INVENTORY_SNAPSHOT_DIR", BASE_DIR / "snapshots" / "ledger"))
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
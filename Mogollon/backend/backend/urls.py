@@ -11,5 +11,6 @@ urlpatterns = [
     path("api-auth/", include("rest_framework.urls")),
     path("api/", include("inventory.urls")),
     path('api/profile/', include('accounts.urls')),
+    path("api/jobs/", include("jobs.urls")),
 
 ]
\ No newline at end of file
@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import WarehouseAssignment
+
+
+@admin.register(WarehouseAssignment)
+class WarehouseAssignmentAdmin(admin.ModelAdmin):
+    list_display = ("user", "warehouse")
+    list_filter = ("warehouse",)
@@ -0,0 +1,135 @@
+# inventory/allocation.py
+#
+# Picks source warehouses for a multi-line order. Distances to every
+# candidate warehouse come from one vectorized haversine (after a
+# bounding-box prefilter on the coordinates index), available stock is
+# pulled in one query into a products × warehouses matrix, and a greedy
+# set cover chooses warehouses: most lines filled outright first (fewer
+# shipments), then most quantity, then nearest.
+
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from .models import InventoryRecord, Warehouse
+
+EARTH_RADIUS_KM = 6371.0088
+SCALE = 1000  # quantities have 3 decimal places; the matrix holds exact thousandths
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from (lat, lon) to each point in the arrays."""
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _candidates(latitude, longitude, max_distance_km=None):
+    qs = Warehouse.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    if max_distance_km is not None:
+        # Cheap box on the index first; the exact radius is applied below
+        dlat = max_distance_km / 111.0
+        dlon = max_distance_km / max(111.0 * math.cos(math.radians(latitude)), 1e-6)
+        qs = qs.filter(
+            latitude__range=(latitude - dlat, latitude + dlat),
+            longitude__range=(longitude - dlon, longitude + dlon),
+        )
+    rows = list(qs.order_by("pk").values_list("pk", "name", "latitude", "longitude"))
+    if not rows:
+        return [], [], np.empty(0)
+    ids, names, lats, lons = zip(*rows)
+    distances = haversine_km(latitude, longitude, np.array(lats, dtype=float), np.array(lons, dtype=float))
+    if max_distance_km is not None:
+        keep = distances <= max_distance_km
+        ids = [i for i, k in zip(ids, keep) if k]
+        names = [n for n, k in zip(names, keep) if k]
+        distances = distances[keep]
+    return list(ids), list(names), distances
+
+
+def plan(lines, latitude, longitude, max_distance_km=None):
+    """
+    ``lines``: [{"product_id", "quantity"}] in default UOMs; repeated
+    products are merged. Returns {"shipments": [...], "unfilled": [...],
+    "shipment_count", "total_distance_km"}; shipments are nearest first.
+    """
+    demand = defaultdict(Decimal)
+    for line in lines:
+        demand[line["product_id"]] += Decimal(line["quantity"])
+    product_ids = list(demand)
+    row_of = {p: i for i, p in enumerate(product_ids)}
+
+    warehouse_ids, names, distances = _candidates(latitude, longitude, max_distance_km)
+    col_of = {w: j for j, w in enumerate(warehouse_ids)}
+
+    available = np.zeros((len(product_ids), len(warehouse_ids)), dtype=np.int64)
+    if warehouse_ids:
+        # Only records with something available; subtracted in SQL and read
+        # back as a plain float to skip per-row Decimal conversion
+        stock = (
+            InventoryRecord.objects.filter(
+                product_id__in=product_ids,
+                warehouse_id__in=warehouse_ids,
+                quantity_on_hand__gt=F("quantity_reserved"),
+            )
+            .annotate(free=ExpressionWrapper(F("quantity_on_hand") - F("quantity_reserved"), output_field=FloatField()))
+            .values_list("product_id", "warehouse_id", "free")
+        )
+        rows = np.array(list(stock), dtype=np.float64).reshape(-1, 3)
+        if len(rows):
+            r = np.array([row_of[p] for p in rows[:, 0].astype(np.int64).tolist()])
+            c = np.array([col_of[w] for w in rows[:, 1].astype(np.int64).tolist()])
+            available[r, c] = np.rint(rows[:, 2] * SCALE).astype(np.int64)
+
+    remaining = np.array([int(demand[p] * SCALE) for p in product_ids], dtype=np.int64)
+    allocated = np.zeros_like(available)
+    chosen = np.zeros(len(warehouse_ids), dtype=bool)
+
+    while remaining.any() and not chosen.all():
+        open_lines = remaining > 0
+        take = np.minimum(available, remaining[:, None])
+        full = ((available >= remaining[:, None]) & open_lines[:, None]).sum(axis=0)
+        amount = take.sum(axis=0)
+        full[chosen], amount[chosen] = -1, -1
+        if amount.max() <= 0:
+            break
+        # lexsort: last key is primary
+        best = np.lexsort((distances, -amount, -full))[0]
+        allocated[:, best] = take[:, best]
+        remaining -= take[:, best]
+        chosen[best] = True
+
+    shipments = []
+    for j in sorted(np.flatnonzero(allocated.any(axis=0)), key=lambda j: distances[j]):
+        filled = np.flatnonzero(allocated[:, j])
+        shipments.append({
+            "warehouse_id": warehouse_ids[j],
+            "name":         names[j],
+            "distance_km":  round(float(distances[j]), 2),
+            "lines": [
+                {"product_id": product_ids[i], "quantity": Decimal(int(allocated[i, j])) / SCALE}
+                for i in filled
+            ],
+        })
+    unfilled = [
+        {"product_id": product_ids[i], "quantity": Decimal(int(remaining[i])) / SCALE}
+        for i in np.flatnonzero(remaining)
+    ]
+    return {
+        "shipments":         shipments,
+        "unfilled":          unfilled,
+        "shipment_count":    len(shipments),
+        "total_distance_km": round(sum(s["distance_km"] for s in shipments), 2),
+    }
+
+
+def allocation_lines(result):
+    """Flatten a plan into (product_id, warehouse_id, quantity) line dicts."""
+    return [
+        {"product_id": line["product_id"], "warehouse_id": s["warehouse_id"], "quantity": line["quantity"]}
+        for s in result["shipments"]
+        for line in s["lines"]
+    ]
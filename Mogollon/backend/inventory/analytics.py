@@ -0,0 +1,198 @@
+# inventory/analytics.py
+#
+# Time-bucketed movement rollups. A catch-up job folds ledger rows past a
+# Checkpoint high-water mark into day, week and month buckets; range
+# queries read whole coarse buckets and fill partial edges from days.
+# The checkpoint lives in the rollups' database (routers.ANALYTICS), so a
+# chunk's buckets and its high-water mark commit together.
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Checkpoint, InventoryTransaction, MovementRollup
+from .routers import ANALYTICS
+
+CHECKPOINT = "movement_rollups"
+CHUNK_SIZE = 10000
+# Ledger rows younger than this wait for the next run, so a slow writer
+# holding a lower id can't commit behind the high-water mark
+SETTLE_DELAY = getattr(settings, "INVENTORY_ROLLUP_SETTLE_DELAY", timedelta(seconds=60))
+
+FIELDS     = ["intake_qty", "depletion_qty", "intake_count", "depletion_count"]
+KEY_FIELDS = ["granularity", "bucket_start", "product_id", "warehouse_id", "reason"]
+GROUP_BY   = {"product": "product_id", "warehouse": "warehouse_id", "reason": "reason"}
+
+
+def bucket_start(day, granularity):
+    if granularity == MovementRollup.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == MovementRollup.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def bucket_end(start, granularity):
+    """Last day (inclusive) of the bucket that starts at ``start``."""
+    if granularity == MovementRollup.WEEK:
+        return start + timedelta(days=6)
+    if granularity == MovementRollup.MONTH:
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return start
+
+
+def _ledger_groups(qs):
+    # GROUP BY day, product, warehouse, reason over a slice of the ledger
+    return (
+        qs.annotate(day=TruncDate("created_at"))
+        .values("day", "record__product_id", "record__warehouse_id", "reason")
+        .annotate(
+            intake_qty=Sum("base_quantity", filter=Q(transaction_type="intake")),
+            depletion_qty=Sum("base_quantity", filter=Q(transaction_type="depletion")),
+            intake_count=Count("id", filter=Q(transaction_type="intake")),
+            depletion_count=Count("id", filter=Q(transaction_type="depletion")),
+        )
+        .order_by()
+    )
+
+
+def _fold(groups):
+    """Spread day groups over every granularity: {key tuple: [sums]}."""
+    granularities = [g for g, _ in MovementRollup.GRANULARITIES]
+    sums = defaultdict(lambda: [Decimal(0), Decimal(0), 0, 0])
+    for g in groups:
+        values = (g["intake_qty"] or 0, g["depletion_qty"] or 0, g["intake_count"], g["depletion_count"])
+        for granularity in granularities:
+            key = (
+                granularity,
+                bucket_start(g["day"], granularity),
+                g["record__product_id"],
+                g["record__warehouse_id"],
+                g["reason"] or "",
+            )
+            acc = sums[key]
+            for i, value in enumerate(values):
+                acc[i] += value
+    return sums
+
+
+def _apply(deltas):
+    # Only one catch-up runs at a time (checkpoint row is locked), so a
+    # read-add-upsert can't lose increments
+    if not deltas:
+        return
+    existing = MovementRollup.objects.filter(
+        granularity__in={k[0] for k in deltas},
+        bucket_start__in={k[1] for k in deltas},
+        product_id__in={k[2] for k in deltas},
+        warehouse_id__in={k[3] for k in deltas},
+    ).values_list(*KEY_FIELDS, *FIELDS)
+    for row in existing:
+        acc = deltas.get(row[:5])
+        if acc is not None:
+            for i, value in enumerate(row[5:]):
+                acc[i] += value
+
+    MovementRollup.objects.bulk_create(
+        [MovementRollup(**dict(zip(KEY_FIELDS, key)), **dict(zip(FIELDS, acc))) for key, acc in deltas.items()],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["granularity", "bucket_start", "product", "warehouse", "reason"],
+        update_fields=FIELDS,
+    )
+
+
+def catch_up(chunk_size=CHUNK_SIZE):
+    """Fold ledger rows past the high-water mark into the rollups; returns rows folded."""
+    cutoff = timezone.now() - SETTLE_DELAY
+    Checkpoint.objects.using(ANALYTICS).get_or_create(name=CHECKPOINT)
+    processed = 0
+    while True:
+        with transaction.atomic(using=ANALYTICS):
+            checkpoint = Checkpoint.objects.using(ANALYTICS).select_for_update().get(name=CHECKPOINT)
+            ids = list(
+                InventoryTransaction.objects.filter(pk__gt=checkpoint.position, created_at__lt=cutoff)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not ids:
+                return processed
+            chunk = InventoryTransaction.objects.filter(pk__gt=checkpoint.position, pk__lte=ids[-1])
+            _apply(_fold(_ledger_groups(chunk)))
+            checkpoint.position = ids[-1]
+            checkpoint.save(update_fields=["position", "updated_at"])
+            processed += len(ids)
+
+
+def rebuild(chunk_size=CHUNK_SIZE):
+    with transaction.atomic(using=ANALYTICS):
+        MovementRollup.objects.all().delete()
+        Checkpoint.objects.using(ANALYTICS).update_or_create(name=CHECKPOINT, defaults={"position": 0})
+    return catch_up(chunk_size)
+
+
+def verify():
+    """
+    Compare every rollup bucket with a fresh GROUP BY over the ledger up to
+    the high-water mark. Returns a list of (key, stored, expected) tuples.
+    """
+    position = Checkpoint.objects.using(ANALYTICS).filter(name=CHECKPOINT).values_list("position", flat=True).first() or 0
+    expected = _fold(_ledger_groups(InventoryTransaction.objects.filter(pk__lte=position)))
+    stored = {row[:5]: list(row[5:]) for row in MovementRollup.objects.values_list(*KEY_FIELDS, *FIELDS)}
+
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        want = expected.get(key, [0, 0, 0, 0])
+        have = stored.get(key, [0, 0, 0, 0])
+        if any(Decimal(a) != Decimal(b) for a, b in zip(have, want)):
+            mismatches.append((key, have, want))
+    return mismatches
+
+
+def movement_series(start, end, granularity, filters=None, group_by=()):
+    """
+    Intake/depletion sums over [start, end] (inclusive dates) per
+    ``granularity`` bucket. Buckets wholly inside the range come from their
+    own rollup rows; partial buckets at either edge are filled from day rows.
+    """
+    base = MovementRollup.objects.filter(**(filters or {}))
+    columns = [GROUP_BY[name] for name in group_by]
+
+    first_full = bucket_start(start, granularity)
+    if first_full < start:
+        first_full = bucket_end(first_full, granularity) + timedelta(days=1)
+    last_full = bucket_start(end, granularity)
+    if bucket_end(last_full, granularity) > end:
+        last_full = bucket_start(last_full - timedelta(days=1), granularity)
+
+    days = base.filter(granularity=MovementRollup.DAY, bucket_start__range=(start, end))
+    parts = []
+    if granularity != MovementRollup.DAY and first_full <= last_full:
+        parts.append(base.filter(granularity=granularity, bucket_start__range=(first_full, last_full)))
+        days = days.exclude(bucket_start__range=(first_full, bucket_end(last_full, granularity)))
+    parts.append(days)
+
+    series = defaultdict(lambda: [Decimal(0), Decimal(0), 0, 0])
+    for qs in parts:
+        rows = (
+            qs.values("bucket_start", *columns)
+            .annotate(**{f"sum_{f}": Sum(f) for f in FIELDS})
+            .order_by()
+        )
+        for row in rows:
+            period = bucket_start(row["bucket_start"], granularity)
+            acc = series[(period, *(row[c] for c in columns))]
+            for i, f in enumerate(FIELDS):
+                acc[i] += row[f"sum_{f}"]
+
+    return [
+        {"period": key[0], **dict(zip(columns, key[1:])), **dict(zip(FIELDS, acc))}
+        for key, acc in sorted(series.items(), key=lambda item: tuple(str(k) for k in item[0]))
+    ]
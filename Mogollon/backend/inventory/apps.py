@@ -4,3 +4,27 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from django.contrib.auth import get_user_model
+
+        from . import routers, scan, scoping, uom
+        from .models import InventoryRecord, Product, UnitConversion, Warehouse, WarehouseAssignment
+
+        post_save.connect(uom.invalidate, sender=UnitConversion)
+        post_delete.connect(uom.invalidate, sender=UnitConversion)
+        post_save.connect(scoping.invalidate, sender=WarehouseAssignment)
+        post_delete.connect(scoping.invalidate, sender=WarehouseAssignment)
+
+        # Balances changed outside bulk paths (record edits, reservation holds)
+        post_save.connect(scan.record_saved, sender=InventoryRecord)
+        post_delete.connect(scan.record_saved, sender=InventoryRecord)
+        post_save.connect(scan.product_changed, sender=Product)
+        post_delete.connect(scan.product_changed, sender=Product)
+
+        # Cascades across databases (see routers.py)
+        post_delete.connect(routers.user_deleted, sender=get_user_model())
+        post_delete.connect(routers.product_deleted, sender=Product)
+        post_delete.connect(routers.warehouse_deleted, sender=Warehouse)
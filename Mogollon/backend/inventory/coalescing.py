@@ -0,0 +1,150 @@
+# inventory/coalescing.py
+#
+# Write combining for hot records. Concurrent post_transaction() calls for
+# the same record join a micro-batch: the first caller waits up to WINDOW
+# for company, then applies the whole batch with one compare-and-set
+# UPDATE of the balance and one multi-row ledger INSERT. Movements are
+# judged in arrival order against the running balance, so every caller
+# still gets its own ledger row or its own InsufficientStock /
+# UnitConversionError. Batches form per process; different processes
+# meet at the conditional UPDATE and retry.
+
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from . import costing, lots, outbox, scan, uom
+from .models import InventoryRecord, InventoryTransaction
+from .routers import LEDGER
+from .services import InsufficientStock, post_transaction as post_transaction_locked, receipt
+
+ENABLED   = getattr(settings, "INVENTORY_WRITE_COALESCING", False)
+WINDOW    = getattr(settings, "INVENTORY_COALESCE_WINDOW", 0.002)  # seconds
+MAX_BATCH = getattr(settings, "INVENTORY_COALESCE_MAX_BATCH", 200)
+# Lost compare-and-set races before the batch falls back to a row lock
+OPTIMISTIC_ATTEMPTS = 3
+
+_lock    = threading.Lock()
+_batches = {}  # record_id -> _Batch still accepting movements
+
+
+class _Pending:
+    __slots__ = ("fields", "receipt", "done", "result", "error")
+
+    def __init__(self, fields, receipt):
+        self.fields  = fields
+        self.receipt = receipt
+        self.done   = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.full  = threading.Event()
+
+
+def post_transaction(product_id, warehouse_id, lot_number=None, expires_on=None, **fields):
+    """
+    Drop-in for services.post_transaction that coalesces with concurrent
+    calls for the same record. Inside an outer transaction (e.g. an
+    Idempotency-Key request) the movement must commit with that
+    transaction, so it takes the ordinary locked path instead.
+    """
+    if transaction.get_connection(LEDGER).in_atomic_block:
+        return post_transaction_locked(product_id, warehouse_id, lot_number, expires_on, **fields)
+
+    record_id = _record_id(product_id, warehouse_id)
+    pending = _Pending(fields, receipt(lot_number, expires_on))
+    with _lock:
+        batch = _batches.get(record_id)
+        leader = batch is None
+        if leader:
+            batch = _batches[record_id] = _Batch()
+        batch.items.append(pending)
+        if len(batch.items) >= MAX_BATCH:
+            batch.full.set()
+
+    if leader:
+        batch.full.wait(WINDOW)
+        with _lock:
+            del _batches[record_id]  # later arrivals start the next batch
+        try:
+            _apply(record_id, batch.items)
+        except Exception as exc:
+            for item in batch.items:
+                if not item.done.is_set():
+                    item.error = exc
+                    item.done.set()
+
+    pending.done.wait()
+    if pending.error is not None:
+        raise pending.error
+    return pending.result
+
+
+def _record_id(product_id, warehouse_id):
+    record_id = (
+        InventoryRecord.objects.filter(product_id=product_id, warehouse_id=warehouse_id)
+        .values_list("pk", flat=True).first()
+    )
+    if record_id is None:
+        record, _ = InventoryRecord.objects.get_or_create(product_id=product_id, warehouse_id=warehouse_id)
+        record_id = record.pk
+    return record_id
+
+
+def _judge(record, items):
+    """Run the items against the running balance; returns (balance, [(item, movement)])."""
+    balance = record.quantity_on_hand
+    accepted = []
+    for item in items:
+        item.error = None
+        try:
+            base = uom.to_base(record.product, item.fields["uom"], item.fields["quantity"])
+        except uom.UnitConversionError as exc:
+            item.error = exc
+            continue
+        if item.fields["transaction_type"] == "intake":
+            balance += base
+        elif balance - record.quantity_reserved < base:
+            item.error = InsufficientStock([(record, base, balance - record.quantity_reserved)])
+            continue
+        else:
+            balance -= base
+        accepted.append((item, InventoryTransaction(record=record, base_quantity=base, **item.fields)))
+    return balance, accepted
+
+
+def _apply(record_id, items):
+    for attempt in range(OPTIMISTIC_ATTEMPTS + 1):
+        pessimistic = attempt == OPTIMISTIC_ATTEMPTS
+        with transaction.atomic(using=LEDGER):
+            qs = InventoryRecord.objects.select_related("product")
+            if pessimistic:
+                qs = qs.select_for_update(of=("self",))
+            record = qs.get(pk=record_id)
+            balance, accepted = _judge(record, items)
+            if accepted:
+                # Conditional on the balances we judged against
+                updated = InventoryRecord.objects.filter(
+                    pk=record_id,
+                    quantity_on_hand=record.quantity_on_hand,
+                    quantity_reserved=record.quantity_reserved,
+                ).update(quantity_on_hand=balance)
+                if not updated:
+                    continue  # another process moved it first; judge again
+                # The row is ours until commit after the UPDATE, so lots and cost layers move safely here
+                receipts = [item.receipt for item, _ in accepted]
+                costs = costing.price([m for _, m in accepted], receipts)
+                written = InventoryTransaction.objects.bulk_create([m for _, m in accepted])
+                costing.write(costs)
+                outbox.append(written, lots.apply(written, receipts))
+                for (item, _), txn in zip(accepted, written):
+                    item.result = txn
+                scan.stock_changed([record.product_id])
+        break
+    for item in items:
+        item.done.set()
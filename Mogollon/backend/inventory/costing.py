@@ -0,0 +1,174 @@
+# inventory/costing.py
+#
+# FIFO cost layers under each InventoryRecord. An intake opens a layer at
+# its unit cost (converted to the product's default UOM); a depletion
+# consumes the record's oldest layers and is stamped with the cost it took
+# out. An intake without a unit_cost is valued at the record's latest
+# known cost; a transfer's intake carries the layers its depletion drew,
+# as lots do. Valuation is then a sum over the open layers, which stay
+# few per record however long the ledger grows.
+#
+# Used in two steps around the ledger INSERT, on records the caller holds
+# locked: price() before it (so each row is inserted with its cost) and
+# write() after it (so new layers can point at their intake).
+
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum
+
+from .models import CostLayer, InventoryRecord, Product, Warehouse
+
+CENT = Decimal("0.01")
+COST_QUANTUM = Decimal("0.0001")
+UNIT_QUANTUM = Decimal("0.000001")
+
+
+def _open_layers(record_ids):
+    """{record_id: [CostLayer, ...]} oldest first, read along costlayer_open_idx."""
+    found = {record_id: [] for record_id in record_ids}
+    if record_ids:
+        for layer in CostLayer.objects.filter(record_id__in=record_ids, quantity_remaining__gt=0).order_by("record_id", "pk"):
+            found[layer.record_id].append(layer)
+    return found
+
+
+def _latest_costs(record_ids):
+    """{record_id: unit cost of its newest costed layer} for records that have one."""
+    if not record_ids:
+        return {}
+    newest = (
+        CostLayer.objects.filter(record_id=OuterRef("pk"), unit_cost__isnull=False)
+        .order_by("-pk")
+        .values("unit_cost")[:1]
+    )
+    return {
+        pk: cost
+        for pk, cost in InventoryRecord.objects.filter(pk__in=record_ids)
+        .annotate(cost=Subquery(newest))
+        .values_list("pk", "cost")
+        if cost is not None
+    }
+
+
+def _value(parts):
+    """Total cost of (unit_cost, quantity) parts, or None if any part's cost is unknown."""
+    if any(unit_cost is None for unit_cost, _ in parts):
+        return None
+    return sum((unit_cost * quantity for unit_cost, quantity in parts), Decimal(0)).quantize(COST_QUANTUM)
+
+
+def price(movements, receipts=None):
+    """
+    Cost unsaved ledger rows (base_quantity set, records locked): sets
+    ``cost`` on each and returns the plan to pass to write() once they are
+    saved. ``receipts`` is as for lots.apply(); only {"lots_of": i} matters.
+    """
+    receipts = receipts or [None] * len(movements)
+    layers = _open_layers({m.record_id for m in movements if m.transaction_type == "depletion"})
+    latest = _latest_costs({
+        m.record_id for m, r in zip(movements, receipts)
+        if m.transaction_type == "intake" and m.unit_cost is None and not (r and "lots_of" in r)
+    })
+
+    changed, created, consumed = {}, [], {}
+    for i, (txn, receipt) in enumerate(zip(movements, receipts)):
+        if txn.transaction_type == "depletion":
+            need, parts = txn.base_quantity, []
+            queue = layers[txn.record_id]
+            while need and queue:
+                layer = queue[0]
+                take = min(need, layer.quantity_remaining)
+                layer.quantity_remaining -= take
+                need -= take
+                parts.append((layer.unit_cost, take))
+                if layer.pk:
+                    changed[layer.pk] = layer
+                if not layer.quantity_remaining:
+                    queue.pop(0)
+            if need:
+                parts.append((None, need))  # stock that never had a layer
+            consumed[i] = parts
+            txn.cost = _value(parts)
+            continue
+
+        if receipt and "lots_of" in receipt:
+            parts = consumed[receipt["lots_of"]]
+        elif txn.unit_cost is not None:
+            per_base = txn.unit_cost * txn.quantity / txn.base_quantity if txn.base_quantity else txn.unit_cost
+            parts = [(per_base.quantize(UNIT_QUANTUM), txn.base_quantity)]
+        else:
+            parts = [(latest.get(txn.record_id), txn.base_quantity)]
+        txn.cost = _value(parts)
+        for unit_cost, quantity in parts:
+            if unit_cost is not None:
+                latest[txn.record_id] = unit_cost  # for later uncosted intakes in this batch
+            layer = CostLayer(
+                record_id=txn.record_id,
+                source=txn,
+                unit_cost=unit_cost,
+                quantity_received=quantity,
+                quantity_remaining=quantity,
+            )
+            created.append(layer)
+            if txn.record_id in layers:
+                layers[txn.record_id].append(layer)  # later depletions in this batch may draw on it
+    return changed.values(), created
+
+
+def write(plan):
+    """Save what price() decided, after the ledger rows were inserted."""
+    changed, created = plan
+    CostLayer.objects.bulk_update(changed, ["quantity_remaining"], batch_size=1000)
+    CostLayer.objects.bulk_create(created, batch_size=1000)
+
+
+def valuation(by_product=False, warehouse_id=None, product_id=None, warehouse_ids=None):
+    """
+    Stock value at FIFO cost per warehouse (and product with
+    ``by_product``), summed over open layers, within ``warehouse_ids`` if
+    given. Stock of unknown cost counts in quantity and uncosted_quantity
+    but not in value.
+    """
+    qs = CostLayer.objects.filter(quantity_remaining__gt=0)
+    if warehouse_ids is not None:
+        qs = qs.filter(record__warehouse_id__in=warehouse_ids)
+    if warehouse_id:
+        qs = qs.filter(record__warehouse_id=warehouse_id)
+    if product_id:
+        qs = qs.filter(record__product_id=product_id)
+    keys = ["record__warehouse_id"] + (["record__product_id"] if by_product else [])
+    rows = list(
+        qs.values(*keys)
+        .annotate(
+            quantity=Sum("quantity_remaining"),
+            uncosted_quantity=Sum("quantity_remaining", filter=Q(unit_cost__isnull=True)),
+            value=Sum(
+                F("quantity_remaining") * F("unit_cost"),
+                output_field=DecimalField(max_digits=24, decimal_places=6),
+            ),
+        )
+        .order_by(*keys)
+    )
+
+    warehouses = Warehouse.objects.in_bulk({r["record__warehouse_id"] for r in rows})
+    products = Product.objects.in_bulk({r["record__product_id"] for r in rows}) if by_product else {}
+    out, total = [], Decimal(0)
+    for r in rows:
+        value = Decimal(r["value"] or 0).quantize(CENT)  # SQLite sums come back as floats
+        total += value
+        warehouse = warehouses.get(r["record__warehouse_id"])
+        line = {
+            "warehouse_id":      r["record__warehouse_id"],
+            "warehouse":         warehouse.name if warehouse else None,
+            "quantity":          Decimal(r["quantity"]).quantize(Decimal("0.001")),
+            "uncosted_quantity": Decimal(r["uncosted_quantity"] or 0).quantize(Decimal("0.001")),
+            "value":             value,
+        }
+        if by_product:
+            product = products.get(r["record__product_id"])
+            line.update({
+                "product_id": r["record__product_id"],
+                "sku":        product.sku if product else None,
+            })
+        out.append(line)
+    return {"total_value": total, "rows": out}
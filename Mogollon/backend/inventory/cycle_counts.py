@@ -0,0 +1,238 @@
+# inventory/cycle_counts.py
+#
+# Cycle counts. Opening a session freezes quantity_on_hand for the records
+# in scope together with the ledger high-water mark; counts are uploaded
+# in bulk and variances computed as arrays; approval turns every counted
+# line into one adjustment, in a single transaction, so that
+#
+#     new on hand = counted + net movements posted since the snapshot
+#
+# i.e. stock that moved while the aisle was being counted is not lost.
+# Where the new on hand no longer covers a record's holds, the newest
+# holds are released in the same transaction (older promises stand), so
+# available never goes negative. Quantities are in each product's default
+# UOM.
+
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from . import costing, lots, outbox
+from .models import CycleCount, CycleCountLine, InventoryRecord, InventoryTransaction, Reservation
+from .routers import LEDGER
+from .scan import stock_changed
+from .services import lock_records, lock_records_by_id
+
+SCALE = 1000  # quantities have 3 decimal places; arrays hold exact thousandths
+
+
+class CycleCountError(Exception):
+    pass
+
+
+def _units(values):
+    return np.array([int((Decimal(v) * SCALE).to_integral_value()) for v in values], dtype=np.int64)
+
+
+def _quantity(units):
+    return Decimal(int(units)) / SCALE
+
+
+def _net_since(position, record_ids):
+    """{record_id: net base_quantity of ledger rows past ``position``} in one grouped query."""
+    rows = (
+        InventoryTransaction.objects.filter(pk__gt=position, record_id__in=record_ids)
+        .values("record_id")
+        .annotate(
+            intake=Sum("base_quantity", filter=Q(transaction_type="intake")),
+            depletion=Sum("base_quantity", filter=Q(transaction_type="depletion")),
+        )
+        .order_by()
+    )
+    return {r["record_id"]: (r["intake"] or 0) - (r["depletion"] or 0) for r in rows}
+
+
+def _lock_open(session_id):
+    session = CycleCount.objects.select_for_update().get(pk=session_id)
+    if session.status != CycleCount.OPEN:
+        raise CycleCountError(f"Cycle count is {session.status}.")
+    return session
+
+
+def open_session(warehouse, product_ids=None, created_by=None, notes=None):
+    """
+    Snapshot every record of ``warehouse`` (or only ``product_ids``, which
+    get records if they have none). Records are locked while the balances
+    and the ledger position are read, so the two agree.
+    """
+    with transaction.atomic(using=LEDGER):
+        if product_ids:
+            records = lock_records((p, warehouse.pk) for p in product_ids).values()
+        else:
+            ids = InventoryRecord.objects.filter(warehouse=warehouse).values_list("pk", flat=True)
+            records = lock_records_by_id(ids).values()
+        position = InventoryTransaction.objects.aggregate(m=Max("pk"))["m"] or 0
+        session = CycleCount.objects.create(
+            warehouse=warehouse,
+            notes=notes,
+            snapshot_position=position,
+            created_by=created_by,
+        )
+        CycleCountLine.objects.bulk_create(
+            [CycleCountLine(session=session, record=r, snapshot_qty=r.quantity_on_hand) for r in records],
+            batch_size=1000,
+        )
+    return session
+
+
+def submit_counts(session_id, counts):
+    """
+    Record counted quantities, ``counts`` being {product_id: quantity};
+    a later submission for the same product overwrites the earlier one.
+    Products outside the snapshot get a line whose snapshot is rebuilt from
+    the ledger. Returns the number of lines updated.
+    """
+    with transaction.atomic(using=LEDGER):
+        session = _lock_open(session_id)
+        lines = {
+            product_id: (pk, snapshot)
+            for pk, product_id, snapshot in session.lines.values_list("pk", "record__product_id", "snapshot_qty")
+        }
+
+        missing = [p for p in counts if p not in lines]
+        if missing:
+            records = lock_records((p, session.warehouse_id) for p in missing).values()
+            net = _net_since(session.snapshot_position, [r.pk for r in records])
+            added = CycleCountLine.objects.bulk_create([
+                CycleCountLine(
+                    session=session,
+                    record=r,
+                    snapshot_qty=r.quantity_on_hand - net.get(r.pk, 0),
+                )
+                for r in records
+            ])
+            for line in added:
+                lines[line.record.product_id] = (line.pk, line.snapshot_qty)
+
+        product_ids = list(counts)
+        snapshot = _units(lines[p][1] for p in product_ids)
+        counted  = _units(counts[p] for p in product_ids)
+        variance = counted - snapshot
+
+        CycleCountLine.objects.bulk_update(
+            [
+                CycleCountLine(pk=lines[p][0], counted_qty=counts[p], variance=_quantity(v))
+                for p, v in zip(product_ids, variance.tolist())
+            ],
+            ["counted_qty", "variance"],
+            batch_size=1000,
+        )
+    return len(product_ids)
+
+
+def _release_uncovered(records, session):
+    """
+    Release the newest active holds on each of ``records`` (locked, new
+    on hand set) until its holds fit its stock. Returns the holds released.
+    """
+    short = {pk: r.quantity_reserved - r.quantity_on_hand for pk, r in records.items() if r.quantity_reserved > r.quantity_on_hand}
+    if not short:
+        return []
+    released = []
+    holds = (
+        Reservation.objects.select_for_update()
+        .filter(record_id__in=short, status=Reservation.ACTIVE)
+        .order_by("record_id", "-created_at", "-pk")
+    )
+    for hold in holds:
+        if short[hold.record_id] <= 0:
+            continue
+        short[hold.record_id] -= hold.quantity
+        records[hold.record_id].quantity_reserved -= hold.quantity
+        hold.status = Reservation.RELEASED
+        hold.notes = "\n".join(filter(None, [hold.notes, f"Released by cycle count #{session.pk}: not enough stock counted."]))
+        released.append(hold)
+    Reservation.objects.bulk_update(released, ["status", "notes"], batch_size=1000)
+    return released
+
+
+def approve(session_id, approved_by=None):
+    """
+    Post one adjustment per counted line whose count disagrees with the
+    book, in one transaction, releasing the holds the new stock can't
+    cover. Uncounted lines are left alone. Returns (adjustment rows
+    written, holds released).
+    """
+    with transaction.atomic(using=LEDGER):
+        session = _lock_open(session_id)
+        rows = list(
+            session.lines.filter(counted_qty__isnull=False)
+            .order_by("record_id")
+            .values_list("pk", "record_id", "counted_qty")
+        )
+        line_ids   = [pk for pk, _, _ in rows]
+        record_ids = [record_id for _, record_id, _ in rows]
+        records = lock_records_by_id(record_ids)
+        net = _net_since(session.snapshot_position, record_ids)
+
+        counted = _units(c for _, _, c in rows)
+        moved   = _units(net.get(r, 0) for r in record_ids)
+        on_hand = _units(records[r].quantity_on_hand for r in record_ids)
+        target  = counted + moved
+        delta   = target - on_hand
+
+        negative = [record_ids[i] for i in np.flatnonzero(target < 0)]
+        if negative:
+            raise CycleCountError(
+                f"Counts for record(s) {negative} are below what left the shelf during the count."
+            )
+
+        reference = f"cycle-count-{session.pk}"
+        adjustments, adjusted_lines = [], []
+        for i in np.flatnonzero(delta).tolist():
+            record = records[record_ids[i]]
+            quantity = _quantity(abs(delta[i]))
+            adjustments.append(InventoryTransaction(
+                record=record,
+                transaction_type="intake" if delta[i] > 0 else "depletion",
+                quantity=quantity,
+                base_quantity=quantity,
+                uom=record.product.default_uom,
+                reason="adjustment",
+                reference=reference,
+                created_by=approved_by,
+            ))
+            adjusted_lines.append(line_ids[i])
+            record.quantity_on_hand = _quantity(target[i])
+
+        released = _release_uncovered(records, session)
+        changed = [records[record_ids[i]] for i in np.flatnonzero(delta).tolist()]
+        changed += [records[pk] for pk in {hold.record_id for hold in released} if records[pk] not in changed]
+        InventoryRecord.objects.bulk_update(changed, ["quantity_on_hand", "quantity_reserved"], batch_size=1000)
+        stock_changed(r.product_id for r in changed)
+        costs = costing.price(adjustments)  # shrinkage is written off at FIFO cost
+        written = InventoryTransaction.objects.bulk_create(adjustments, batch_size=1000)
+        costing.write(costs)
+        outbox.append(written, lots.apply(written))  # shrinkage comes out of the first-expiring lots
+        CycleCountLine.objects.bulk_update(
+            [CycleCountLine(pk=pk, adjustment=txn) for pk, txn in zip(adjusted_lines, written)],
+            ["adjustment"],
+            batch_size=1000,
+        )
+
+        session.status = CycleCount.APPROVED
+        session.approved_by = approved_by
+        session.approved_at = timezone.now()
+        session.save(update_fields=["status", "approved_by", "approved_at"])
+    return written, released
+
+
+def cancel(session_id):
+    with transaction.atomic(using=LEDGER):
+        session = _lock_open(session_id)
+        session.status = CycleCount.CANCELLED
+        session.save(update_fields=["status"])
+    return session
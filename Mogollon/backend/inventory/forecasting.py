@@ -0,0 +1,151 @@
+# inventory/forecasting.py
+#
+# Batch demand forecasting. Depletion history is pulled in one grouped
+# query as (record, day, quantity) columns and every statistic is computed
+# with NumPy over all records at once, then upserted into ReorderSuggestion.
+
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Checkpoint, InventoryRecord, InventoryTransaction, ReorderSuggestion
+from .routers import LEDGER
+
+WINDOW_DAYS    = getattr(settings, "INVENTORY_FORECAST_WINDOW_DAYS", 90)
+LEAD_TIME_DAYS = getattr(settings, "INVENTORY_LEAD_TIME_DAYS", 7)
+SERVICE_Z      = getattr(settings, "INVENTORY_SERVICE_LEVEL_Z", 1.65)  # ~95% cycle service level
+# Depletions that move or correct stock rather than consume it: transfer-out
+# legs and cycle-count / reconciliation corrections
+NON_DEMAND_REASONS = getattr(settings, "INVENTORY_FORECAST_NON_DEMAND_REASONS", ("transfer", "adjustment"))
+# Ledger rows younger than this wait for the next run, so a slow writer
+# holding a lower id can't commit behind the checkpoint (as in analytics)
+SETTLE_DELAY   = getattr(settings, "INVENTORY_FORECAST_SETTLE_DELAY", timedelta(seconds=60))
+
+CHECKPOINT = "forecast_reorder_points"
+BATCH_SIZE = 5000
+
+
+def _daily_depletions(since, records=None):
+    # One query: per-record, per-day demand totals inside the window
+    qs = (
+        InventoryTransaction.objects.filter(transaction_type="depletion", created_at__gte=since)
+        .exclude(reason__in=NON_DEMAND_REASONS)
+    )
+    if records is not None:
+        qs = qs.filter(record_id__in=records)
+    rows = (
+        qs.annotate(day=TruncDate("created_at"))
+        .values("record_id", "day")
+        .annotate(total=Sum("base_quantity"))
+        .order_by()
+        .values_list("record_id", "total")
+    )
+    rows = list(rows)
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    record_ids, totals = zip(*rows)
+    return np.array(record_ids, dtype=np.int64), np.array(totals, dtype=np.float64)
+
+
+def compute(record_ids, on_hand, dep_record_ids, dep_totals,
+            window_days=WINDOW_DAYS, lead_time_days=LEAD_TIME_DAYS, z=SERVICE_Z):
+    """
+    Vectorized statistics for sorted ``record_ids`` with ``on_hand``
+    balances, given one (record, daily total) pair per depletion day.
+    Days without depletions count as zero demand.
+    Returns (rate, std, days_of_cover, reorder_point) arrays; days_of_cover
+    is NaN where there is no demand.
+    """
+    n = len(record_ids)
+    pos = np.searchsorted(record_ids, dep_record_ids)
+    total  = np.bincount(pos, weights=dep_totals,      minlength=n)
+    sq_sum = np.bincount(pos, weights=dep_totals ** 2, minlength=n)
+
+    rate = total / window_days
+    std  = np.sqrt(np.maximum(sq_sum / window_days - rate ** 2, 0.0))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(rate > 0, on_hand / rate, np.nan)
+    reorder_point = rate * lead_time_days + z * std * np.sqrt(lead_time_days)
+    return rate, std, cover, reorder_point
+
+
+def run(incremental=False, window_days=WINDOW_DAYS, lead_time_days=LEAD_TIME_DAYS, z=SERVICE_Z, apply=False):
+    """
+    Recompute reorder suggestions. A full run covers every record; an
+    incremental run only those with ledger rows newer than the last run's
+    high-water mark. The mark only moves past settled rows (older than
+    SETTLE_DELAY). Returns the number of suggestions written.
+    """
+    now = timezone.now()
+    since = now - timedelta(days=window_days)
+    checkpoint, _ = Checkpoint.objects.get_or_create(name=CHECKPOINT)
+    high_water = (
+        InventoryTransaction.objects.filter(pk__gt=checkpoint.position, created_at__lte=now - SETTLE_DELAY)
+        .order_by("-pk")
+        .values_list("pk", flat=True)
+        .first()
+    ) or checkpoint.position
+
+    records = InventoryRecord.objects.all()
+    touched = None
+    if incremental:
+        touched = (
+            InventoryTransaction.objects.filter(pk__gt=checkpoint.position, pk__lte=high_water)
+            .values("record_id").distinct()
+        )
+        records = records.filter(pk__in=touched)
+
+    rows = list(records.order_by("pk").values_list("pk", "quantity_on_hand"))
+    if rows:
+        ids, balances = zip(*rows)
+        record_ids = np.array(ids, dtype=np.int64)
+        on_hand    = np.array(balances, dtype=np.float64)
+        dep_ids, dep_totals = _daily_depletions(since, touched)
+        rate, std, cover, rop = compute(
+            record_ids, on_hand, dep_ids, dep_totals,
+            window_days=window_days, lead_time_days=lead_time_days, z=z,
+        )
+        cover = np.where(np.isnan(cover), None, np.round(cover, 1))
+        suggestions = [
+            ReorderSuggestion(
+                record_id=pk,
+                daily_rate=r,
+                daily_std=sd,
+                days_of_cover=c,
+                suggested_reorder_point=p,
+                computed_at=now,
+            )
+            for pk, r, sd, c, p in zip(
+                record_ids.tolist(),
+                np.round(rate, 4).tolist(),
+                np.round(std, 4).tolist(),
+                cover.tolist(),
+                np.round(rop, 3).tolist(),
+            )
+        ]
+    else:
+        suggestions = []
+
+    with transaction.atomic(using=LEDGER):
+        ReorderSuggestion.objects.bulk_create(
+            suggestions,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["record"],
+            update_fields=["daily_rate", "daily_std", "days_of_cover", "suggested_reorder_point", "computed_at"],
+        )
+        if apply and suggestions:
+            InventoryRecord.objects.filter(reorder_suggestion__computed_at=now).update(
+                reorder_point=Subquery(
+                    ReorderSuggestion.objects.filter(record=OuterRef("pk")).values("suggested_reorder_point")[:1]
+                )
+            )
+        checkpoint.position = high_water
+        checkpoint.save(update_fields=["position", "updated_at"])
+    return len(suggestions)
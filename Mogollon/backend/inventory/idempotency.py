@@ -0,0 +1,107 @@
+# inventory/idempotency.py
+#
+# Idempotency-Key support for stock-changing POSTs. The first successful
+# response for a (user, endpoint, key) is stored in the same DB transaction
+# as the stock movement, so a retried request either replays that response
+# or, if it raced the original, rolls back and replays it; stock is only
+# ever moved once. Cost on the write path is one unique-index lookup.
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .routers import LEDGER
+
+HEADER = "Idempotency-Key"
+TTL    = getattr(settings, "INVENTORY_IDEMPOTENCY_TTL", timedelta(hours=24))
+
+
+def fingerprint(data):
+    """sha256 of the request payload, independent of key order and whitespace."""
+    if hasattr(data, "lists"):  # QueryDict from a form post
+        data = dict(data.lists())
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _replay(stored, request_hash):
+    if stored.request_hash != request_hash:
+        return Response(
+            {"error": f"{HEADER} was already used with a different request body."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(stored.response_body, status=stored.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(endpoint):
+    """
+    Decorator for a viewset action. Requests without the header run as
+    before. Only 2xx responses are stored: a rejected request (validation,
+    insufficient stock) may be retried with the same key once fixed.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key or not request.user.is_authenticated:
+                return view(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response(
+                    {"error": f"{HEADER} must be at most 255 characters."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            scope = {"user": request.user, "endpoint": endpoint, "key": key}
+            request_hash = fingerprint(request.data)
+            stored = IdempotencyKey.objects.filter(**scope).first()
+            if stored is not None:
+                if stored.expires_at > timezone.now():
+                    return _replay(stored, request_hash)
+                stored.delete()  # expired but not yet evicted
+
+            try:
+                with transaction.atomic(using=LEDGER):
+                    response = view(self, request, *args, **kwargs)
+                    if not status.is_success(response.status_code):
+                        return response
+                    IdempotencyKey.objects.create(
+                        **scope,
+                        request_hash=request_hash,
+                        status_code=response.status_code,
+                        response_body=response.data,
+                        expires_at=timezone.now() + TTL,
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key committed first;
+                # our movements were rolled back with the failed insert
+                stored = IdempotencyKey.objects.filter(**scope).first()
+                if stored is None:
+                    raise
+                return _replay(stored, request_hash)
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired(now=None, batch_size=1000):
+    """Delete expired keys batch_size at a time (walks the expiry index). Returns the number deleted."""
+    now = now or timezone.now()
+    purged = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now)
+            .order_by("expires_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,46 @@
+# inventory/jobs.py
+#
+# Background handlers for the inventory app (run by the run_jobs worker).
+
+import csv
+import os
+from pathlib import Path
+
+from django.conf import settings
+
+from jobs.queue import register
+from .models import InventoryRecord
+
+EXPORT_DIR = "exports"
+
+
+@register("inventory.export")
+def export_inventory(job):
+    """Stream inventory records to a CSV under MEDIA_ROOT/exports/."""
+    qs = InventoryRecord.objects.select_related("product", "warehouse").order_by("pk")
+    if job.payload.get("warehouse_id"):
+        qs = qs.filter(warehouse_id=job.payload["warehouse_id"])
+    if job.payload.get("warehouse_ids") is not None:
+        qs = qs.filter(warehouse_id__in=job.payload["warehouse_ids"])  # the requester's scope
+
+    name = f"inventory-{job.pk}.csv"
+    target = Path(settings.MEDIA_ROOT) / EXPORT_DIR / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_suffix(".csv.part")
+
+    rows = 0
+    with open(partial, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow([
+            "record_id", "sku", "product", "warehouse", "uom",
+            "quantity_on_hand", "quantity_reserved", "reorder_point",
+        ])
+        for r in qs.iterator(chunk_size=2000):
+            writer.writerow([
+                r.pk, r.product.sku, r.product.name, r.warehouse.name, r.product.default_uom,
+                r.quantity_on_hand, r.quantity_reserved, r.reorder_point,
+            ])
+            rows += 1
+    # Rename last so a retry never exposes a half-written file
+    os.replace(partial, target)
+    return {"file": f"{settings.MEDIA_URL}{EXPORT_DIR}/{name}", "rows": rows}
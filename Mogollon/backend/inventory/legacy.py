@@ -0,0 +1,250 @@
+# inventory/legacy.py
+#
+# One-off copy of the legacy `api` app tables into inventory. Products are
+# matched by SKU and warehouses by (name, location); legacy Transaction
+# rows are streamed in primary-key order, chunk_size at a time, each chunk
+# in its own short transaction that also advances a Checkpoint, so the
+# copy can stop and resume at any point without duplicating rows. Every
+# migrated ledger row carries a "legacy:" reference and, like any other
+# ledger write, moves lots and cost layers and queues its outbox event in
+# the same transaction. The legacy history may dip below zero, which
+# services.post_movements would refuse, so the hooks are called here.
+
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from api import models as legacy
+
+from . import costing, lots, outbox, scan, uom
+from .models import Checkpoint, InventoryRecord, InventoryTransaction, Product, Warehouse
+from .routers import LEDGER
+from .services import lock_records
+
+CHUNK_SIZE = 1000
+TRANSACTIONS_CHECKPOINT = "legacy_migration.transactions"
+BALANCES_CHECKPOINT     = "legacy_migration.balances"
+REFERENCE = "legacy:"
+QUANTUM   = Decimal("0.001")
+
+# legacy type -> (transaction_type for a positive quantity, reason)
+TYPE_MAP = {
+    "intake":     ("intake",    None),
+    "depletion":  ("depletion", "other"),
+    "adjustment": ("intake",    "adjustment"),
+}
+_opposite = {"intake": "depletion", "depletion": "intake"}
+
+
+def _keyset(qs, position, chunk_size):
+    return list(qs.filter(pk__gt=position).order_by("pk")[:chunk_size])
+
+
+def migrate_products(chunk_size=CHUNK_SIZE):
+    """Create an inventory Product for every legacy SKU that lacks one. Returns the number created."""
+    created, position = 0, 0
+    while True:
+        chunk = _keyset(legacy.Product.objects.values("pk", "name", "sku", "default_uom"), position, chunk_size)
+        if not chunk:
+            return created
+        position = chunk[-1]["pk"]
+        existing = set(Product.objects.filter(sku__in=[p["sku"] for p in chunk]).values_list("sku", flat=True))
+        new = [
+            Product(name=p["name"], sku=p["sku"], default_uom=p["default_uom"])
+            for p in chunk if p["sku"] not in existing
+        ]
+        Product.objects.bulk_create(new, ignore_conflicts=True)
+        created += len(new)
+
+
+def warehouse_map():
+    """{legacy warehouse id: inventory warehouse id}, creating missing warehouses."""
+    current = {(w.name, w.location): w.pk for w in Warehouse.objects.all()}
+    mapping = {}
+    for w in legacy.Warehouse.objects.order_by("pk"):
+        if (w.name, w.location) not in current:
+            current[(w.name, w.location)] = Warehouse.objects.create(name=w.name, location=w.location).pk
+        mapping[w.pk] = current[(w.name, w.location)]
+    return mapping
+
+
+def _product_ids(skus):
+    return dict(Product.objects.filter(sku__in=set(skus)).values_list("sku", "pk"))
+
+
+def _lock_checkpoint(name):
+    # Held for the chunk's transaction, so two runs can't copy the same rows
+    Checkpoint.objects.get_or_create(name=name)
+    return Checkpoint.objects.select_for_update().get(name=name)
+
+
+def migrate_transactions(warehouses, chunk_size=CHUNK_SIZE, pause=0.0, progress=None):
+    """
+    Copy legacy Transaction rows past the checkpoint into the ledger and
+    move the target balances by the same amounts. Raises
+    uom.UnitConversionError on a unit with no conversion; add it and rerun.
+    Returns the number of rows copied.
+    """
+    copied = 0
+    rows_qs = legacy.Transaction.objects.values(
+        "pk", "inventory__product__sku", "inventory__warehouse_id",
+        "quantity", "uom", "type", "source", "created_by_id", "created_at",
+    )
+    while True:
+        with transaction.atomic(using=LEDGER):
+            checkpoint = _lock_checkpoint(TRANSACTIONS_CHECKPOINT)
+            chunk = _keyset(rows_qs, checkpoint.position, chunk_size)
+            if not chunk:
+                return copied
+            products = _product_ids(r["inventory__product__sku"] for r in chunk)
+            keys = [(products[r["inventory__product__sku"]], warehouses[r["inventory__warehouse_id"]]) for r in chunk]
+            records = lock_records(keys)
+
+            movements, deltas = [], defaultdict(Decimal)
+            for key, r in zip(keys, chunk):
+                record = records[key]
+                transaction_type, reason = TYPE_MAP[r["type"]]
+                if r["quantity"] < 0:
+                    transaction_type = _opposite[transaction_type]
+                quantity = Decimal(abs(r["quantity"]))
+                base = uom.to_base(record.product, r["uom"], quantity)
+                deltas[record.pk] += base if transaction_type == "intake" else -base
+                movements.append(InventoryTransaction(
+                    record=record,
+                    transaction_type=transaction_type,
+                    quantity=quantity,
+                    uom=r["uom"],
+                    base_quantity=base,
+                    reason=reason,
+                    reference=f"{REFERENCE}{r['source']}"[:200],
+                    notes=f"Migrated from legacy transaction #{r['pk']}",
+                    created_by_id=r["created_by_id"],
+                ))
+            costs = costing.price(movements)  # no costs in legacy data: layers of unknown cost
+            written = InventoryTransaction.objects.bulk_create(movements)
+            costing.write(costs)
+            # auto_now_add stamped "now" on insert; restore the original times
+            for txn, r in zip(written, chunk):
+                txn.created_at = r["created_at"]
+            InventoryTransaction.objects.bulk_update(written, ["created_at"])
+            outbox.append(written, lots.apply(written))
+
+            for record in records.values():
+                record.quantity_on_hand += deltas[record.pk]
+            InventoryRecord.objects.bulk_update(records.values(), ["quantity_on_hand"])
+            scan.stock_changed(r.product_id for r in records.values())
+
+            checkpoint.position = chunk[-1]["pk"]
+            checkpoint.save(update_fields=["position", "updated_at"])
+        copied += len(chunk)
+        if progress:
+            progress(copied)
+        if pause:
+            time.sleep(pause)  # let live writers at the locked records through
+
+
+def _legacy_net(record_ids):
+    """{record_id: net base_quantity of migrated (legacy-tagged) rows}."""
+    rows = (
+        InventoryTransaction.objects.filter(record_id__in=record_ids)
+        .filter(reference__startswith=REFERENCE)
+        .values("record_id")
+        .annotate(
+            intake=Sum("base_quantity", filter=Q(transaction_type="intake")),
+            depletion=Sum("base_quantity", filter=Q(transaction_type="depletion")),
+        )
+        .order_by()
+    )
+    return {
+        r["record_id"]: (Decimal(r["intake"] or 0) - Decimal(r["depletion"] or 0)).quantize(QUANTUM)
+        for r in rows
+    }
+
+
+_inventory_qs = legacy.Inventory.objects.values(
+    "pk", "product__sku", "warehouse_id", "quantity_on_hand", "reorder_point",
+)
+
+
+def _with_keys(chunk, warehouses):
+    products = _product_ids(r["product__sku"] for r in chunk)
+    return [((products[r["product__sku"]], warehouses[r["warehouse_id"]]), r) for r in chunk]
+
+
+def migrate_balances(warehouses, chunk_size=CHUNK_SIZE, pause=0.0):
+    """
+    Once the ledger is copied, make each migrated balance equal the legacy
+    quantity_on_hand (the legacy ledger may not explain all of it) with a
+    "legacy:opening" adjustment, and carry reorder points over where unset.
+    Returns the number of adjustments written.
+    """
+    adjusted = 0
+    while True:
+        with transaction.atomic(using=LEDGER):
+            checkpoint = _lock_checkpoint(BALANCES_CHECKPOINT)
+            chunk = _keyset(_inventory_qs, checkpoint.position, chunk_size)
+            if not chunk:
+                return adjusted
+            chunk = _with_keys(chunk, warehouses)
+            records = lock_records(key for key, _ in chunk)
+            net = _legacy_net([r.pk for r in records.values()])
+            adjustments, changed = [], []
+            for key, row in chunk:
+                record = records[key]
+                difference = Decimal(row["quantity_on_hand"]) - net.get(record.pk, 0)
+                if difference:
+                    adjustments.append(InventoryTransaction(
+                        record=record,
+                        transaction_type="intake" if difference > 0 else "depletion",
+                        quantity=abs(difference),
+                        base_quantity=abs(difference),
+                        uom=record.product.default_uom,
+                        reason="adjustment",
+                        reference=f"{REFERENCE}opening",
+                        notes=f"Legacy balance not explained by its ledger (legacy inventory #{row['pk']})",
+                    ))
+                    record.quantity_on_hand += difference
+                if not record.reorder_point and row["reorder_point"]:
+                    record.reorder_point = row["reorder_point"]
+                changed.append(record)
+            costs = costing.price(adjustments)
+            written = InventoryTransaction.objects.bulk_create(adjustments)
+            costing.write(costs)
+            outbox.append(written, lots.apply(written))
+            InventoryRecord.objects.bulk_update(changed, ["quantity_on_hand", "reorder_point"])
+            scan.stock_changed(r.product_id for r in changed)
+
+            checkpoint.position = chunk[-1][1]["pk"]
+            checkpoint.save(update_fields=["position", "updated_at"])
+        adjusted += len(adjustments)
+        if pause:
+            time.sleep(pause)
+
+
+def verify(warehouses, chunk_size=CHUNK_SIZE):
+    """
+    Read-only check, per legacy inventory row: the migrated ledger nets to
+    the legacy quantity_on_hand. Returns [(legacy id, record id, legacy qty, migrated net)].
+    """
+    mismatches, position = [], 0
+    while True:
+        chunk = _keyset(_inventory_qs, position, chunk_size)
+        if not chunk:
+            return mismatches
+        position = chunk[-1]["pk"]
+        chunk = _with_keys(chunk, warehouses)
+        ids = dict(
+            ((p, w), pk) for pk, p, w in InventoryRecord.objects.filter(
+                product_id__in={p for (p, _), _ in chunk},
+                warehouse_id__in={w for (_, w), _ in chunk},
+            ).values_list("pk", "product_id", "warehouse_id")
+        )
+        net = _legacy_net([pk for pk in ids.values()])
+        for key, row in chunk:
+            record_id = ids.get(key)
+            migrated = net.get(record_id, Decimal(0))
+            if Decimal(row["quantity_on_hand"]) != migrated:
+                mismatches.append((row["pk"], record_id, row["quantity_on_hand"], migrated))
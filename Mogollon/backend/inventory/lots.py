@@ -0,0 +1,137 @@
+# inventory/lots.py
+#
+# Lot (batch) tracking under each InventoryRecord. An intake may name a
+# lot, which it fills; a depletion consumes the record's lots first
+# expiring first out (lots without an expiry last), then any stock that
+# was received without a lot. Every lot touched by a ledger row gets a
+# LotMovement, so a lot can be traced to the orders it went out on.
+#
+# apply() runs inside post_movements(), on records the caller already
+# holds locked, so lots change in the same transaction as the aggregate
+# quantity_on_hand they are part of.
+
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Lot, LotMovement
+
+
+def _fefo_key(lot):
+    return (lot.expires_on is None, lot.expires_on, lot.pk)
+
+
+def _lots_with_stock(record_ids):
+    """{record_id: {lot_pk: Lot}} for lots with stock left, read along lot_fefo_idx."""
+    found = {record_id: {} for record_id in record_ids}
+    if record_ids:
+        qs = (
+            Lot.objects.filter(record_id__in=record_ids, quantity_on_hand__gt=0)
+            .order_by("record_id", F("expires_on").asc(nulls_last=True), "pk")
+        )
+        for lot in qs:
+            found[lot.record_id][lot.pk] = lot
+    return found
+
+
+def _receiving_lots(keys):
+    """{(record_id, lot_number): Lot} for the given keys, creating missing lots."""
+    keys = {key: expires_on for key, expires_on in keys}
+    if not keys:
+        return {}
+    existing = {
+        (lot.record_id, lot.lot_number): lot
+        for lot in Lot.objects.filter(
+            record_id__in={r for r, _ in keys}, lot_number__in={n for _, n in keys}
+        )
+    }
+    missing = [key for key in keys if key not in existing]
+    if missing:
+        Lot.objects.bulk_create(
+            [Lot(record_id=r, lot_number=n, expires_on=keys[(r, n)]) for r, n in missing],
+            ignore_conflicts=True,
+        )
+        existing.update(
+            ((lot.record_id, lot.lot_number), lot)
+            for lot in Lot.objects.filter(
+                record_id__in={r for r, _ in missing}, lot_number__in={n for _, n in missing}
+            )
+        )
+    return {key: existing[key] for key in keys}
+
+
+def apply(movements, receipts=None):
+    """
+    Move lot quantities for saved ledger rows (base_quantity set, records
+    locked). ``receipts`` lines up with ``movements``; an intake's entry is
+    None (no lot), {"lot_number", "expires_on"}, or {"lots_of": i} to
+    receive exactly the lots consumed by depletion movements[i] (used by
+    transfers). Returns the LotMovement rows written.
+    """
+    receipts = receipts or [None] * len(movements)
+    depleted = _lots_with_stock({m.record_id for m in movements if m.transaction_type == "depletion"})
+    named = _receiving_lots(
+        ((m.record_id, r["lot_number"]), r.get("expires_on"))
+        for m, r in zip(movements, receipts)
+        if m.transaction_type == "intake" and r and r.get("lot_number")
+    )
+
+    changed, lot_movements, consumed = {}, [], {}
+    for i, (txn, receipt) in enumerate(zip(movements, receipts)):
+        if txn.transaction_type == "depletion":
+            need, taken = txn.base_quantity, []
+            available = depleted[txn.record_id]
+            for lot in sorted(available.values(), key=_fefo_key):
+                if not need:
+                    break
+                take = min(need, lot.quantity_on_hand)
+                lot.quantity_on_hand -= take
+                need -= take
+                taken.append((lot, take))
+                if not lot.quantity_on_hand:
+                    del available[lot.pk]
+            consumed[i] = taken
+            parts = taken
+        elif not receipt:
+            continue
+        elif "lots_of" in receipt:
+            source = consumed[receipt["lots_of"]]
+            receiving = _receiving_lots(
+                ((txn.record_id, lot.lot_number), lot.expires_on) for lot, _ in source
+            )
+            parts = [(receiving[(txn.record_id, lot.lot_number)], take) for lot, take in source]
+        else:
+            parts = [(named[(txn.record_id, receipt["lot_number"])], txn.base_quantity)]
+
+        for lot, quantity in parts:
+            if txn.transaction_type == "intake":
+                lot = changed.get(lot.pk, lot)
+                lot.quantity_on_hand += quantity
+                if lot.record_id in depleted:
+                    # Later depletions in this batch may draw on it
+                    depleted[lot.record_id][lot.pk] = lot
+            changed[lot.pk] = lot
+            lot_movements.append(LotMovement(transaction=txn, lot=lot, quantity=quantity))
+
+    Lot.objects.bulk_update(changed.values(), ["quantity_on_hand"], batch_size=1000)
+    return LotMovement.objects.bulk_create(lot_movements, batch_size=1000)
+
+
+def expiring(days, warehouse_id=None, product_id=None, today=None):
+    """
+    Lots with stock left that expire within ``days`` (already expired
+    included), soonest first. Walks lot_expiring_idx, which only holds
+    lots with stock, instead of every lot ever received.
+    """
+    today = today or timezone.localdate()
+    qs = (
+        Lot.objects.filter(quantity_on_hand__gt=0, expires_on__lte=today + timedelta(days=days))
+        .select_related("record__product", "record__warehouse")
+        .order_by("expires_on", "pk")
+    )
+    if warehouse_id:
+        qs = qs.filter(record__warehouse_id=warehouse_id)
+    if product_id:
+        qs = qs.filter(record__product_id=product_id)
+    return qs
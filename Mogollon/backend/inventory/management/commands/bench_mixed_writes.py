@@ -0,0 +1,116 @@
+# inventory/management/commands/bench_mixed_writes.py
+#
+# Mixed write workload: ledger posts racing RFQ and profile edits for a
+# fixed time. Run it once on a single database and once with
+# SPLIT_DATABASES=1 (see inventory/routers.py) to compare. Works on a
+# throwaway product, warehouse, RFQ and user that are deleted afterwards.
+# On SQLite, give every database OPTIONS {"transaction_mode": "IMMEDIATE"}
+# so writers queue on the busy timeout instead of failing fast.
+
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from inventory.models import InventoryRecord, InventoryTransaction, Product, Warehouse
+from inventory.routers import LEDGER
+from inventory.services import post_transaction
+from rfqs.models import RFQ
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent ledger posts against RFQ/profile edits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ledger-threads", type=int, default=8)
+        parser.add_argument("--edit-threads", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user      = get_user_model().objects.create_user(f"bench-{tag}")
+        products  = Product.objects.bulk_create(
+            [Product(name=f"bench {tag} {i}", sku=f"BENCH-{tag}-{i}", default_uom="each") for i in range(options["ledger_threads"])]
+        )
+        warehouse = Warehouse.objects.create(name=f"bench {tag}", location="benchmark")
+        rfq = RFQ.objects.create(email="bench@example.com", customer=f"bench {tag}", product="bench", description="bench")
+
+        def ledger_write(i, n):
+            # Every thread has its own record: only the database lock is shared
+            post_transaction(products[i].pk, warehouse.pk, transaction_type="intake",
+                             quantity=Decimal(1), uom="each", reference="bench")
+
+        def edit_write(i, n):
+            if n % 2:
+                RFQ.objects.filter(pk=rfq.pk).update(internal_notes=f"edit {i}/{n}")
+            else:
+                get_user_model().objects.filter(pk=user.pk).update(first_name=f"edit {i}/{n}"[:150])
+
+        try:
+            results = self._run(
+                [("ledger", ledger_write)] * options["ledger_threads"] + [("edits", edit_write)] * options["edit_threads"],
+                options["seconds"],
+            )
+        finally:
+            InventoryTransaction.objects.filter(record__product__in=products).delete()
+            InventoryRecord.objects.filter(product__in=products).delete()
+            Product.objects.filter(pk__in=[p.pk for p in products]).delete()
+            warehouse.delete()
+            rfq.delete()
+            user.delete()
+
+        databases = sorted({connections[alias].settings_dict["NAME"].__str__() for alias in ("default", LEDGER)})
+        self.stdout.write(f"databases: {', '.join(databases)}")
+        for kind in ("ledger", "edits"):
+            done, failed, ms = results[kind]
+            self.stdout.write(
+                f"{kind:>7}: {done / options['seconds']:8.0f} writes/s  "
+                f"p50 {np.percentile(ms, 50):6.1f}ms  p99 {np.percentile(ms, 99):6.1f}ms  failed {failed}"
+            )
+        total = sum(r[0] for r in results.values())
+        self.stdout.write(f"  total: {total / options['seconds']:8.0f} writes/s")
+
+    def _run(self, workers, seconds):
+        stats = [[0, 0, []] for _ in workers]  # done, failed, latencies
+        start = threading.Barrier(len(workers) + 1)
+        stop = threading.Event()
+
+        def loop(i, write):
+            try:
+                start.wait()
+                n = 0
+                while not stop.is_set():
+                    began = time.perf_counter()
+                    try:
+                        write(i, n)
+                        stats[i][0] += 1
+                    except Exception:
+                        stats[i][1] += 1
+                    stats[i][2].append(time.perf_counter() - began)
+                    n += 1
+            finally:
+                close_old_connections()
+
+        threads = [
+            threading.Thread(target=loop, args=(i, write)) for i, (_, write) in enumerate(workers)
+        ]
+        for t in threads:
+            t.start()
+        start.wait()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        results = {}
+        for (kind, _), (done, failed, latencies) in zip(workers, stats):
+            acc = results.setdefault(kind, [0, 0, []])
+            acc[0] += done
+            acc[1] += failed
+            acc[2].extend(latencies)
+        return {kind: (done, failed, np.array(ms) * 1000) for kind, (done, failed, ms) in results.items()}
@@ -0,0 +1,96 @@
+# inventory/management/commands/bench_scoped_reads.py
+#
+# What role scoping saves on the main read endpoints: each is called as an
+# admin (sees everything) and as a scoped user — a warehouse-staff member
+# assigned to one warehouse, a sales rep for their RFQs — reporting the
+# response size, median time and query count of each. Run it against a
+# database with realistic data; it adds throwaway users (and, with
+# --rfqs, RFQs spread over --reps reps) that are deleted afterwards.
+
+import time
+import uuid
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from inventory.models import InventoryRecord, Warehouse, WarehouseAssignment
+from inventory.routers import LEDGER
+from rfqs import stats
+from rfqs.models import RFQ
+
+
+class Command(BaseCommand):
+    help = "Benchmark payload size and time of inventory/RFQ reads, unscoped vs role-scoped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--warehouse", type=int, help="Warehouse the staff user is assigned to (default: first).")
+        parser.add_argument("--rfqs", type=int, default=2000, help="Throwaway RFQs to add first.")
+        parser.add_argument("--reps", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        warehouse = Warehouse.objects.filter(pk=options["warehouse"]).first() if options["warehouse"] else Warehouse.objects.order_by("pk").first()
+        if warehouse is None:
+            raise CommandError("No warehouse to assign.")
+        record = (
+            InventoryRecord.objects.filter(warehouse=warehouse)
+            .order_by("-quantity_on_hand", "pk")  # a busy record, for the history
+            .first()
+        )
+
+        tag = uuid.uuid4().hex[:8]
+        User = get_user_model()
+        admin = User.objects.create_user(f"bench-admin-{tag}", role="admin")
+        staff = User.objects.create_user(f"bench-staff-{tag}", role="warehouse-staff")
+        rep = User.objects.create_user(f"bench-rep-{tag}", role="sales-rep", email=f"rep0-{tag}@example.com")
+        WarehouseAssignment.objects.create(user=staff, warehouse=warehouse)
+        rfqs = RFQ.objects.bulk_create(
+            RFQ(
+                email=f"client{i % 50}-{tag}@example.com",
+                customer=f"bench {tag}",
+                product="bench",
+                description="bench",
+                rep_email=f"rep{i % options['reps']}-{tag}@example.com",
+            )
+            for i in range(options["rfqs"])
+        )
+        stats.changed([(None, stats.row(r)) for r in rfqs])  # bulk_create sends no signals
+
+        cases = [
+            ("inventory list", "/api/inventory/", staff),
+            ("dashboard", "/api/inventory/dashboard/", staff),
+            ("valuation", "/api/inventory/valuation/?group=product", staff),
+            ("rfq list", "/api/rfqs/", rep),
+        ]
+        if record:
+            cases.append(("record history", f"/api/inventory/{record.pk}/transactions/", staff))
+        try:
+            self.stdout.write(f"staff assigned to {warehouse} of {Warehouse.objects.count()} warehouses")
+            self.stdout.write(f"{'endpoint':<16} {'role':<16} {'bytes':>12} {'p50 ms':>9} {'queries':>8}")
+            for name, url, scoped in cases:
+                for user in (admin, scoped):
+                    size, ms, queries = self._measure(url, user, options["repeat"])
+                    self.stdout.write(f"{name:<16} {user.role:<16} {size:>12,} {ms:>9.1f} {queries:>8}")
+        finally:
+            RFQ.objects.filter(pk__in=[r.pk for r in rfqs]).delete()
+            WarehouseAssignment.objects.filter(user=staff).delete()
+            for user in (admin, staff, rep):
+                user.delete()
+
+    def _measure(self, url, user, repeat):
+        client = APIClient()
+        client.force_authenticate(user)
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connections["default"]) as default, CaptureQueriesContext(connections[LEDGER]) as ledger:
+                began = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - began)
+            if response.status_code != 200:
+                raise CommandError(f"{url} as {user.role}: HTTP {response.status_code}")
+        queries = len(default.captured_queries) + (len(ledger.captured_queries) if LEDGER != "default" else 0)
+        return len(response.content), float(np.median(timings)) * 1000, queries
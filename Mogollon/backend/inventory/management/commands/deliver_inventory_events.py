@@ -0,0 +1,69 @@
+# inventory/management/commands/deliver_inventory_events.py
+#
+# Long-running deliverer for the stock-movement webhook (see
+# inventory/outbox.py). Run exactly one. For a local try-out:
+#   manage.py run_webhook_standin &
+#   INVENTORY_WEBHOOK_URL=http://localhost:8089/ manage.py deliver_inventory_events
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from inventory import outbox
+
+PURGE_EVERY = 3600  # seconds
+
+
+class Command(BaseCommand):
+    help = "Deliver queued inventory events to INVENTORY_WEBHOOK_URL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default=outbox.URL)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--stats-every", type=float, default=60.0,
+                            help="Seconds between metrics lines.")
+        parser.add_argument("--once", action="store_true",
+                            help="Deliver everything settled now, then exit.")
+
+    def handle(self, *args, **options):
+        if not options["url"]:
+            raise CommandError("Set INVENTORY_WEBHOOK_URL or pass --url.")
+        pool, metrics = outbox.Pool(options["url"]), outbox.Metrics()
+        last_stats = last_purge = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=outbox.LANES) as executor:
+                while True:
+                    close_old_connections()
+                    try:
+                        delivered = outbox.deliver(pool, executor, metrics)
+                    except outbox.DeliveryError as exc:
+                        if options["once"]:
+                            raise CommandError(str(exc))
+                        self.stderr.write(f"Delivery failed, will retry: {exc}")
+                        time.sleep(outbox.BACKOFF_MAX)
+                        continue
+                    now = time.monotonic()
+                    if now - last_stats >= options["stats_every"]:
+                        self._stats(metrics)
+                        last_stats = now
+                    if now - last_purge >= PURGE_EVERY:
+                        outbox.purge()
+                        last_purge = now
+                    if not delivered:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll_interval"])
+        finally:
+            pool.close()
+        self._stats(metrics)
+
+    def _stats(self, metrics):
+        s = metrics.summary()
+        self.stdout.write(
+            f"delivered {s['events']} event(s) in {s['batches']} batch(es), "
+            f"{s['events_per_second']:.0f} events/s, gzip {s['compression_ratio']:.1f}x, "
+            f"p50 {s['p50_ms']:.1f}ms p99 {s['p99_ms']:.1f}ms, "
+            f"{s['retries']} retries, {s['failures']} failures, lag ~{outbox.lag()}"
+        )
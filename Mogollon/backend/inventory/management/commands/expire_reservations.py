@@ -0,0 +1,19 @@
+# inventory/management/commands/expire_reservations.py
+#
+# Run periodically (cron / scheduler) to release stock held by
+# reservations whose expires_at has passed.
+
+from django.core.management.base import BaseCommand
+
+from inventory.services import expire_reservations
+
+
+class Command(BaseCommand):
+    help = "Expire overdue stock reservations and release their holds in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = expire_reservations(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Expired {count} reservation(s)."))
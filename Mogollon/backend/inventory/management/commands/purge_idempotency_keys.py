@@ -0,0 +1,19 @@
+# inventory/management/commands/purge_idempotency_keys.py
+#
+# Run periodically (cron / scheduler) to evict stored Idempotency-Key
+# responses older than INVENTORY_IDEMPOTENCY_TTL.
+
+from django.core.management.base import BaseCommand
+
+from inventory.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = purge_expired(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} idempotency key(s)."))
@@ -0,0 +1,26 @@
+# inventory/management/commands/rebuild_rollups.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import analytics
+
+
+class Command(BaseCommand):
+    help = "Rebuild the movement rollups from the ledger and verify them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify-only", action="store_true",
+                            help="Compare the rollups with the ledger without rebuilding.")
+        parser.add_argument("--chunk-size", type=int, default=analytics.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            count = analytics.rebuild(chunk_size=options["chunk_size"])
+            self.stdout.write(f"Rebuilt rollups from {count} ledger row(s).")
+
+        mismatches = analytics.verify()
+        for key, stored, expected in mismatches[:50]:
+            self.stdout.write(f"  {key}: stored={stored} expected={expected}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} rollup bucket(s) disagree with the ledger.")
+        self.stdout.write(self.style.SUCCESS("Rollups match the ledger."))
@@ -0,0 +1,56 @@
+# inventory/management/commands/reconcile_inventory.py
+#
+# Check every record's quantity_on_hand against the net of its ledger.
+# Exits non-zero when discrepancies remain, so it can gate a cron alert.
+
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import reconciliation
+
+
+class Command(BaseCommand):
+    help = "Reconcile inventory balances with the transaction ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--warehouse", type=int, action="append", dest="warehouses",
+                            help="Only this warehouse (repeatable).")
+        parser.add_argument("--workers", type=int, default=reconciliation.WORKERS)
+        parser.add_argument("--chunk-size", type=int, default=reconciliation.CHUNK_SIZE,
+                            help="Records per unit of work.")
+        parser.add_argument("--report", help="Write the discrepancies to this CSV file.")
+        parser.add_argument("--repair", action="store_true",
+                            help="Write adjustment ledger rows so the ledger matches the balances.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        checked, found = reconciliation.check(
+            warehouse_ids=options["warehouses"],
+            workers=options["workers"],
+            chunk_size=options["chunk_size"],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Checked {checked} unit(s) in {elapsed:.2f}s; {len(found)} discrepancy(ies).")
+
+        for d in found[:50]:
+            self.stdout.write(
+                f"  record #{d.record_id} (product {d.product_id}, warehouse {d.warehouse_id}): "
+                f"on hand {d.on_hand}, ledger {d.ledger}, difference {d.difference}"
+            )
+        if options["report"]:
+            with open(options["report"], "w", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["record_id", "product_id", "warehouse_id", "on_hand", "ledger", "difference"])
+                for d in found:
+                    writer.writerow([d.record_id, d.product_id, d.warehouse_id, d.on_hand, d.ledger, d.difference])
+            self.stdout.write(f"Report written to {options['report']}.")
+
+        if found and options["repair"]:
+            written = reconciliation.repair(found)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(written)} adjustment row(s)."))
+        elif found:
+            raise CommandError(f"{len(found)} record(s) disagree with the ledger.")
+        else:
+            self.stdout.write(self.style.SUCCESS("All balances match the ledger."))
@@ -0,0 +1,18 @@
+# inventory/management/commands/rollup_movements.py
+#
+# Run every few minutes to keep MovementRollup in step with the ledger.
+
+from django.core.management.base import BaseCommand
+
+from inventory import analytics
+
+
+class Command(BaseCommand):
+    help = "Fold new ledger rows (past the high-water mark) into the movement rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=analytics.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        count = analytics.catch_up(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Folded {count} ledger row(s) into rollups."))
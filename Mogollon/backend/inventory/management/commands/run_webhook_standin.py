@@ -0,0 +1,78 @@
+# inventory/management/commands/run_webhook_standin.py
+#
+# Local HTTP stand-in for the ERP's webhook receiver, for trying out and
+# load-testing deliver_inventory_events. Accepts gzip'd JSON batches,
+# checks each record's events arrive in order, and can be made slow or
+# flaky. Prints what it received every few seconds.
+
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Run a local stand-in for the inventory webhook receiver."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--latency-ms", type=float, default=0.0)
+        parser.add_argument("--fail-rate", type=float, default=0.0,
+                            help="Fraction of requests answered with 503.")
+        parser.add_argument("--report-every", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        lock = threading.Lock()
+        seen, last_id = set(), {}
+        stats = {"requests": 0, "events": 0, "duplicates": 0, "out_of_order": 0, "rejected": 0}
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if options["latency_ms"]:
+                    time.sleep(options["latency_ms"] / 1000)
+                if random.random() < options["fail_rate"]:
+                    with lock:
+                        stats["rejected"] += 1
+                    return self._reply(503)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                events = json.loads(body)["events"]
+                with lock:
+                    stats["requests"] += 1
+                    for event in events:
+                        if event["id"] in seen:
+                            stats["duplicates"] += 1
+                            continue
+                        seen.add(event["id"])
+                        stats["events"] += 1
+                        record = event["data"]["record_id"]
+                        if event["id"] < last_id.get(record, 0):
+                            stats["out_of_order"] += 1
+                        last_id[record] = event["id"]
+                self._reply(204)
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("localhost", options["port"]), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.stdout.write(f"Listening on http://localhost:{options['port']}/")
+        try:
+            while True:
+                time.sleep(options["report_every"])
+                with lock:
+                    self.stdout.write(", ".join(f"{k} {v}" for k, v in stats.items()))
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,38 @@
+# inventory/management/commands/snapshot_ledger.py
+#
+# Run nightly (or as often as analysts need) to bring the columnar ledger
+# snapshot up to date; see inventory/snapshot.py for the format and reader.
+
+import shutil
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from inventory import snapshot
+
+
+class Command(BaseCommand):
+    help = "Append new ledger rows (past the high-water mark) to the columnar ledger snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Snapshot directory (default: INVENTORY_SNAPSHOT_DIR).")
+        parser.add_argument("--chunk-size", type=int)
+        parser.add_argument("--rebuild", action="store_true", help="Discard the snapshot and write it from scratch.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"] or snapshot.default_path())
+        if options["rebuild"] and path.exists():
+            (path / snapshot.MANIFEST).unlink(missing_ok=True)
+            for month in (d for d in path.iterdir() if d.is_dir()):
+                shutil.rmtree(month)
+
+        began = time.perf_counter()
+        count = snapshot.append(path, chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - began
+        snap = snapshot.Snapshot(path)
+        size = sum(f.stat().st_size for f in path.rglob("*.bin"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Appended {count} ledger row(s) in {elapsed:.1f}s; snapshot holds {snap.manifest['rows']} "
+            f"row(s) in {len(snap.partitions)} month(s), {size / 2**20:.1f} MiB, up to id {snap.manifest['position']}."
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_reservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_rate', models.DecimalField(decimal_places=4, default=0, max_digits=14)),
+                ('daily_std', models.DecimalField(decimal_places=4, default=0, max_digits=14)),
+                ('days_of_cover', models.DecimalField(blank=True, decimal_places=1, max_digits=12, null=True)),
+                ('suggested_reorder_point', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('computed_at', models.DateTimeField()),
+                ('record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestion', to='inventory.inventoryrecord')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_reordersuggestion_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('bucket_start', models.DateField()),
+                ('reason', models.CharField(blank=True, default='', max_length=20)),
+                ('intake_qty', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('depletion_qty', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('intake_count', models.PositiveIntegerField(default=0)),
+                ('depletion_count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='inventory.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='inventory.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='rollup_bucket_idx')],
+                'unique_together': {('granularity', 'bucket_start', 'product', 'warehouse', 'reason')},
+            },
+        ),
+    ]
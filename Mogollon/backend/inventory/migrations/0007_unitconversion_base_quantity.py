@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_base_quantity(apps, schema_editor):
+    # Existing rows were applied to balances as entered, so keep that meaning
+    InventoryTransaction = apps.get_model("inventory", "InventoryTransaction")
+    InventoryTransaction.objects.update(base_quantity=models.F("quantity"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_movementrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='base_quantity',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='UnitConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_uom', models.CharField(max_length=50)),
+                ('to_uom', models.CharField(max_length=50)),
+                ('factor', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='uom_conversions', to='inventory.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'from_uom', 'to_uom'), name='uom_conversion_product_unique'), models.UniqueConstraint(condition=models.Q(('product__isnull', True)), fields=('from_uom', 'to_uom'), name='uom_conversion_global_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_base_quantity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorytransaction',
+            name='reason',
+            field=models.CharField(blank=True, choices=[('client_order', 'Client Order'), ('shrinkage', 'Shrinkage'), ('damage', 'Damage'), ('transfer', 'Transfer'), ('adjustment', 'Adjustment'), ('other', 'Other')], max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_transaction_reason_adjustment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CycleCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('approved', 'Approved'), ('cancelled', 'Cancelled')], default='open', max_length=10)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('snapshot_position', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('approved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cycle_counts', to='inventory.warehouse')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CycleCountLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_qty', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('counted_qty', models.DecimalField(blank=True, decimal_places=3, max_digits=12, null=True)),
+                ('variance', models.DecimalField(blank=True, decimal_places=3, max_digits=12, null=True)),
+                ('adjustment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cycle_count_line', to='inventory.inventorytransaction')),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cycle_count_lines', to='inventory.inventoryrecord')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.cyclecount')),
+            ],
+            options={
+                'ordering': ['record_id'],
+                'unique_together': {('session', 'record')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_warehouse_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_number', models.CharField(max_length=100)),
+                ('expires_on', models.DateField(blank=True, null=True)),
+                ('quantity_on_hand', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='inventory.inventoryrecord')),
+            ],
+            options={
+                'ordering': ['record_id', 'expires_on', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LotMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.lot')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_movements', to='inventory.inventorytransaction')),
+            ],
+            options={
+                'ordering': ['transaction_id', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['record', 'expires_on'], name='lot_fefo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(condition=models.Q(('quantity_on_hand__gt', 0)), fields=['expires_on'], name='lot_expiring_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='lot',
+            unique_together={('record', 'lot_number')},
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_layers(apps, schema_editor):
+    # Stock on hand before costing existed becomes one layer of unknown cost
+    InventoryRecord = apps.get_model("inventory", "InventoryRecord")
+    CostLayer = apps.get_model("inventory", "CostLayer")
+    db = schema_editor.connection.alias
+    CostLayer.objects.using(db).bulk_create(
+        (
+            CostLayer(record_id=pk, quantity_received=on_hand, quantity_remaining=on_hand)
+            for pk, on_hand in InventoryRecord.objects.using(db)
+            .filter(quantity_on_hand__gt=0)
+            .values_list("pk", "quantity_on_hand")
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='cost',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_cost', models.DecimalField(blank=True, decimal_places=6, max_digits=18, null=True)),
+                ('quantity_received', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('quantity_remaining', models.DecimalField(decimal_places=3, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('record', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory.inventoryrecord')),
+                ('source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.inventorytransaction')),
+            ],
+            options={
+                'ordering': ['record_id', 'id'],
+                'indexes': [models.Index(condition=models.Q(('quantity_remaining__gt', 0)), fields=['record', 'id'], name='costlayer_open_idx')],
+            },
+        ),
+        migrations.RunPython(open_layers, migrations.RunPython.noop, hints={"model_name": "costlayer"}),
+    ]
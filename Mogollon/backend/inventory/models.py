@@ -1,8 +1,13 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Relations to accounts.User (and rollups to the catalog) may cross
+# databases (see routers.py): they carry no DB constraint and are cleaned
+# up by the receivers there rather than by the delete cascade.
+
 class Product(models.Model):
     name        = models.CharField(max_length=200)
     sku         = models.CharField(max_length=100, unique=True)
@@ -11,9 +16,35 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+class UnitConversion(models.Model):
+    # 1 from_uom = factor × to_uom; product-specific rows win over global ones
+    product  = models.ForeignKey(Product, related_name="uom_conversions", on_delete=models.CASCADE, blank=True, null=True)
+    from_uom = models.CharField(max_length=50)
+    to_uom   = models.CharField(max_length=50)
+    factor   = models.DecimalField(max_digits=18, decimal_places=6)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "from_uom", "to_uom"], name="uom_conversion_product_unique"),
+            models.UniqueConstraint(fields=["from_uom", "to_uom"], condition=models.Q(product__isnull=True), name="uom_conversion_global_unique"),
+        ]
+
+    def __str__(self):
+        scope = self.product.sku if self.product_id else "global"
+        return f"1 {self.from_uom} = {self.factor} {self.to_uom} ({scope})"
+
 class Warehouse(models.Model):
-    name     = models.CharField(max_length=200)
-    location = models.CharField(max_length=200)
+    name      = models.CharField(max_length=200)
+    location  = models.CharField(max_length=200)
+    # WGS84 degrees; warehouses without coordinates are skipped by allocation
+    latitude  = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for inventory.allocation
+            models.Index(fields=["latitude", "longitude"], name="warehouse_coords_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -23,10 +54,39 @@ class InventoryRecord(models.Model):
     warehouse        = models.ForeignKey(Warehouse, related_name="inventory_records", on_delete=models.CASCADE)
     quantity_on_hand = models.DecimalField(max_digits=12, decimal_places=3, default=0)
     reorder_point    = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    # Sum of active Reservation holds, kept in step by inventory.services
+    quantity_reserved = models.DecimalField(max_digits=12, decimal_places=3, default=0)
 
     class Meta:
         unique_together = ("product", "warehouse")
 
+    @property
+    def quantity_available(self):
+        return self.quantity_on_hand - self.quantity_reserved
+
+class WarehouseAssignment(models.Model):
+    # Warehouses a user works at; scopes what they see (inventory.scoping)
+    user      = models.ForeignKey(User, related_name="warehouse_assignments", on_delete=models.DO_NOTHING, db_constraint=False)
+    warehouse = models.ForeignKey(Warehouse, related_name="assignments", on_delete=models.CASCADE)
+
+    class Meta:
+        unique_together = ("user", "warehouse")
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.warehouse}"
+
+class Transfer(models.Model):
+    # Header grouping the paired depletion/intake ledger rows of one move
+    from_warehouse = models.ForeignKey(Warehouse, related_name="transfers_out", on_delete=models.CASCADE)
+    to_warehouse   = models.ForeignKey(Warehouse, related_name="transfers_in",  on_delete=models.CASCADE)
+    reference      = models.CharField(max_length=200, blank=True, null=True)
+    notes          = models.TextField(blank=True, null=True)
+    created_by     = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True)
+    created_at     = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Transfer #{self.pk}: {self.from_warehouse} -> {self.to_warehouse}"
+
 class InventoryTransaction(models.Model):
     TRANSACTION_TYPES = [
         ("intake",    "Intake"),
@@ -37,6 +97,7 @@ class InventoryTransaction(models.Model):
         ("shrinkage",    "Shrinkage"),
         ("damage",       "Damage"),
         ("transfer",     "Transfer"),
+        ("adjustment",   "Adjustment"),
         ("other",        "Other"),
     ]
 
@@ -44,11 +105,236 @@ class InventoryTransaction(models.Model):
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     quantity         = models.DecimalField(max_digits=12, decimal_places=3)
     uom              = models.CharField(max_length=50)
+    # quantity converted to product.default_uom at write time (inventory.uom)
+    base_quantity    = models.DecimalField(max_digits=12, decimal_places=3, default=0)
     reason           = models.CharField(max_length=20, choices=REASONS, blank=True, null=True)
     reference        = models.CharField(max_length=200, blank=True, null=True)
     notes            = models.TextField(blank=True, null=True)
-    created_by       = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    transfer         = models.ForeignKey(Transfer, related_name="transactions", on_delete=models.SET_NULL, blank=True, null=True)
+    # Intakes: purchase cost per entered uom. Every movement: the value it
+    # moved at FIFO cost (inventory.costing); null where the cost is unknown
+    unit_cost        = models.DecimalField(max_digits=14, decimal_places=4, blank=True, null=True)
+    cost             = models.DecimalField(max_digits=16, decimal_places=4, blank=True, null=True)
+    created_by       = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True)
     created_at       = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # A record's history, newest first
+            models.Index(fields=["record", "-created_at"], name="txn_record_history_idx"),
+        ]
+
+class Reservation(models.Model):
+    ACTIVE    = "active"
+    FULFILLED = "fulfilled"
+    RELEASED  = "released"
+    EXPIRED   = "expired"
+    STATUS_CHOICES = [
+        (ACTIVE,    "Active"),
+        (FULFILLED, "Fulfilled"),
+        (RELEASED,  "Released"),
+        (EXPIRED,   "Expired"),
+    ]
+
+    record      = models.ForeignKey(InventoryRecord, related_name="reservations", on_delete=models.CASCADE)
+    quantity    = models.DecimalField(max_digits=12, decimal_places=3)
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    reference   = models.CharField(max_length=200, blank=True, null=True)
+    notes       = models.TextField(blank=True, null=True)
+    expires_at  = models.DateTimeField()
+    transaction = models.OneToOneField(InventoryTransaction, related_name="reservation", on_delete=models.SET_NULL, blank=True, null=True)
+    created_by  = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True)
+    created_at  = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["expires_at"]
+        indexes = [
+            # Only active holds are ever swept, so keep the index small
+            models.Index(fields=["expires_at"], condition=models.Q(status="active"), name="reservation_active_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.quantity} on record #{self.record_id} ({self.status})"
+
+class ReorderSuggestion(models.Model):
+    # One row per record, rewritten by inventory.forecasting
+    record                  = models.OneToOneField(InventoryRecord, related_name="reorder_suggestion", on_delete=models.CASCADE)
+    daily_rate              = models.DecimalField(max_digits=14, decimal_places=4, default=0)
+    daily_std               = models.DecimalField(max_digits=14, decimal_places=4, default=0)
+    days_of_cover           = models.DecimalField(max_digits=12, decimal_places=1, blank=True, null=True)
+    suggested_reorder_point = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    computed_at             = models.DateTimeField()
+
+    def __str__(self):
+        return f"Reorder suggestion for record #{self.record_id}: {self.suggested_reorder_point}"
+
+class Checkpoint(models.Model):
+    # Named high-water marks for incremental batch jobs
+    name       = models.CharField(max_length=100, unique=True)
+    position   = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+class OutboxEvent(models.Model):
+    # Stock movement waiting for webhook delivery; written in the same
+    # transaction as its ledger row (inventory.outbox)
+    id         = models.BigAutoField(primary_key=True)
+    topic      = models.CharField(max_length=50)
+    record_id  = models.BigIntegerField()  # delivery keeps each record's events in order
+    payload    = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} (record {self.record_id})"
+
+class MovementRollup(models.Model):
+    # Pre-aggregated ledger sums, maintained by inventory.analytics
+    DAY   = "day"
+    WEEK  = "week"
+    MONTH = "month"
+    GRANULARITIES = [
+        (DAY,   "Day"),
+        (WEEK,  "Week"),
+        (MONTH, "Month"),
+    ]
+
+    granularity     = models.CharField(max_length=5, choices=GRANULARITIES)
+    bucket_start    = models.DateField()
+    product         = models.ForeignKey(Product,   related_name="movement_rollups", on_delete=models.DO_NOTHING, db_constraint=False)
+    warehouse       = models.ForeignKey(Warehouse, related_name="movement_rollups", on_delete=models.DO_NOTHING, db_constraint=False)
+    reason          = models.CharField(max_length=20, blank=True, default="")
+    intake_qty      = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+    depletion_qty   = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+    intake_count    = models.PositiveIntegerField(default=0)
+    depletion_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("granularity", "bucket_start", "product", "warehouse", "reason")
+        indexes = [
+            models.Index(fields=["granularity", "bucket_start"], name="rollup_bucket_idx"),
+        ]
+
+class IdempotencyKey(models.Model):
+    # Stored outcome of a write made with an Idempotency-Key header
+    key           = models.CharField(max_length=255)
+    endpoint      = models.CharField(max_length=100)
+    user          = models.ForeignKey(User, related_name="idempotency_keys", on_delete=models.DO_NOTHING, db_constraint=False)
+    request_hash  = models.CharField(max_length=64)
+    status_code   = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at    = models.DateTimeField(auto_now_add=True)
+    expires_at    = models.DateTimeField(db_index=True)
+
+    class Meta:
+        # The unique index doubles as the lookup index on the write path
+        unique_together = ("user", "endpoint", "key")
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key!r} → {self.status_code}"
+
+class CycleCount(models.Model):
+    # A counting session over (part of) one warehouse; see inventory.cycle_counts
+    OPEN      = "open"
+    APPROVED  = "approved"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (OPEN,      "Open"),
+        (APPROVED,  "Approved"),
+        (CANCELLED, "Cancelled"),
+    ]
+
+    warehouse   = models.ForeignKey(Warehouse, related_name="cycle_counts", on_delete=models.CASCADE)
+    status      = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    notes       = models.TextField(blank=True, null=True)
+    # Ledger high-water mark when the snapshot was frozen; movements past it
+    # happened during the count window
+    snapshot_position = models.BigIntegerField(default=0)
+    created_by  = models.ForeignKey(User, related_name="+", on_delete=models.DO_NOTHING, db_constraint=False, null=True)
+    created_at  = models.DateTimeField(auto_now_add=True)
+    approved_by = models.ForeignKey(User, related_name="+", on_delete=models.DO_NOTHING, db_constraint=False, blank=True, null=True)
+    approved_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Cycle count #{self.pk} at {self.warehouse} ({self.status})"
+
+class CycleCountLine(models.Model):
+    session      = models.ForeignKey(CycleCount, related_name="lines", on_delete=models.CASCADE)
+    record       = models.ForeignKey(InventoryRecord, related_name="cycle_count_lines", on_delete=models.CASCADE)
+    snapshot_qty = models.DecimalField(max_digits=12, decimal_places=3)
+    counted_qty  = models.DecimalField(max_digits=12, decimal_places=3, blank=True, null=True)
+    variance     = models.DecimalField(max_digits=12, decimal_places=3, blank=True, null=True)
+    adjustment   = models.OneToOneField(InventoryTransaction, related_name="cycle_count_line", on_delete=models.SET_NULL, blank=True, null=True)
+
+    class Meta:
+        ordering = ["record_id"]
+        unique_together = ("session", "record")
+
+    def __str__(self):
+        return f"Count of record #{self.record_id}: {self.counted_qty} (snapshot {self.snapshot_qty})"
+
+class Lot(models.Model):
+    """
+    A received batch under one record. Lot quantities are in the product's
+    default UOM and sum to at most the record's quantity_on_hand; the rest
+    is stock received without a lot.
+    """
+    record           = models.ForeignKey(InventoryRecord, related_name="lots", on_delete=models.CASCADE)
+    lot_number       = models.CharField(max_length=100)
+    expires_on       = models.DateField(blank=True, null=True)
+    quantity_on_hand = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    created_at       = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["record_id", "expires_on", "id"]
+        unique_together = ("record", "lot_number")
+        indexes = [
+            # FEFO walk of one record's lots
+            models.Index(fields=["record", "expires_on"], name="lot_fefo_idx"),
+            # "Expiring soon" only ever looks at lots with stock left
+            models.Index(fields=["expires_on"], condition=models.Q(quantity_on_hand__gt=0), name="lot_expiring_idx"),
+        ]
+
+    def __str__(self):
+        return f"Lot {self.lot_number} of record #{self.record_id} ({self.quantity_on_hand})"
+
+class LotMovement(models.Model):
+    """How much of a ledger row went into (intake) or came out of (depletion) a lot."""
+    transaction = models.ForeignKey(InventoryTransaction, related_name="lot_movements", on_delete=models.CASCADE)
+    lot         = models.ForeignKey(Lot, related_name="movements", on_delete=models.CASCADE)
+    quantity    = models.DecimalField(max_digits=12, decimal_places=3)
+
+    class Meta:
+        ordering = ["transaction_id", "id"]
+
+    def __str__(self):
+        return f"{self.quantity} of lot {self.lot_id} on transaction #{self.transaction_id}"
+
+class CostLayer(models.Model):
+    """
+    What is left of one intake at its unit cost. A record's open layers
+    sum to its quantity_on_hand and are consumed oldest first (FIFO) by
+    inventory.costing. Quantities and unit_cost are per default UOM;
+    unit_cost is null for stock of unknown cost.
+    """
+    record             = models.ForeignKey(InventoryRecord, related_name="cost_layers", on_delete=models.CASCADE)
+    source             = models.ForeignKey(InventoryTransaction, related_name="+", on_delete=models.SET_NULL, blank=True, null=True)
+    unit_cost          = models.DecimalField(max_digits=18, decimal_places=6, blank=True, null=True)
+    quantity_received  = models.DecimalField(max_digits=12, decimal_places=3)
+    quantity_remaining = models.DecimalField(max_digits=12, decimal_places=3)
+    created_at         = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["record_id", "id"]
+        indexes = [
+            # FIFO walk and valuation only ever look at layers with stock left
+            models.Index(fields=["record", "id"], condition=models.Q(quantity_remaining__gt=0), name="costlayer_open_idx"),
+        ]
+
+    def __str__(self):
+        return f"Cost layer of record #{self.record_id}: {self.quantity_remaining} @ {self.unit_cost}"
@@ -0,0 +1,259 @@
+# inventory/outbox.py
+#
+# Transactional outbox for the ERP's stock-movement webhook. Every path
+# that writes ledger rows calls append() straight after, inside its
+# transaction.atomic(using=LEDGER), so an event exists exactly when its
+# movement committed and no request ever waits on the ERP.
+#
+# deliver() (run by the deliver_inventory_events command) drains the
+# table past a Checkpoint high-water mark. Each pass reads a window of
+# settled events and splits it into LANES by record; every lane POSTs
+# its events in id order, BATCH_SIZE at a time, gzip-compressed, over its
+# own keep-alive connection, retrying with backoff. The checkpoint moves
+# past the window only once every lane got through, so delivery is at
+# least once and in order per record: receivers dedupe on event id.
+# Run a single deliverer.
+#
+# Each event carries its topic: TOPIC for stock that moved, RECONCILE_TOPIC
+# for ledger rows that only correct the bookkeeping (the balance already
+# held that stock), which consumers must not apply as movements.
+
+import gzip
+import hashlib
+import hmac
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Checkpoint, OutboxEvent
+
+TOPIC           = "stock.movement"
+RECONCILE_TOPIC = "adjustment.reconcile"
+CHECKPOINT  = "webhook_deliveries"
+URL         = getattr(settings, "INVENTORY_WEBHOOK_URL", "")
+SECRET      = getattr(settings, "INVENTORY_WEBHOOK_SECRET", "")
+BATCH_SIZE  = getattr(settings, "INVENTORY_WEBHOOK_BATCH_SIZE", 500)
+LANES       = getattr(settings, "INVENTORY_WEBHOOK_LANES", 4)
+TIMEOUT     = getattr(settings, "INVENTORY_WEBHOOK_TIMEOUT", 10)  # seconds
+MAX_RETRIES = 5
+LATENCY_SAMPLES = 10000  # most recent request times kept for the percentiles
+BACKOFF_BASE, BACKOFF_MAX = 0.5, 30.0  # seconds
+# Events younger than this wait for the next pass, so a slow writer
+# holding a lower id can't commit behind the checkpoint (as in analytics)
+SETTLE_DELAY = getattr(settings, "INVENTORY_WEBHOOK_SETTLE_DELAY", timedelta(seconds=2))
+# Delivered events are kept this long, then purged
+RETENTION = getattr(settings, "INVENTORY_OUTBOX_RETENTION", timedelta(days=7))
+
+
+class DeliveryError(Exception):
+    pass
+
+
+def _movement(txn, lots):
+    record = txn.record
+    return {
+        "transaction_id":   txn.pk,
+        "occurred_at":      txn.created_at,
+        "record_id":        record.pk,
+        "product_id":       record.product_id,
+        "warehouse_id":     record.warehouse_id,
+        "transaction_type": txn.transaction_type,
+        "quantity":         txn.quantity,
+        "uom":              txn.uom,
+        "base_quantity":    txn.base_quantity,
+        "unit_cost":        txn.unit_cost,
+        "cost":             txn.cost,
+        "reason":           txn.reason,
+        "reference":        txn.reference,
+        "transfer_id":      txn.transfer_id,
+        "lots":             lots,
+    }
+
+
+def append(movements, lot_movements=(), topic=TOPIC):
+    """Queue one event per saved ledger row; call inside the writing transaction."""
+    lots = defaultdict(list)
+    for lm in lot_movements:
+        lots[lm.transaction_id].append(
+            {"lot_number": lm.lot.lot_number, "expires_on": lm.lot.expires_on, "quantity": lm.quantity}
+        )
+    return OutboxEvent.objects.bulk_create(
+        [OutboxEvent(topic=topic, record_id=txn.record_id, payload=_movement(txn, lots[txn.pk])) for txn in movements],
+        batch_size=1000,
+    )
+
+
+class Pool:
+    """Keep-alive HTTP(S) connections to the webhook URL, reused across batches."""
+
+    def __init__(self, url, timeout=TIMEOUT):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host, self.port, self.timeout = parts.hostname, parts.port, timeout
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.idle = queue.LifoQueue()
+
+    def post(self, body, headers):
+        """POST and return the status. A reused connection the server dropped is retried once, fresh."""
+        for fresh in (False, True):
+            try:
+                conn = None if fresh else self.idle.get_nowait()
+            except queue.Empty:
+                conn = None
+            reused = conn is not None
+            conn = conn or self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request("POST", self.path, body, headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self.idle.put(conn)
+            return response.status
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class Metrics:
+    """Delivery counters, shared by the lanes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.events = self.batches = self.raw_bytes = self.sent_bytes = self.retries = self.failures = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def request(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def delivered(self, events, raw_bytes, sent_bytes):
+        with self.lock:
+            self.events += events
+            self.batches += 1
+            self.raw_bytes += raw_bytes
+            self.sent_bytes += sent_bytes
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        ms = np.array(self.latencies or [0.0]) * 1000
+        return {
+            "events":            self.events,
+            "batches":           self.batches,
+            "events_per_second": self.events / elapsed if elapsed else 0.0,
+            "compression_ratio": self.raw_bytes / self.sent_bytes if self.sent_bytes else 0.0,
+            "p50_ms":            float(np.percentile(ms, 50)),
+            "p99_ms":            float(np.percentile(ms, 99)),
+            "retries":           self.retries,
+            "failures":          self.failures,
+        }
+
+
+def batch_key(ids):
+    """Idempotency key for a batch: the same for the same events, whatever window carried them."""
+    return hashlib.sha256(",".join(map(str, sorted(ids))).encode()).hexdigest()
+
+
+def _send(pool, events, metrics):
+    """POST one batch of (id, topic, created_at, payload) rows, retrying with backoff."""
+    body = json.dumps(
+        {
+            "events": [
+                {"id": pk, "topic": topic, "created_at": created_at, "data": data}
+                for pk, topic, created_at, data in events
+            ],
+        },
+        cls=DjangoJSONEncoder,
+        separators=(",", ":"),
+    ).encode()
+    compressed = gzip.compress(body, compresslevel=5)
+    headers = {
+        "Content-Type":     "application/json",
+        "Content-Encoding": "gzip",
+        "Idempotency-Key":  batch_key(pk for pk, *_ in events),
+    }
+    if SECRET:
+        headers["X-Signature"] = "sha256=" + hmac.new(SECRET.encode(), compressed, hashlib.sha256).hexdigest()
+
+    for attempt in range(MAX_RETRIES + 1):
+        began = time.perf_counter()
+        try:
+            status, error = pool.post(compressed, headers), None
+        except (OSError, http.client.HTTPException) as exc:
+            status, error = None, exc
+        metrics.request(time.perf_counter() - began)
+        if status and 200 <= status < 300:
+            metrics.delivered(len(events), len(body), len(compressed))
+            return
+        if attempt < MAX_RETRIES:
+            with metrics.lock:
+                metrics.retries += 1
+            time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0))
+    with metrics.lock:
+        metrics.failures += 1
+    raise DeliveryError(f"Events {events[0][0]}-{events[-1][0]}: {error or f'HTTP {status}'}")
+
+
+def _send_lane(pool, events, metrics):
+    for i in range(0, len(events), BATCH_SIZE):
+        _send(pool, events[i:i + BATCH_SIZE], metrics)
+
+
+def deliver(pool, executor, metrics):
+    """
+    One pass: deliver the next window of settled events and advance the
+    checkpoint past it. Returns the number of events delivered (0 when
+    caught up); raises DeliveryError, leaving the checkpoint, if a batch
+    still fails after its retries.
+    """
+    checkpoint, _ = Checkpoint.objects.get_or_create(name=CHECKPOINT)
+    rows = list(
+        OutboxEvent.objects.filter(pk__gt=checkpoint.position, created_at__lte=timezone.now() - SETTLE_DELAY)
+        .order_by("pk")
+        .values_list("pk", "record_id", "topic", "created_at", "payload")[:BATCH_SIZE * LANES]
+    )
+    if not rows:
+        return 0
+    lanes = defaultdict(list)
+    for pk, record_id, topic, created_at, payload in rows:
+        lanes[record_id % LANES].append((pk, topic, created_at, payload))
+    # list() re-raises the first lane's DeliveryError
+    list(executor.map(lambda events: _send_lane(pool, events, metrics), lanes.values()))
+    checkpoint.position = rows[-1][0]
+    checkpoint.save(update_fields=["position", "updated_at"])
+    return len(rows)
+
+
+def lag():
+    """Roughly how many events wait past the checkpoint."""
+    position = Checkpoint.objects.filter(name=CHECKPOINT).values_list("position", flat=True).first() or 0
+    head = OutboxEvent.objects.aggregate(head=Max("pk"))["head"] or 0
+    return max(head - position, 0)
+
+
+def purge(before=None):
+    """Delete delivered events older than RETENTION; returns how many."""
+    position = Checkpoint.objects.filter(name=CHECKPOINT).values_list("position", flat=True).first() or 0
+    before = before or timezone.now() - RETENTION
+    deleted, _ = OutboxEvent.objects.filter(pk__lte=position, created_at__lt=before).delete()
+    return deleted
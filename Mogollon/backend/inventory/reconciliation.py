@@ -0,0 +1,128 @@
+# inventory/reconciliation.py
+#
+# Ledger-versus-balance check. Each unit of work is a slice of one
+# warehouse's records (a pk range) and is checked with a single grouped
+# statement: records LEFT JOIN their ledger rows, net base_quantity summed
+# per record. Being one statement, balance and sum come from the same
+# snapshot even while stock keeps moving. Units run on a thread pool.
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import close_old_connections, transaction
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import outbox
+from .models import InventoryRecord, InventoryTransaction
+from .routers import LEDGER
+from .services import lock_records_by_id
+
+CHUNK_SIZE = 5000  # records per unit of work
+WORKERS    = 4
+
+_zero = Value(Decimal(0), output_field=DecimalField(max_digits=16, decimal_places=3))
+_step = Decimal("0.001")
+
+
+@dataclass
+class Discrepancy:
+    record_id:    int
+    product_id:   int
+    warehouse_id: int
+    on_hand:      Decimal
+    ledger:       Decimal
+
+    @property
+    def difference(self):
+        return self.on_hand - self.ledger
+
+
+def _with_ledger(qs):
+    return qs.annotate(
+        ledger=Coalesce(Sum("transactions__base_quantity", filter=Q(transactions__transaction_type="intake")), _zero)
+        - Coalesce(Sum("transactions__base_quantity", filter=Q(transactions__transaction_type="depletion")), _zero)
+    )
+
+
+def units(warehouse_ids=None, chunk_size=CHUNK_SIZE):
+    """(warehouse_id, first_pk, last_pk) slices covering every record."""
+    qs = InventoryRecord.objects.order_by("warehouse_id", "pk")
+    if warehouse_ids:
+        qs = qs.filter(warehouse_id__in=warehouse_ids)
+    current, pks = None, []
+    for warehouse_id, pk in qs.values_list("warehouse_id", "pk").iterator(chunk_size=10000):
+        if warehouse_id != current or len(pks) == chunk_size:
+            if pks:
+                yield current, pks[0], pks[-1]
+            current, pks = warehouse_id, []
+        pks.append(pk)
+    if pks:
+        yield current, pks[0], pks[-1]
+
+
+def check_unit(warehouse_id, first_pk, last_pk):
+    try:
+        rows = (
+            _with_ledger(InventoryRecord.objects.filter(warehouse_id=warehouse_id, pk__range=(first_pk, last_pk)))
+            .values_list("pk", "product_id", "warehouse_id", "quantity_on_hand", "ledger")
+            .order_by()
+        )
+        # Compared here rather than in HAVING: SQLite sums decimals as floats
+        found = []
+        for pk, product_id, warehouse_id, on_hand, ledger in rows:
+            ledger = Decimal(ledger).quantize(_step)
+            if on_hand != ledger:
+                found.append(Discrepancy(pk, product_id, warehouse_id, on_hand, ledger))
+        return found
+    finally:
+        # Pool threads hold their own DB connections
+        close_old_connections()
+
+
+def check(warehouse_ids=None, workers=WORKERS, chunk_size=CHUNK_SIZE):
+    """Return (units checked, [Discrepancy]) sorted by record."""
+    work = list(units(warehouse_ids, chunk_size))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda unit: check_unit(*unit), work)
+        found = [d for chunk in results for d in chunk]
+    return len(work), sorted(found, key=lambda d: d.record_id)
+
+
+def repair(discrepancies, created_by=None):
+    """
+    Write one adjustment ledger row per record so the ledger agrees with
+    quantity_on_hand; the balance is left alone. Each record is re-checked
+    under its row lock, so movements posted since the check are respected.
+    Returns the adjustment rows written.
+    """
+    written = []
+    ids = [d.record_id for d in discrepancies]
+    for i in range(0, len(ids), 500):
+        with transaction.atomic(using=LEDGER):
+            records = lock_records_by_id(ids[i:i + 500])
+            current = dict(
+                _with_ledger(InventoryRecord.objects.filter(pk__in=records.keys()))
+                .values_list("pk", "ledger")
+            )
+            adjustments = []
+            for pk, record in records.items():
+                ledger = Decimal(current[pk]).quantize(_step)
+                difference = record.quantity_on_hand - ledger
+                if not difference:
+                    continue
+                adjustments.append(InventoryTransaction(
+                    record=record,
+                    transaction_type="intake" if difference > 0 else "depletion",
+                    quantity=abs(difference),
+                    base_quantity=abs(difference),
+                    uom=record.product.default_uom,
+                    reason="adjustment",
+                    notes=f"Reconciliation: ledger {ledger}, on hand {record.quantity_on_hand}",
+                    created_by=created_by,
+                ))
+            adjusted = InventoryTransaction.objects.bulk_create(adjustments)
+            outbox.append(adjusted, topic=outbox.RECONCILE_TOPIC)  # no stock moved
+            written += adjusted
+    return written
@@ -0,0 +1,87 @@
+# inventory/routers.py
+#
+# Splits the tables by who writes them, so that on SQLite the ledger's
+# inserts and RFQ/profile edits stop queueing on one database-wide lock:
+#
+#   ledger     the inventory app: balances, ledger, lots, holds, and the
+#              catalog rows (products, warehouses, UOMs) the stock path
+#              joins while it holds its record locks
+#   analytics  MovementRollup and its checkpoint (optional)
+#   default    everything else: accounts, RFQs, jobs, auth, sessions
+#
+# Each stock mutation touches the ledger database only, so its
+# transaction.atomic(using=LEDGER) stays all-or-nothing; the rollup folds
+# its checkpoint together with its buckets in the analytics database.
+# Foreign keys that cross databases carry no constraint and are cleaned
+# up by the receivers below instead of by the delete cascade.
+#
+# An alias missing from DATABASES falls back (analytics -> ledger ->
+# default), so a single database keeps working unchanged.
+
+from django.conf import settings
+
+LEDGER    = "ledger" if "ledger" in settings.DATABASES else "default"
+ANALYTICS = "analytics" if "analytics" in settings.DATABASES else LEDGER
+
+_ANALYTICS_MODELS = {"movementrollup"}
+_SHARED_MODELS    = {"checkpoint"}  # high-water marks live beside the data they track
+
+
+def database_for(model):
+    if model._meta.app_label != "inventory":
+        return "default"
+    if model._meta.model_name in _ANALYTICS_MODELS:
+        return ANALYTICS
+    return LEDGER
+
+
+class InventoryRouter:
+    def db_for_read(self, model, **hints):
+        return database_for(model)
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get("instance")
+        if model._meta.model_name in _SHARED_MODELS and instance is not None and instance._state.db:
+            return instance._state.db  # save a checkpoint back where it was read
+        return database_for(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # cross-database relations are plain ids, see above
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label != "inventory":
+            return db == "default"
+        if model_name in _SHARED_MODELS:
+            return db in (LEDGER, ANALYTICS)
+        if model_name in _ANALYTICS_MODELS:
+            return db == ANALYTICS
+        return db == LEDGER
+
+
+# Signal receivers (connected in InventoryConfig.ready) standing in for the
+# cascades that can't reach across databases
+def user_deleted(sender, instance, **kwargs):
+    from .models import CycleCount, IdempotencyKey, InventoryTransaction, Reservation, Transfer, WarehouseAssignment
+
+    for model, field in (
+        (InventoryTransaction, "created_by"),
+        (Reservation,          "created_by"),
+        (Transfer,             "created_by"),
+        (CycleCount,           "created_by"),
+        (CycleCount,           "approved_by"),
+    ):
+        model.objects.filter(**{field: instance.pk}).update(**{field: None})
+    IdempotencyKey.objects.filter(user_id=instance.pk).delete()
+    WarehouseAssignment.objects.filter(user_id=instance.pk).delete()
+
+
+def product_deleted(sender, instance, **kwargs):
+    from .models import MovementRollup
+
+    MovementRollup.objects.filter(product_id=instance.pk).delete()
+
+
+def warehouse_deleted(sender, instance, **kwargs):
+    from .models import MovementRollup
+
+    MovementRollup.objects.filter(warehouse_id=instance.pk).delete()
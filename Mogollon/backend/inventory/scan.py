@@ -0,0 +1,133 @@
+# inventory/scan.py
+#
+# Barcode scan lookups: SKU -> product + balances in every warehouse, read
+# with one query over the unique sku index and kept in a bounded LRU for
+# hot SKUs; narrow() cuts a payload down to the user's warehouses. Stock mutations drop the affected products once their
+# transaction commits. The cache is per process; CACHE_TTL bounds how
+# long another process's write can go unseen.
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Product
+from .routers import LEDGER
+
+CACHE_SIZE = getattr(settings, "INVENTORY_SCAN_CACHE_SIZE", 4096)  # SKUs
+CACHE_TTL  = getattr(settings, "INVENTORY_SCAN_CACHE_TTL", 30)     # seconds
+
+_lock    = threading.Lock()
+_entries = OrderedDict()  # sku -> (loaded_at, product_id, payload), oldest first
+_skus    = {}             # product_id -> cached sku
+_dropped = {}             # product_id -> _seq value when last invalidated
+_seq     = 0
+
+
+def _load(sku):
+    rows = list(
+        Product.objects.filter(sku=sku)
+        .values_list(
+            "id", "name", "sku", "default_uom",
+            "inventory_records__warehouse_id",
+            "inventory_records__warehouse__name",
+            "inventory_records__quantity_on_hand",
+            "inventory_records__quantity_reserved",
+            "inventory_records__reorder_point",
+        )
+        .order_by("inventory_records__warehouse_id")
+    )
+    if not rows:
+        return None
+    product_id, name, sku, default_uom = rows[0][:4]
+    stock = [
+        {
+            "warehouse_id":  warehouse_id,
+            "warehouse":     warehouse_name,
+            "on_hand":       on_hand,
+            "reserved":      reserved,
+            "available":     on_hand - reserved,
+            "reorder_point": reorder_point,
+        }
+        for *_, warehouse_id, warehouse_name, on_hand, reserved, reorder_point in rows
+        if warehouse_id is not None
+    ]
+    return {
+        "product": {"id": product_id, "name": name, "sku": sku, "default_uom": default_uom},
+        "stock":   stock,
+        "totals": {
+            "on_hand":   sum(s["on_hand"] for s in stock),
+            "available": sum(s["available"] for s in stock),
+        },
+    }
+
+
+def lookup(sku):
+    """The scan payload for ``sku``, or None if no product has it."""
+    with _lock:
+        entry = _entries.get(sku)
+        if entry is not None and time.monotonic() - entry[0] < CACHE_TTL:
+            _entries.move_to_end(sku)
+            return entry[2]
+        started = _seq
+
+    payload = _load(sku)
+    if payload is None:
+        return None
+
+    product_id = payload["product"]["id"]
+    with _lock:
+        # Skip caching if a write to this product was invalidated after we
+        # started reading: our rows may predate its commit
+        if _dropped.get(product_id, -1) <= started:
+            _entries[sku] = (time.monotonic(), product_id, payload)
+            _entries.move_to_end(sku)
+            _skus[product_id] = sku
+            while len(_entries) > CACHE_SIZE:
+                _, (_, evicted, _) = _entries.popitem(last=False)
+                _skus.pop(evicted, None)
+    return payload
+
+
+def narrow(payload, warehouse_ids):
+    """``payload`` with only the balances in ``warehouse_ids`` (None: all), totals to match."""
+    if warehouse_ids is None:
+        return payload
+    stock = [s for s in payload["stock"] if s["warehouse_id"] in warehouse_ids]
+    return {
+        **payload,
+        "stock":  stock,
+        "totals": {
+            "on_hand":   sum(s["on_hand"] for s in stock),
+            "available": sum(s["available"] for s in stock),
+        },
+    }
+
+
+def invalidate(product_ids):
+    global _seq
+    with _lock:
+        _seq += 1
+        for product_id in product_ids:
+            _dropped[product_id] = _seq
+            sku = _skus.pop(product_id, None)
+            if sku is not None:
+                _entries.pop(sku, None)
+
+
+def stock_changed(product_ids):
+    """Drop the products' cached balances once the current transaction commits."""
+    product_ids = set(product_ids)
+    invalidate(product_ids)  # readers started from now on won't re-cache pre-commit rows
+    transaction.on_commit(lambda: invalidate(product_ids), using=LEDGER)
+
+
+# Signal receivers (connected in InventoryConfig.ready)
+def record_saved(sender, instance, **kwargs):
+    stock_changed([instance.product_id])
+
+
+def product_changed(sender, instance, **kwargs):
+    stock_changed([instance.pk])
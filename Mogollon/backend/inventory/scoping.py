@@ -0,0 +1,68 @@
+# inventory/scoping.py
+#
+# Which warehouses a user's inventory reads cover. Admins and sales reps
+# see every warehouse; anyone else with WarehouseAssignment rows sees only
+# those warehouses, so a picker at one site no longer downloads every
+# site's records and history. Users without assignments keep seeing
+# everything until an admin assigns them; anonymous reads see nothing.
+#
+# Assignments are loaded once into process memory (refreshed on change and
+# after CACHE_TTL, as in inventory.uom) and the answer is kept on the
+# request, so scoping a view costs no query of its own.
+
+import threading
+import time
+
+from django.conf import settings
+
+from .models import WarehouseAssignment
+
+CACHE_TTL      = getattr(settings, "INVENTORY_SCOPE_CACHE_TTL", 300)  # seconds
+UNSCOPED_ROLES = {"admin", "sales-rep"}
+
+_lock  = threading.Lock()
+_cache = {"assignments": None, "loaded_at": 0.0}
+
+
+def _load():
+    # {user_id: (warehouse_id, ...)}
+    assignments = {}
+    for user_id, warehouse_id in WarehouseAssignment.objects.order_by("user_id", "warehouse_id").values_list("user_id", "warehouse_id"):
+        assignments.setdefault(user_id, []).append(warehouse_id)
+    return {user_id: tuple(ids) for user_id, ids in assignments.items()}
+
+
+def _assignments():
+    with _lock:
+        if _cache["assignments"] is None or time.monotonic() - _cache["loaded_at"] > CACHE_TTL:
+            _cache["assignments"] = _load()
+            _cache["loaded_at"] = time.monotonic()
+        return _cache["assignments"]
+
+
+def invalidate(**kwargs):
+    """Signal receiver: drop the cached assignments after any change."""
+    with _lock:
+        _cache["assignments"] = None
+
+
+def warehouse_ids(user):
+    """The warehouse ids ``user`` is scoped to, or None for every warehouse."""
+    if not user.is_authenticated:
+        return ()  # anonymous reads see no warehouse
+    if user.is_superuser or user.role in UNSCOPED_ROLES:
+        return None
+    return _assignments().get(user.pk)
+
+
+def for_request(request):
+    """warehouse_ids() for the request's user, worked out once per request."""
+    if not hasattr(request, "_warehouse_ids"):
+        request._warehouse_ids = warehouse_ids(request.user)
+    return request._warehouse_ids
+
+
+def scope(qs, request, field="warehouse_id"):
+    """``qs`` narrowed to the request's warehouses along ``field``."""
+    ids = for_request(request)
+    return qs if ids is None else qs.filter(**{f"{field}__in": ids})
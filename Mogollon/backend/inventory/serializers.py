@@ -1,5 +1,19 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Product, Warehouse, InventoryRecord, InventoryTransaction
+from .models import (
+    Product,
+    Warehouse,
+    InventoryRecord,
+    InventoryTransaction,
+    Transfer,
+    Reservation,
+    ReorderSuggestion,
+    UnitConversion,
+    CycleCount,
+    CycleCountLine,
+    Lot,
+)
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,9 +21,47 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "sku", "default_uom"]
 
 class WarehouseSerializer(serializers.ModelSerializer):
+    latitude  = serializers.DecimalField(max_digits=9, decimal_places=6, min_value=-90,  max_value=90,  required=False, allow_null=True)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6, min_value=-180, max_value=180, required=False, allow_null=True)
+
     class Meta:
         model  = Warehouse
-        fields = ["id", "name", "location"]
+        fields = ["id", "name", "location", "latitude", "longitude"]
+
+    def validate(self, attrs):
+        latitude  = attrs.get("latitude",  getattr(self.instance, "latitude",  None))
+        longitude = attrs.get("longitude", getattr(self.instance, "longitude", None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("latitude and longitude must be given together.")
+        return attrs
+
+class UnitConversionSerializer(serializers.ModelSerializer):
+    # null product_id = global conversion
+    product_id = serializers.PrimaryKeyRelatedField(
+        source="product", queryset=Product.objects.all(), allow_null=True, default=None
+    )
+    factor = serializers.DecimalField(max_digits=18, decimal_places=6, min_value=Decimal("0.000001"))
+
+    class Meta:
+        model  = UnitConversion
+        fields = ["id", "product_id", "from_uom", "to_uom", "factor"]
+        # uniqueness is checked case-insensitively in validate()
+        validators = []
+
+    def validate(self, attrs):
+        def current(field):
+            return attrs.get(field, getattr(self.instance, field, None))
+
+        clash = UnitConversion.objects.filter(
+            product=current("product"),
+            from_uom__iexact=current("from_uom"),
+            to_uom__iexact=current("to_uom"),
+        )
+        if self.instance is not None:
+            clash = clash.exclude(pk=self.instance.pk)
+        if clash.exists():
+            raise serializers.ValidationError("A conversion between these units already exists.")
+        return attrs
 
 class InventoryRecordSerializer(serializers.ModelSerializer):
     # write‐only PKs
@@ -18,6 +70,8 @@ class InventoryRecordSerializer(serializers.ModelSerializer):
     # read‐only nested
     product      = ProductSerializer(read_only=True)
     warehouse    = WarehouseSerializer(read_only=True)
+    # on hand − active holds; plain column arithmetic, no summing at read time
+    quantity_available = serializers.DecimalField(max_digits=12, decimal_places=3, read_only=True)
 
     class Meta:
         model  = InventoryRecord
@@ -26,18 +80,272 @@ class InventoryRecordSerializer(serializers.ModelSerializer):
             "product", "warehouse",
             "product_id", "warehouse_id",
             "quantity_on_hand", "reorder_point",
+            "quantity_reserved", "quantity_available",
         ]
+        # Stock moves only through the ledger endpoints, which keep lots,
+        # cost layers and the outbox in step with the balance
+        read_only_fields = ["quantity_on_hand", "quantity_reserved"]
+
+class LotReceiptMixin(serializers.Serializer):
+    # An intake may name the lot it fills, and what it cost
+    lot_number = serializers.CharField(max_length=100, write_only=True, required=False)
+    expires_on = serializers.DateField(write_only=True, required=False, allow_null=True)
+    unit_cost  = serializers.DecimalField(max_digits=14, decimal_places=4, min_value=Decimal(0), required=False, allow_null=True)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get("expires_on") and not attrs.get("lot_number"):
+            raise serializers.ValidationError({"expires_on": "An expiry date needs a lot_number."})
+        if attrs.get("lot_number") and attrs.get("transaction_type") != "intake":
+            raise serializers.ValidationError({"lot_number": "Only intakes name a lot; depletions draw first-expiring lots."})
+        if attrs.get("unit_cost") is not None and attrs.get("transaction_type") != "intake":
+            raise serializers.ValidationError({"unit_cost": "Only intakes carry a unit_cost; depletions are costed FIFO."})
+        return attrs
 
-class InventoryTransactionSerializer(serializers.ModelSerializer):
+class InventoryTransactionSerializer(LotReceiptMixin, serializers.ModelSerializer):
     record_id  = serializers.PrimaryKeyRelatedField(source="record", queryset=InventoryRecord.objects.all(), write_only=True)
+    quantity   = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0.001"))
     created_by = serializers.StringRelatedField(read_only=True)
 
     class Meta:
         model  = InventoryTransaction
         fields = [
             "id", "record_id",
+            "transaction_type", "quantity", "uom", "base_quantity",
+            "reason", "reference", "notes",
+            "lot_number", "expires_on",
+            "unit_cost", "cost",
+            "transfer",
+            "created_by", "created_at",
+        ]
+        read_only_fields = ["base_quantity", "cost", "transfer", "created_by", "created_at"]
+
+class BulkTransactionLineSerializer(LotReceiptMixin, serializers.ModelSerializer):
+    product_id   = serializers.IntegerField()
+    warehouse_id = serializers.IntegerField()
+    quantity     = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0.001"))
+
+    class Meta:
+        model  = InventoryTransaction
+        fields = [
+            "product_id", "warehouse_id",
             "transaction_type", "quantity", "uom",
             "reason", "reference", "notes",
+            "lot_number", "expires_on", "unit_cost",
+        ]
+
+class BulkTransactionSerializer(serializers.Serializer):
+    transactions = BulkTransactionLineSerializer(many=True)
+
+    def validate_transactions(self, lines):
+        if not lines:
+            raise serializers.ValidationError("At least one transaction is required.")
+        for model, field in ((Product, "product_id"), (Warehouse, "warehouse_id")):
+            ids = {line[field] for line in lines}
+            unknown = sorted(ids - set(model.objects.filter(pk__in=ids).values_list("pk", flat=True)))
+            if unknown:
+                raise serializers.ValidationError(f"Unknown {field}(s): {unknown}")
+        return lines
+
+class TransferTransactionSerializer(serializers.ModelSerializer):
+    record_id    = serializers.IntegerField(read_only=True)
+    product_id   = serializers.IntegerField(source="record.product_id",   read_only=True)
+    warehouse_id = serializers.IntegerField(source="record.warehouse_id", read_only=True)
+
+    class Meta:
+        model  = InventoryTransaction
+        fields = [
+            "id", "record_id", "product_id", "warehouse_id",
+            "transaction_type", "quantity", "uom", "cost",
+        ]
+
+class TransferLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity   = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0.001"))
+    uom        = serializers.CharField(max_length=50)
+
+class TransferSerializer(serializers.ModelSerializer):
+    # write‐only PKs
+    from_warehouse_id = serializers.PrimaryKeyRelatedField(source="from_warehouse", queryset=Warehouse.objects.all(), write_only=True)
+    to_warehouse_id   = serializers.PrimaryKeyRelatedField(source="to_warehouse",   queryset=Warehouse.objects.all(), write_only=True)
+    lines             = TransferLineSerializer(many=True, write_only=True)
+    # read‐only
+    from_warehouse = WarehouseSerializer(read_only=True)
+    to_warehouse   = WarehouseSerializer(read_only=True)
+    created_by     = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model  = Transfer
+        fields = [
+            "id",
+            "from_warehouse", "to_warehouse",
+            "from_warehouse_id", "to_warehouse_id",
+            "lines",
+            "reference", "notes",
             "created_by", "created_at",
         ]
         read_only_fields = ["created_by", "created_at"]
+
+    def to_internal_value(self, data):
+        # Accept the single-line form {product_id, quantity, uom, ...} too
+        if "lines" not in data and "product_id" in data:
+            data = data.dict() if hasattr(data, "dict") else dict(data)
+            data["lines"] = [{
+                "product_id": data.pop("product_id"),
+                "quantity":   data.pop("quantity", None),
+                "uom":        data.pop("uom", None),
+            }]
+        return super().to_internal_value(data)
+
+    def validate_lines(self, lines):
+        if not lines:
+            raise serializers.ValidationError("At least one line is required.")
+        product_ids = {line["product_id"] for line in lines}
+        known = set(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True))
+        unknown = sorted(product_ids - known)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown product_id(s): {unknown}")
+        return lines
+
+    def validate(self, attrs):
+        if attrs["from_warehouse"] == attrs["to_warehouse"]:
+            raise serializers.ValidationError("from_warehouse_id and to_warehouse_id must differ.")
+        return attrs
+
+class AllocationLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity   = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0.001"))
+
+class AllocationSerializer(serializers.Serializer):
+    PLAN    = "plan"
+    RESERVE = "reserve"
+    DEPLETE = "deplete"
+
+    lines           = AllocationLineSerializer(many=True)
+    latitude        = serializers.FloatField(min_value=-90,  max_value=90)
+    longitude       = serializers.FloatField(min_value=-180, max_value=180)
+    max_distance_km = serializers.FloatField(min_value=0, required=False)
+    action          = serializers.ChoiceField(choices=[PLAN, RESERVE, DEPLETE], default=PLAN)
+    allow_partial   = serializers.BooleanField(default=False)
+    reference       = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    notes           = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_lines(self, lines):
+        if not lines:
+            raise serializers.ValidationError("At least one line is required.")
+        product_ids = {line["product_id"] for line in lines}
+        unknown = sorted(product_ids - set(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown product_id(s): {unknown}")
+        return lines
+
+class ReservationSerializer(serializers.ModelSerializer):
+    # write‐only PKs
+    product_id   = serializers.PrimaryKeyRelatedField(source="product",   queryset=Product.objects.all(),   write_only=True)
+    warehouse_id = serializers.PrimaryKeyRelatedField(source="warehouse", queryset=Warehouse.objects.all(), write_only=True)
+    # read‐only
+    record_id      = serializers.IntegerField(read_only=True)
+    transaction_id = serializers.IntegerField(read_only=True)
+    created_by     = serializers.StringRelatedField(read_only=True)
+    quantity       = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0.001"))
+
+    class Meta:
+        model  = Reservation
+        fields = [
+            "id", "record_id",
+            "product_id", "warehouse_id",
+            "quantity", "status",
+            "reference", "notes", "expires_at",
+            "transaction_id",
+            "created_by", "created_at",
+        ]
+        read_only_fields = ["status", "created_by", "created_at"]
+        extra_kwargs = {"expires_at": {"required": False}}
+
+class ReorderSuggestionSerializer(serializers.ModelSerializer):
+    record_id        = serializers.IntegerField(read_only=True)
+    product          = ProductSerializer(source="record.product",     read_only=True)
+    warehouse        = WarehouseSerializer(source="record.warehouse", read_only=True)
+    quantity_on_hand = serializers.DecimalField(source="record.quantity_on_hand", max_digits=12, decimal_places=3, read_only=True)
+    reorder_point    = serializers.DecimalField(source="record.reorder_point",    max_digits=12, decimal_places=3, read_only=True)
+
+    class Meta:
+        model  = ReorderSuggestion
+        fields = [
+            "record_id", "product", "warehouse",
+            "quantity_on_hand", "reorder_point",
+            "daily_rate", "daily_std", "days_of_cover",
+            "suggested_reorder_point", "computed_at",
+        ]
+
+class CycleCountSerializer(serializers.ModelSerializer):
+    # write‐only
+    warehouse_id = serializers.PrimaryKeyRelatedField(source="warehouse", queryset=Warehouse.objects.all(), write_only=True)
+    product_ids  = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
+    # read‐only
+    warehouse   = WarehouseSerializer(read_only=True)
+    created_by  = serializers.StringRelatedField(read_only=True)
+    approved_by = serializers.StringRelatedField(read_only=True)
+    # annotated by CycleCountViewSet.get_queryset
+    line_count    = serializers.IntegerField(read_only=True)
+    counted_count = serializers.IntegerField(read_only=True)
+    variance_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model  = CycleCount
+        fields = [
+            "id", "warehouse", "warehouse_id", "product_ids",
+            "status", "notes", "snapshot_position",
+            "line_count", "counted_count", "variance_count",
+            "created_by", "created_at", "approved_by", "approved_at",
+        ]
+        read_only_fields = ["status", "snapshot_position", "created_at", "approved_at"]
+
+    def validate_product_ids(self, product_ids):
+        unknown = sorted(set(product_ids) - set(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown product_id(s): {unknown}")
+        return product_ids
+
+class CycleCountLineSerializer(serializers.ModelSerializer):
+    record_id     = serializers.IntegerField(read_only=True)
+    product_id    = serializers.IntegerField(source="record.product_id", read_only=True)
+    sku           = serializers.CharField(source="record.product.sku", read_only=True)
+    adjustment_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model  = CycleCountLine
+        fields = [
+            "id", "record_id", "product_id", "sku",
+            "snapshot_qty", "counted_qty", "variance",
+            "adjustment_id",
+        ]
+
+class CycleCountEntrySerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity   = serializers.DecimalField(max_digits=12, decimal_places=3, min_value=Decimal("0"))
+
+class CycleCountSubmitSerializer(serializers.Serializer):
+    counts = CycleCountEntrySerializer(many=True)
+
+    def validate_counts(self, counts):
+        if not counts:
+            raise serializers.ValidationError("At least one count is required.")
+        product_ids = {c["product_id"] for c in counts}
+        unknown = sorted(product_ids - set(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True)))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown product_id(s): {unknown}")
+        return counts
+
+class LotSerializer(serializers.ModelSerializer):
+    record_id = serializers.IntegerField(read_only=True)
+    product   = ProductSerializer(source="record.product",     read_only=True)
+    warehouse = WarehouseSerializer(source="record.warehouse", read_only=True)
+
+    class Meta:
+        model  = Lot
+        fields = [
+            "id", "record_id", "product", "warehouse",
+            "lot_number", "expires_on", "quantity_on_hand",
+            "created_at",
+        ]
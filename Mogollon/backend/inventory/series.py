@@ -0,0 +1,108 @@
+# inventory/series.py
+#
+# Stock-level history for one record, for charts. One query returns every
+# ledger row in the window with its balance afterwards: a running SUM()
+# OVER (ORDER BY created_at, id) of the signed quantities, anchored to
+# the present balance by a scalar subquery over the rows after the
+# window. The series is then cut down to at most N points with
+# Largest-Triangle-Three-Buckets, which keeps the peaks and drops that a
+# plain stride would skip.
+
+import numpy as np
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import InventoryTransaction
+
+MAX_POINTS = 2000
+
+
+def _signed():
+    return ExpressionWrapper(
+        Case(
+            When(transaction_type="intake", then=F("base_quantity")),
+            default=-F("base_quantity"),
+        ),
+        output_field=FloatField(),  # skip per-row Decimal conversion
+    )
+
+
+def lttb(x, y, n):
+    """Indices of the ``n`` points of (x, y) that Largest-Triangle-Three-Buckets keeps."""
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, n - 1).astype(int)  # n - 2 buckets between the end points
+    keep = np.empty(n, dtype=int)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < n - 1 else size
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def balance_series(record, start=None, end=None, points=500):
+    """
+    {"from", "to", "transactions", "series": [[epoch ms, balance], ...]}
+    for ``record`` between ``start`` and ``end`` (default: first movement
+    to now). The series opens with the balance at ``start`` and closes with
+    the balance at ``end``; in between at most ``points`` ledger points.
+    """
+    end = end or timezone.now()
+    points = max(3, min(points, MAX_POINTS))
+    ledger = InventoryTransaction.objects.filter(record_id=record.pk)
+    in_window = ledger.filter(created_at__lte=end)
+    if start:
+        in_window = in_window.filter(created_at__gte=start)
+
+    after_end = Coalesce(
+        Subquery(
+            ledger.filter(created_at__gt=end)
+            .values("record_id")
+            .annotate(net=Sum(_signed()))
+            .values("net")[:1]
+        ),
+        Value(0.0),
+    )
+    rows = list(
+        in_window.annotate(
+            running=Window(Sum(_signed()), order_by=[F("created_at").asc(), F("pk").asc()]),
+            window_net=Window(Sum(_signed())),
+            after_end=after_end,
+        )
+        .order_by("created_at", "pk")
+        .values_list("created_at", "running", "window_net", "after_end")
+    )
+
+    on_hand = float(record.quantity_on_hand)
+    if rows:
+        _, _, window_net, after = rows[0]
+        closing = on_hand - after
+        opening = closing - window_net
+        times = np.array([r[0].timestamp() * 1000 for r in rows])
+        balances = opening + np.array([r[1] for r in rows], dtype=float)
+        start = start or rows[0][0]
+    else:
+        net = ledger.filter(created_at__gt=end).aggregate(net=Sum(_signed()))["net"] or 0.0
+        closing = opening = on_hand - net
+        times, balances = np.empty(0), np.empty(0)
+        start = start or end
+
+    keep = lttb(times, balances, points)
+    series = (
+        [[int(start.timestamp() * 1000), round(opening, 3)]]
+        + [[int(t), round(float(b), 3)] for t, b in zip(times[keep], balances[keep])]
+        + [[int(end.timestamp() * 1000), round(closing, 3)]]
+    )
+    return {
+        "from":         start,
+        "to":           end,
+        "transactions": len(rows),
+        "series":       series,
+    }
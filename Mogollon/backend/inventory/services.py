@@ -0,0 +1,352 @@
+# inventory/services.py
+#
+# Stock mutation path shared by the inventory endpoints. Every change to
+# InventoryRecord.quantity_on_hand goes through post_movements() so that
+# records are locked in one deterministic order (primary key) and the
+# ledger rows are written in the same DB transaction as the balances.
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import costing, lots, outbox, scan, uom
+from .models import InventoryRecord, InventoryTransaction, Reservation, Transfer
+from .routers import LEDGER
+
+# How long a hold lasts when the caller doesn't pass expires_at
+RESERVATION_TTL = getattr(settings, "INVENTORY_RESERVATION_TTL", timedelta(hours=24))
+
+
+class ReservationNotActive(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        # shortages: list of (record, requested, available)
+        self.shortages = shortages
+        super().__init__("Insufficient stock for depletion.")
+
+    def as_response_data(self):
+        return {
+            "error": str(self),
+            "shortages": [
+                {
+                    "record_id":    record.id,
+                    "product_id":   record.product_id,
+                    "warehouse_id": record.warehouse_id,
+                    "requested":    requested,
+                    "available":    available,
+                }
+                for record, requested, available in self.shortages
+            ],
+        }
+
+
+def lock_records(keys):
+    """
+    Return {(product_id, warehouse_id): InventoryRecord} for every key,
+    creating missing records and locking all of them in primary-key order.
+    Must be called inside transaction.atomic(using=LEDGER).
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    product_ids   = {p for p, _ in keys}
+    warehouse_ids = {w for _, w in keys}
+
+    def matching():
+        rows = InventoryRecord.objects.filter(
+            product_id__in=product_ids, warehouse_id__in=warehouse_ids
+        ).values_list("id", "product_id", "warehouse_id")
+        return {(p, w): pk for pk, p, w in rows if (p, w) in keys}
+
+    ids = matching()
+    missing = keys - ids.keys()
+    if missing:
+        InventoryRecord.objects.bulk_create(
+            [InventoryRecord(product_id=p, warehouse_id=w) for p, w in missing],
+            ignore_conflicts=True,
+        )
+        ids = matching()
+
+    locked = lock_records_by_id(ids.values())
+    return {(r.product_id, r.warehouse_id): r for r in locked.values()}
+
+
+def lock_records_by_id(record_ids):
+    """Return {pk: InventoryRecord}, locked in primary-key order."""
+    locked = (
+        InventoryRecord.objects.select_related("product")
+        .select_for_update(of=("self",))
+        .filter(pk__in=list(record_ids))
+        .order_by("pk")
+    )
+    return {r.pk: r for r in locked}
+
+
+def post_movements(movements, receipts=None):
+    """
+    Apply unsaved InventoryTransaction rows to their (already locked)
+    records and write the ledger. Each row's quantity is converted to the
+    product's default UOM (base_quantity) before it touches the balance;
+    raises uom.UnitConversionError for an unknown unit. Depletions are checked against the
+    running balance, so several movements on one record are validated
+    cumulatively; nothing is written if any of them would go negative.
+    Lots and FIFO cost layers move along with the balances; see
+    lots.apply() for ``receipts``.
+    """
+    records   = {}
+    balances  = {}
+    shortages = []
+    for txn in movements:
+        record = records.setdefault(txn.record.pk, txn.record)
+        txn.record = record
+        txn.base_quantity = uom.to_base(record.product, txn.uom, txn.quantity)
+        balance = balances.get(record.pk, record.quantity_on_hand)
+        if txn.transaction_type == "intake":
+            balance += txn.base_quantity
+        elif balance - record.quantity_reserved < txn.base_quantity:
+            shortages.append((record, txn.base_quantity, balance - record.quantity_reserved))
+        else:
+            balance -= txn.base_quantity
+        balances[record.pk] = balance
+
+    if shortages:
+        raise InsufficientStock(shortages)
+
+    for pk, record in records.items():
+        record.quantity_on_hand = balances[pk]
+    InventoryRecord.objects.bulk_update(records.values(), ["quantity_on_hand"])
+    scan.stock_changed(r.product_id for r in records.values())
+    costs = costing.price(movements, receipts)
+    written = InventoryTransaction.objects.bulk_create(movements)
+    costing.write(costs)
+    outbox.append(written, lots.apply(written, receipts))
+    return written
+
+
+def receipt(lot_number=None, expires_on=None):
+    """The lots.apply() receipt for an intake into ``lot_number``, or None."""
+    return {"lot_number": lot_number, "expires_on": expires_on} if lot_number else None
+
+
+def post_transaction(product_id, warehouse_id, lot_number=None, expires_on=None, **fields):
+    """
+    Lock (or create) one record and post a single ledger row to it; an
+    intake with a ``lot_number`` fills that lot (created on first use).
+    """
+    with transaction.atomic(using=LEDGER):
+        record = lock_records([(product_id, warehouse_id)])[(product_id, warehouse_id)]
+        txn, = post_movements(
+            [InventoryTransaction(record=record, **fields)],
+            [receipt(lot_number, expires_on)],
+        )
+    return txn
+
+
+def post_bulk(lines, created_by=None):
+    """
+    Post many intake/depletion rows, possibly across records, in one DB
+    transaction; all or nothing. ``lines`` are dicts with product_id,
+    warehouse_id and the InventoryTransaction fields, plus lot_number and
+    expires_on for an intake into a lot. Returns the movements.
+    """
+    with transaction.atomic(using=LEDGER):
+        records = lock_records((line["product_id"], line["warehouse_id"]) for line in lines)
+        skip = ("product_id", "warehouse_id", "lot_number", "expires_on")
+        movements = [
+            InventoryTransaction(
+                record=records[(line["product_id"], line["warehouse_id"])],
+                created_by=created_by,
+                **{k: v for k, v in line.items() if k not in skip},
+            )
+            for line in lines
+        ]
+        return post_movements(
+            movements,
+            [receipt(line.get("lot_number"), line.get("expires_on")) for line in lines],
+        )
+
+
+def post_transfer(from_warehouse, to_warehouse, lines, created_by=None, reference=None, notes=None):
+    """
+    Move every line from one warehouse to another in a single DB
+    transaction: a depletion at the source and an intake at the
+    destination per line, both linked to one Transfer header. The lots
+    drawn at the source arrive as the same lots at the destination.
+    Returns (transfer, movements).
+    """
+    with transaction.atomic(using=LEDGER):
+        records = lock_records(
+            (line["product_id"], warehouse.pk)
+            for line in lines
+            for warehouse in (from_warehouse, to_warehouse)
+        )
+        transfer = Transfer.objects.create(
+            from_warehouse=from_warehouse,
+            to_warehouse=to_warehouse,
+            reference=reference,
+            notes=notes,
+            created_by=created_by,
+        )
+        movements, receipts = [], []
+        for line in lines:
+            common = {
+                "quantity":   line["quantity"],
+                "uom":        line["uom"],
+                "reason":     "transfer",
+                "reference":  reference,
+                "notes":      notes,
+                "transfer":   transfer,
+                "created_by": created_by,
+            }
+            movements.append(InventoryTransaction(
+                record=records[(line["product_id"], from_warehouse.pk)],
+                transaction_type="depletion",
+                **common,
+            ))
+            movements.append(InventoryTransaction(
+                record=records[(line["product_id"], to_warehouse.pk)],
+                transaction_type="intake",
+                **common,
+            ))
+            receipts += [None, {"lots_of": len(movements) - 2}]
+        post_movements(movements, receipts)
+    return transfer, movements
+
+
+def reserve(product_id, warehouse_id, quantity, expires_at=None, **fields):
+    """
+    Place a hold of ``quantity`` (in the product's default UOM) on available
+    stock; raises InsufficientStock if short.
+    """
+    reservation, = reserve_lines(
+        [{"product_id": product_id, "warehouse_id": warehouse_id, "quantity": quantity}],
+        expires_at=expires_at,
+        **fields,
+    )
+    return reservation
+
+
+def reserve_lines(lines, expires_at=None, **fields):
+    """
+    Place holds for many (product_id, warehouse_id, quantity) lines in one
+    DB transaction; all or nothing, checked cumulatively per record.
+    """
+    expires_at = expires_at or timezone.now() + RESERVATION_TTL
+    with transaction.atomic(using=LEDGER):
+        records = lock_records((line["product_id"], line["warehouse_id"]) for line in lines)
+        held = defaultdict(Decimal)
+        shortages = []
+        for line in lines:
+            record = records[(line["product_id"], line["warehouse_id"])]
+            held[record.pk] += line["quantity"]
+            if record.quantity_available < held[record.pk]:
+                shortages.append((record, line["quantity"], record.quantity_available - held[record.pk] + line["quantity"]))
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        reservations = Reservation.objects.bulk_create([
+            Reservation(
+                record=records[(line["product_id"], line["warehouse_id"])],
+                quantity=line["quantity"],
+                expires_at=expires_at,
+                **fields,
+            )
+            for line in lines
+        ])
+        changed = [r for r in records.values() if held[r.pk]]
+        for record in changed:
+            record.quantity_reserved += held[record.pk]
+        InventoryRecord.objects.bulk_update(changed, ["quantity_reserved"])
+        scan.stock_changed(r.product_id for r in changed)
+    return reservations
+
+
+def _lock_active_reservation(reservation_id):
+    # Record first, then the hold, so we follow the same order as the sweep
+    record_id = Reservation.objects.values_list("record_id", flat=True).get(pk=reservation_id)
+    record = lock_records_by_id([record_id])[record_id]
+    reservation = Reservation.objects.select_for_update().get(pk=reservation_id)
+    if reservation.status != Reservation.ACTIVE:
+        raise ReservationNotActive(f"Reservation is {reservation.status}.")
+    reservation.record = record
+    return reservation
+
+
+def release_reservation(reservation_id):
+    with transaction.atomic(using=LEDGER):
+        reservation = _lock_active_reservation(reservation_id)
+        record = reservation.record
+        record.quantity_reserved -= reservation.quantity
+        record.save(update_fields=["quantity_reserved"])
+        reservation.status = Reservation.RELEASED
+        reservation.save(update_fields=["status"])
+    return reservation
+
+
+def fulfil_reservation(reservation_id, created_by=None):
+    """Turn a hold into a client-order depletion in one DB transaction."""
+    with transaction.atomic(using=LEDGER):
+        reservation = _lock_active_reservation(reservation_id)
+        record = reservation.record
+        # Free the hold first so the depletion may consume the promised stock
+        record.quantity_reserved -= reservation.quantity
+        txn, = post_movements([InventoryTransaction(
+            record=record,
+            transaction_type="depletion",
+            quantity=reservation.quantity,
+            uom=record.product.default_uom,
+            reason="client_order",
+            reference=reservation.reference,
+            created_by=created_by,
+        )])
+        record.save(update_fields=["quantity_reserved"])
+        reservation.status = Reservation.FULFILLED
+        reservation.transaction = txn
+        reservation.save(update_fields=["status", "transaction"])
+    return reservation
+
+
+def expire_reservations(now=None, batch_size=500):
+    """
+    Release every active hold whose expires_at has passed, batch_size at a
+    time (walks the partial expiry index). Returns the number expired.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic(using=LEDGER):
+            batch = list(
+                Reservation.objects.filter(status=Reservation.ACTIVE, expires_at__lte=now)
+                .order_by("expires_at")
+                .values_list("pk", "record_id")[:batch_size]
+            )
+            if not batch:
+                return expired
+            lock_records_by_id({record_id for _, record_id in batch})
+            # Re-read under lock: a hold may have been fulfilled meanwhile
+            holds = list(
+                Reservation.objects.select_for_update()
+                .filter(pk__in=[pk for pk, _ in batch], status=Reservation.ACTIVE)
+                .values_list("pk", "record_id", "quantity")
+            )
+            per_record = defaultdict(Decimal)
+            for _, record_id, quantity in holds:
+                per_record[record_id] += quantity
+            for record_id, total in sorted(per_record.items()):
+                InventoryRecord.objects.filter(pk=record_id).update(
+                    quantity_reserved=F("quantity_reserved") - total
+                )
+            scan.stock_changed(
+                InventoryRecord.objects.filter(pk__in=per_record).values_list("product_id", flat=True)
+            )
+            expired += Reservation.objects.filter(pk__in=[pk for pk, _, _ in holds]).update(
+                status=Reservation.EXPIRED
+            )
@@ -0,0 +1,237 @@
+# inventory/snapshot.py
+#
+# Columnar copy of the ledger for offline analytics, so analysts read
+# memory-mapped arrays instead of paging JSON out of the API. Layout under
+# SNAPSHOT_DIR:
+#
+#   manifest.json       high-water mark, row counts, dictionaries
+#   2024-01/id.bin      one raw fixed-width array per column, one
+#   2024-01/product.bin directory per month of created_at (UTC)
+#   ...
+#
+# product, warehouse, type and reason are dictionary-encoded: the column
+# holds small integer codes and the manifest the values they stand for
+# (product and warehouse ids, type and reason strings; "" for no reason).
+# Quantities are exact integers in thousandths; cost is a float, NaN
+# where unknown.
+#
+# append() (run by the snapshot_ledger command) adds the settled ledger
+# rows past the manifest's high-water mark: each chunk is appended to its
+# months' files and then the manifest is replaced, so it is the commit
+# point. Bytes past the manifest's row counts, left by a run that died in
+# between, are cut off before the next append. The mark lives with the
+# files rather than in a Checkpoint, so a copied or deleted snapshot
+# can't disagree with it. Run a single writer.
+#
+# Snapshot reads a directory with numpy alone, so it works on a copy
+# without Django:
+#
+#   snap = Snapshot("/data/ledger")
+#   for month, cols in snap.scan(start="2024-01"):
+#       mask = cols["product"] == snap.code("product", 17)
+#       net = snap.signed(cols)[mask].sum() / SCALE
+
+import json
+import os
+from datetime import timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+
+SCALE   = 1000  # quantities are stored in thousandths
+VERSION = 1
+COLUMNS = {
+    "id":            "<i8",
+    "created_at":    "<M8[us]",  # UTC
+    "product":       "<u4",
+    "warehouse":     "<u2",
+    "type":          "u1",
+    "reason":        "u1",
+    "quantity":      "<i8",  # base_quantity × SCALE, in the product's default UOM
+    "cost":          "<f8",
+}
+DICTIONARIES = ("product", "warehouse", "type", "reason")
+MANIFEST     = "manifest.json"
+
+
+def _empty_manifest():
+    return {
+        "version":      VERSION,
+        "position":     0,
+        "rows":         0,
+        "scale":        SCALE,
+        "columns":      COLUMNS,
+        "dictionaries": {name: [] for name in DICTIONARIES},
+        "partitions":   {},
+    }
+
+
+class Snapshot:
+    """Read side: memory-maps a snapshot's partitions (numpy only)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        manifest = self.path / MANIFEST
+        self.manifest = json.loads(manifest.read_text()) if manifest.exists() else _empty_manifest()
+        self._codes = {}
+
+    @property
+    def partitions(self):
+        return sorted(self.manifest["partitions"])
+
+    def columns(self, month, names=None):
+        """{column: read-only memmap} for one month ("2024-01")."""
+        rows = self.manifest["partitions"][month]
+        out = {}
+        for name in names or self.manifest["columns"]:
+            dtype = np.dtype(self.manifest["columns"][name])
+            if rows:
+                out[name] = np.memmap(self.path / month / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,))
+            else:
+                out[name] = np.empty(0, dtype=dtype)
+        return out
+
+    def scan(self, start=None, end=None, names=None):
+        """(month, columns) for each month from ``start`` to ``end`` ("YYYY-MM", inclusive)."""
+        for month in self.partitions:
+            if (start and month < start) or (end and month > end):
+                continue
+            yield month, self.columns(month, names)
+
+    def values(self, column):
+        """What each code of a dictionary column stands for, indexable by the codes."""
+        return np.array(self.manifest["dictionaries"][column], dtype=object)
+
+    def code(self, column, value):
+        """The code of ``value`` in a dictionary column, or None if it never occurs."""
+        if column not in self._codes:
+            self._codes[column] = {v: i for i, v in enumerate(self.manifest["dictionaries"][column])}
+        return self._codes[column].get(value)
+
+    def signed(self, cols):
+        """Quantities as stock changes (intakes positive), in thousandths."""
+        intake = self.code("type", "intake")
+        return np.where(cols["type"] == intake, cols["quantity"], -cols["quantity"])
+
+    def net_by(self, column, start=None, end=None):
+        """{value: net stock change} per product or warehouse over the months given."""
+        size = len(self.manifest["dictionaries"][column])
+        totals = np.zeros(size, dtype=np.int64)
+        for _, cols in self.scan(start, end, names=[column, "type", "quantity"]):
+            totals += np.rint(np.bincount(cols[column], weights=self.signed(cols), minlength=size)).astype(np.int64)
+        return {value: total / SCALE for value, total in zip(self.manifest["dictionaries"][column], totals) if total}
+
+
+def _repair(path, manifest):
+    """Cut every column back to the manifest's row count (after an interrupted append)."""
+    for month in (d.name for d in path.iterdir() if d.is_dir()):
+        rows = manifest["partitions"].get(month, 0)
+        for name, dtype in COLUMNS.items():
+            target = path / month / f"{name}.bin"
+            size = rows * np.dtype(dtype).itemsize
+            if target.exists() and target.stat().st_size > size:
+                with open(target, "r+b") as fh:
+                    fh.truncate(size)
+
+
+def _write_manifest(path, manifest):
+    partial = path / f"{MANIFEST}.part"
+    with open(partial, "w") as fh:
+        json.dump(manifest, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(partial, path / MANIFEST)  # the commit point
+
+
+def _encode(values, dictionary, index):
+    """Codes for ``values``, growing ``dictionary`` (and its ``index``) with new ones."""
+    codes = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(dictionary)
+            dictionary.append(value)
+        codes[i] = code
+    return codes
+
+
+def default_path():
+    from django.conf import settings
+
+    return Path(getattr(settings, "INVENTORY_SNAPSHOT_DIR", settings.BASE_DIR / "snapshots" / "ledger"))
+
+
+def append(path=None, chunk_size=None, settle_delay=None):
+    """
+    Append the settled ledger rows past the high-water mark to the snapshot
+    at ``path``; returns how many were added.
+    """
+    from django.conf import settings
+    from django.db.models import ExpressionWrapper, F, FloatField
+    from django.utils import timezone
+
+    from .models import InventoryTransaction
+
+    path = Path(path or default_path())
+    chunk_size = chunk_size or getattr(settings, "INVENTORY_SNAPSHOT_CHUNK_SIZE", 100_000)
+    # Ledger rows younger than this wait for the next run, so a slow writer
+    # holding a lower id can't commit behind the high-water mark
+    if settle_delay is None:
+        settle_delay = getattr(settings, "INVENTORY_SNAPSHOT_SETTLE_DELAY", timedelta(seconds=60))
+
+    path.mkdir(parents=True, exist_ok=True)
+    manifest = Snapshot(path).manifest
+    _repair(path, manifest)
+    dictionaries = manifest["dictionaries"]
+    indexes = {name: {v: i for i, v in enumerate(dictionaries[name])} for name in DICTIONARIES}
+
+    def as_float(field):
+        return ExpressionWrapper(F(field), output_field=FloatField())  # skip per-row Decimal conversion
+
+    def as_utc(moment):
+        return timezone.make_naive(moment, dt_timezone.utc) if timezone.is_aware(moment) else moment
+
+    cutoff = timezone.now() - settle_delay
+    added = 0
+    while True:
+        rows = list(
+            InventoryTransaction.objects.filter(pk__gt=manifest["position"], created_at__lte=cutoff)
+            .order_by("pk")
+            .annotate(quantity_f=as_float("base_quantity"), cost_f=as_float("cost"))
+            .values_list(
+                "pk", "created_at", "record__product_id", "record__warehouse_id",
+                "transaction_type", "reason", "quantity_f", "cost_f",
+            )[:chunk_size]
+        )
+        if not rows:
+            break
+        ids, created, products, warehouses, types, reasons, quantities, costs = zip(*rows)
+        chunk = {
+            "id":         np.array(ids, dtype=COLUMNS["id"]),
+            "created_at": np.array([as_utc(t) for t in created], dtype=COLUMNS["created_at"]),
+            "quantity":   np.rint(np.array(quantities, dtype=float) * SCALE).astype(COLUMNS["quantity"]),
+            "cost":       np.array([np.nan if c is None else c for c in costs], dtype=COLUMNS["cost"]),
+        }
+        for name, values in (("product", products), ("warehouse", warehouses), ("type", types), ("reason", [r or "" for r in reasons])):
+            codes = _encode(values, dictionaries[name], indexes[name])
+            if len(dictionaries[name]) > np.iinfo(COLUMNS[name]).max + 1:
+                raise OverflowError(f"Too many distinct {name} values for {COLUMNS[name]} codes.")
+            chunk[name] = codes.astype(COLUMNS[name])
+
+        months = chunk["created_at"].astype("M8[M]")
+        for month in np.unique(months):
+            key = str(month)  # "2024-01"
+            take = months == month
+            (path / key).mkdir(exist_ok=True)
+            for name in COLUMNS:
+                with open(path / key / f"{name}.bin", "ab") as fh:
+                    fh.write(chunk[name][take].tobytes())
+                    fh.flush()
+                    os.fsync(fh.fileno())  # on disk before the manifest counts it
+            manifest["partitions"][key] = manifest["partitions"].get(key, 0) + int(take.sum())
+
+        manifest["position"] = int(chunk["id"][-1])
+        manifest["rows"] += len(rows)
+        _write_manifest(path, manifest)
+        added += len(rows)
+    return added
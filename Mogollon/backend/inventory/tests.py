@@ -1,3 +1,1116 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import close_old_connections, connections
+from django.db.models import Max, Sum
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api import models as legacy_models
+
+from . import allocation, analytics, coalescing, forecasting, idempotency, outbox, reconciliation, routers, scan, scoping, series, services, snapshot, uom
+from .models import (
+    Checkpoint,
+    CostLayer,
+    InventoryRecord,
+    InventoryTransaction,
+    Lot,
+    MovementRollup,
+    OutboxEvent,
+    Product,
+    ReorderSuggestion,
+    Reservation,
+    Transfer,
+    UnitConversion,
+    Warehouse,
+    WarehouseAssignment,
+)
+from .routers import LEDGER
+
+User = get_user_model()
+
+
+class InventoryAPITestCase(APITestCase):
+    # The ledger may live in its own database (see inventory.routers)
+    databases = "__all__"
+
+    def setUp(self):
+        # Process-wide caches outlive each test's rolled-back rows
+        uom.invalidate()
+        scoping.invalidate()
+        self.user = User.objects.create_user("admin", role="admin")
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(name="Milk", sku="MILK", default_uom="ea")
+        self.warehouse = Warehouse.objects.create(name="North", location="A")
+        self.other_warehouse = Warehouse.objects.create(name="South", location="B")
+
+    def post_movement(self, transaction_type, quantity, product=None, warehouse=None, headers=None, **fields):
+        return self.client.post("/api/inventory/transactions/", {
+            "product_id":       (product or self.product).pk,
+            "warehouse_id":     (warehouse or self.warehouse).pk,
+            "transaction_type": transaction_type,
+            "quantity":         str(quantity),
+            "uom":              fields.pop("uom", "ea"),
+            **fields,
+        }, format="json", headers=headers)
+
+    def record(self, product=None, warehouse=None):
+        return InventoryRecord.objects.get(product=product or self.product, warehouse=warehouse or self.warehouse)
+
+    def on_hand(self, product=None, warehouse=None):
+        return self.record(product, warehouse).quantity_on_hand
+
+
+class TransactionTests(InventoryAPITestCase):
+    def test_depletion_beyond_stock_is_rejected(self):
+        self.assertEqual(self.post_movement("intake", 10).status_code, 201)
+        response = self.post_movement("depletion", 11)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.on_hand(), 10)
+        self.assertEqual(InventoryTransaction.objects.count(), 1)
+
+    def test_non_positive_quantity_is_rejected(self):
+        for quantity in ("0", "-5"):
+            self.assertEqual(self.post_movement("intake", quantity).status_code, 400)
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_oversized_quantity_is_rejected(self):
+        self.assertEqual(self.post_movement("intake", "1000000000000").status_code, 400)
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+
+class TransferTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.milk = self.product
+        self.eggs = Product.objects.create(name="Eggs", sku="EGGS", default_uom="ea")
+        self.post_movement("intake", 10, product=self.milk)
+        self.post_movement("intake", 3, product=self.eggs)
+
+    def transfer(self, lines, to_warehouse=None):
+        return self.client.post("/api/inventory/transfers/", {
+            "from_warehouse_id": self.warehouse.pk,
+            "to_warehouse_id":   (to_warehouse or self.other_warehouse).pk,
+            "lines":             [{"product_id": p.pk, "quantity": str(q), "uom": "ea"} for p, q in lines],
+        }, format="json")
+
+    def test_transfer_moves_every_line(self):
+        response = self.transfer([(self.milk, 4), (self.eggs, 3)])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data["transactions"]), 4)
+        self.assertEqual((self.on_hand(self.milk), self.on_hand(self.milk, self.other_warehouse)), (6, 4))
+        self.assertEqual((self.on_hand(self.eggs), self.on_hand(self.eggs, self.other_warehouse)), (0, 3))
+        transfer = Transfer.objects.get()
+        self.assertEqual(transfer.transactions.count(), 4)
+
+    def test_short_line_rolls_back_the_whole_transfer(self):
+        response = self.transfer([(self.milk, 4), (self.eggs, 5)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([s["product_id"] for s in response.data["shortages"]], [self.eggs.pk])
+        self.assertEqual((self.on_hand(self.milk), self.on_hand(self.eggs)), (10, 3))
+        self.assertFalse(InventoryRecord.objects.filter(warehouse=self.other_warehouse, quantity_on_hand__gt=0).exists())
+        self.assertFalse(Transfer.objects.exists())
+        self.assertEqual(InventoryTransaction.objects.count(), 2)
+
+    def test_transfer_to_the_same_warehouse_is_rejected(self):
+        response = self.transfer([(self.milk, 1)], to_warehouse=self.warehouse)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transfer.objects.exists())
+
+
+class ReservationTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.post_movement("intake", 10)
+
+    def hold(self, quantity, **fields):
+        return self.client.post("/api/reservations/", {
+            "product_id":   self.product.pk,
+            "warehouse_id": self.warehouse.pk,
+            "quantity":     str(quantity),
+            **fields,
+        }, format="json")
+
+    def test_hold_blocks_depletion_of_reserved_stock(self):
+        self.assertEqual(self.hold(6).status_code, 201)
+        self.assertEqual(self.post_movement("depletion", 5).status_code, 400)
+        self.assertEqual(self.hold(5).status_code, 400)
+        self.assertEqual(self.post_movement("depletion", 4).status_code, 201)
+
+    def test_fulfil_depletes_and_frees_the_hold(self):
+        pk = self.hold(6).data["id"]
+        response = self.client.post(f"/api/reservations/{pk}/fulfil/")
+        self.assertEqual(response.data["status"], Reservation.FULFILLED)
+        record = self.record()
+        self.assertEqual((record.quantity_on_hand, record.quantity_reserved), (4, 0))
+        self.assertEqual(Reservation.objects.get(pk=pk).transaction.reason, "client_order")
+        # A settled hold can't be released or fulfilled again
+        self.assertEqual(self.client.post(f"/api/reservations/{pk}/release/").status_code, 400)
+        self.assertEqual(self.client.post(f"/api/reservations/{pk}/fulfil/").status_code, 400)
+
+    def test_release_returns_stock_to_available(self):
+        pk = self.hold(6).data["id"]
+        self.assertEqual(self.client.post(f"/api/reservations/{pk}/release/").data["status"], Reservation.RELEASED)
+        record = self.record()
+        self.assertEqual((record.quantity_on_hand, record.quantity_reserved), (10, 0))
+
+    def test_expired_holds_are_swept(self):
+        past = (timezone.now() - timedelta(minutes=1)).isoformat()
+        for _ in range(5):
+            self.hold("0.5", expires_at=past)
+        live = self.hold(1).data["id"]
+        self.assertEqual(self.record().quantity_reserved, Decimal("3.5"))
+
+        call_command("expire_reservations", batch_size=2, stdout=StringIO())
+        self.assertEqual(self.record().quantity_reserved, 1)
+        self.assertEqual(Reservation.objects.filter(status=Reservation.EXPIRED).count(), 5)
+        self.assertEqual(Reservation.objects.get(pk=live).status, Reservation.ACTIVE)
+
+
+class ForecastingTests(InventoryAPITestCase):
+    def test_compute_statistics(self):
+        rate, std, cover, rop = forecasting.compute(
+            np.array([1, 2]), np.array([30.0, 5.0]),
+            np.array([1, 1]), np.array([45.0, 45.0]),
+            window_days=90, lead_time_days=4, z=2,
+        )
+        self.assertEqual(rate.tolist(), [1.0, 0.0])
+        self.assertAlmostEqual(std[0], np.sqrt(2 * 45.0 ** 2 / 90 - 1))
+        self.assertEqual(cover[0], 30.0)
+        self.assertTrue(np.isnan(cover[1]))  # no demand, no cover estimate
+        self.assertAlmostEqual(rop[0], 4 + 2 * std[0] * 2)
+        self.assertEqual(rop[1], 0)
+
+    def test_run_writes_and_applies_suggestions(self):
+        self.post_movement("intake", 100)
+        for quantity in (5, 3, 7):
+            self.post_movement("depletion", quantity)
+        self.assertEqual(forecasting.run(apply=True), 1)
+        suggestion = ReorderSuggestion.objects.get(record=self.record())
+        self.assertEqual(suggestion.daily_rate, round(Decimal(15) / forecasting.WINDOW_DAYS, 4))
+        self.assertEqual(self.record().reorder_point, suggestion.suggested_reorder_point)
+
+        # Incremental runs only touch records with new, settled ledger rows
+        InventoryTransaction.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        forecasting.run()
+        self.assertEqual(forecasting.run(incremental=True), 0)
+        self.post_movement("intake", 3, warehouse=self.other_warehouse)
+        self.assertEqual(forecasting.run(incremental=True), 0)  # not settled yet
+        InventoryTransaction.objects.filter(record=self.record(warehouse=self.other_warehouse)).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(forecasting.run(incremental=True), 1)
+        self.assertTrue(ReorderSuggestion.objects.filter(record=self.record(warehouse=self.other_warehouse)).exists())
+
+    def test_transfers_and_corrections_are_not_demand(self):
+        self.post_movement("intake", 100)
+        self.post_movement("depletion", 6, reason="client_order")
+        forecasting.run()
+        rate = ReorderSuggestion.objects.get(record=self.record()).daily_rate
+
+        self.client.post("/api/inventory/transfers/", {
+            "from_warehouse_id": self.warehouse.pk,
+            "to_warehouse_id":   self.other_warehouse.pk,
+            "lines":             [{"product_id": self.product.pk, "quantity": "50", "uom": "ea"}],
+        }, format="json")
+        self.post_movement("depletion", 20, reason="adjustment")
+        forecasting.run()
+        self.assertEqual(self.on_hand(), 24)
+        self.assertEqual(ReorderSuggestion.objects.get(record=self.record()).daily_rate, rate)
+        self.assertEqual(rate, round(Decimal(6) / forecasting.WINDOW_DAYS, 4))
+
+
+class MovementAnalyticsTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        record = InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse)
+        start = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+        movements = InventoryTransaction.objects.bulk_create(
+            InventoryTransaction(
+                record=record,
+                transaction_type="intake" if i % 3 else "depletion",
+                quantity=i % 7 + 1,
+                base_quantity=i % 7 + 1,
+                uom="ea",
+                reason="damage" if i % 5 == 0 else None,
+            )
+            for i in range(200)
+        )
+        for i, movement in enumerate(movements):
+            InventoryTransaction.objects.filter(pk=movement.pk).update(created_at=start + timedelta(days=i % 120))
+
+    def expected(self, start, end, transaction_type):
+        return (
+            InventoryTransaction.objects.filter(created_at__date__range=(start, end), transaction_type=transaction_type)
+            .aggregate(total=Sum("base_quantity"))["total"]
+        )
+
+    def test_buckets_add_up_to_the_ledger(self):
+        self.assertEqual(analytics.catch_up(chunk_size=37), 200)
+        self.assertEqual(analytics.verify(), [])
+        # A range that cuts through weeks and months on both edges
+        start, end = date(2025, 1, 17), date(2025, 3, 12)
+        for bucket in ("day", "week", "month"):
+            response = self.client.get(f"/api/analytics/movements/?from={start}&to={end}&bucket={bucket}&group_by=reason")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["totals"]["intake_qty"], self.expected(start, end, "intake"), bucket)
+            self.assertEqual(response.data["totals"]["depletion_qty"], self.expected(start, end, "depletion"), bucket)
+
+    def test_verify_reports_drifted_buckets(self):
+        analytics.catch_up()
+        MovementRollup.objects.filter(granularity=MovementRollup.MONTH).update(intake_qty=0)
+        self.assertTrue(analytics.verify())
+        analytics.rebuild()
+        self.assertEqual(analytics.verify(), [])
+
+    def test_bad_parameters_are_rejected(self):
+        for query in (
+            "from=2025-02-30&to=2025-03-01",
+            "from=2025-03-01&to=2025-02-01",
+            "from=2025-01-01&to=2025-02-01&bucket=year",
+            "from=2025-01-01&to=2025-02-01&group_by=colour",
+            "from=2025-01-01&to=2025-02-01&product=abc",
+        ):
+            self.assertEqual(self.client.get(f"/api/analytics/movements/?{query}").status_code, 400, query)
+
+
+class UnitConversionTests(InventoryAPITestCase):
+    def add_conversion(self, from_uom, to_uom, factor, product=None):
+        response = self.client.post("/api/uom-conversions/", {
+            "product_id": product.pk if product else None,
+            "from_uom":   from_uom,
+            "to_uom":     to_uom,
+            "factor":     factor,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_unknown_unit_is_rejected(self):
+        self.assertEqual(self.post_movement("intake", 2, uom="case").status_code, 400)
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_quantities_are_stored_in_the_default_unit(self):
+        self.add_conversion("case", "EA", "12")
+        response = self.post_movement("intake", 2, uom="Case")  # units match case-insensitively
+        self.assertEqual(response.data["base_quantity"], "24.000")
+        # A product's own conversion beats the global one
+        self.add_conversion("case", "ea", "24", product=self.product)
+        self.assertEqual(self.post_movement("intake", 1, uom="case").data["base_quantity"], "24.000")
+        # ... and a conversion towards the default unit works backwards
+        self.add_conversion("ea", "pair", "0.5")
+        self.assertEqual(self.post_movement("depletion", 3, uom="pair").data["base_quantity"], "6.000")
+        self.assertEqual(self.on_hand(), 42)
+        self.assertEqual(
+            InventoryTransaction.objects.filter(transaction_type="intake").aggregate(total=Sum("base_quantity"))["total"],
+            48,
+        )
+
+
+class IdempotencyTests(InventoryAPITestCase):
+    def post_once(self, key, quantity=5, transaction_type="intake"):
+        return self.post_movement(transaction_type, quantity, headers={idempotency.HEADER: key})
+
+    def test_replay_moves_stock_once(self):
+        first = self.post_once("scan-1")
+        replay = self.post_once("scan-1")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replay.status_code, replay.data), (201, first.data))
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(self.on_hand(), 5)
+        self.assertEqual(InventoryTransaction.objects.count(), 1)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.post_once("scan-1")
+        self.assertEqual(self.post_once("scan-1", quantity=6).status_code, 422)
+        self.assertEqual(self.on_hand(), 5)
+
+    def test_failed_request_may_be_retried_with_its_key(self):
+        self.assertEqual(self.post_once("scan-2", transaction_type="depletion").status_code, 400)
+        self.post_movement("intake", 5)
+        self.assertEqual(self.post_once("scan-2", transaction_type="depletion").status_code, 201)
+        self.assertEqual(self.on_hand(), 0)
+
+    def test_keys_are_per_user_and_expire(self):
+        self.post_once("scan-1")
+        self.client.force_authenticate(User.objects.create_user("other", role="admin"))
+        self.assertEqual(self.post_once("scan-1").status_code, 201)
+        self.assertEqual(self.on_hand(), 10)
+
+        self.assertEqual(idempotency.purge_expired(now=timezone.now() + idempotency.TTL), 2)
+        self.assertEqual(self.post_once("scan-1").status_code, 201)
+        self.assertEqual(self.on_hand(), 15)
+
+
+class DashboardTests(InventoryAPITestCase):
+    def dashboard(self, query=""):
+        queries = [CaptureQueriesContext(connections[alias]) for alias in {"default", LEDGER}]
+        with ExitStack() as stack:
+            for context in queries:
+                stack.enter_context(context)
+            response = self.client.get(f"/api/inventory/dashboard/{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.data, sum(len(context) for context in queries)
+
+    def test_payload_and_kpis(self):
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse, quantity_on_hand=3, reorder_point=5)
+        InventoryRecord.objects.create(product=self.product, warehouse=self.other_warehouse, quantity_on_hand=9, reorder_point=5)
+        data, _ = self.dashboard()
+        self.assertEqual(data["columns"][:3], ["id", "product_id", "warehouse_id"])
+        self.assertEqual(len(data["records"]), 2)
+        self.assertEqual([p["sku"] for p in data["products"]], ["MILK"])
+        self.assertEqual(data["kpis"], {"total_units": 12, "low_stock": 1, "active_skus": 1, "warehouse_count": 2})
+
+        data, _ = self.dashboard(f"?warehouse={self.warehouse.pk}")
+        self.assertEqual(data["kpis"]["total_units"], 3)
+
+    def test_products_table_holds_only_listed_products(self):
+        eggs = Product.objects.create(name="Eggs", sku="EGGS", default_uom="ea")
+        Product.objects.create(name="Unstocked", sku="NONE", default_uom="ea")
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse)
+        InventoryRecord.objects.create(product=eggs, warehouse=self.other_warehouse)
+        data, _ = self.dashboard()
+        self.assertEqual([p["sku"] for p in data["products"]], ["MILK", "EGGS"])
+        data, _ = self.dashboard(f"?warehouse={self.other_warehouse.pk}")
+        self.assertEqual([p["sku"] for p in data["products"]], ["EGGS"])
+
+    def test_query_count_does_not_grow_with_records(self):
+        InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse)
+        _, few = self.dashboard()
+        products = Product.objects.bulk_create(Product(name=f"P{i}", sku=f"P{i}", default_uom="ea") for i in range(50))
+        InventoryRecord.objects.bulk_create(InventoryRecord(product=p, warehouse=self.other_warehouse) for p in products)
+        data, many = self.dashboard()
+        self.assertEqual(len(data["records"]), 51)
+        self.assertEqual(few, many)
+
+
+class ReconciliationTests(TransactionTestCase):
+    # Units are checked on a thread pool, which needs committed rows
+    databases = "__all__"
+
+    def setUp(self):
+        warehouses = [Warehouse.objects.create(name=f"W{i}", location="A") for i in range(2)]
+        products = Product.objects.bulk_create(Product(name=f"P{i}", sku=f"P{i}", default_uom="ea") for i in range(30))
+        services.post_bulk([
+            {"product_id": p.pk, "warehouse_id": w.pk, "transaction_type": "intake", "quantity": Decimal("1.1"), "uom": "ea"}
+            for p in products for w in warehouses
+        ])
+        self.records = list(InventoryRecord.objects.order_by("pk"))
+
+    def test_drift_is_found_and_repaired(self):
+        drifted = [self.records[3].pk, self.records[40].pk]
+        InventoryRecord.objects.filter(pk__in=drifted).update(quantity_on_hand=Decimal("7.5"))
+        InventoryTransaction.objects.filter(record=self.records[12]).delete()
+
+        units, found = reconciliation.check(workers=3, chunk_size=7)
+        self.assertEqual(units, 10)  # 30 records per warehouse, in slices of 7
+        self.assertEqual([d.record_id for d in found], sorted([*drifted, self.records[12].pk]))
+        self.assertEqual(found[0].difference, Decimal("6.4"))
+        with self.assertRaises(CommandError):
+            call_command("reconcile_inventory", stdout=StringIO())
+
+        written = reconciliation.repair(found)
+        self.assertEqual(len(written), 3)
+        self.assertEqual(reconciliation.check()[1], [])
+        # Balances are left alone, and the repairs aren't announced as stock movements
+        self.assertEqual(InventoryRecord.objects.get(pk=drifted[0]).quantity_on_hand, Decimal("7.5"))
+        self.assertEqual(OutboxEvent.objects.filter(topic=outbox.RECONCILE_TOPIC).count(), 3)
+
+
+class CycleCountTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.a, self.b, self.c = (Product.objects.create(name=n, sku=n, default_uom="ea") for n in "ABC")
+        for product in (self.a, self.b, self.c):
+            self.post_movement("intake", 10, product=product)
+        response = self.client.post("/api/cycle-counts/", {"warehouse_id": self.warehouse.pk}, format="json")
+        self.assertEqual(response.data["line_count"], 3)
+        self.session = response.data["id"]
+
+    def count(self, counts):
+        return self.client.post(f"/api/cycle-counts/{self.session}/counts/", {
+            "counts": [{"product_id": p.pk, "quantity": str(q)} for p, q in counts],
+        }, format="json")
+
+    def approve(self):
+        return self.client.post(f"/api/cycle-counts/{self.session}/approve/")
+
+    def test_movements_during_the_count_are_kept(self):
+        self.post_movement("depletion", 3, product=self.a)
+        self.post_movement("intake", 5, product=self.b)
+        self.assertEqual(self.count([(self.a, 9), (self.b, 10), (self.c, "12.5")]).data["updated"], 3)
+        variances = self.client.get(f"/api/cycle-counts/{self.session}/lines/?variance=1").data["results"]
+        self.assertEqual(len(variances), 2)
+
+        response = self.approve()
+        self.assertEqual((response.status_code, response.data["adjustments"]), (200, 2))
+        on_hand = [self.on_hand(p) for p in (self.a, self.b, self.c)]
+        self.assertEqual(on_hand, [6, 15, Decimal("12.5")])
+        self.assertEqual(self.approve().status_code, 400)  # no longer open
+
+    def test_count_below_what_left_the_shelf_is_rejected(self):
+        self.post_movement("depletion", 8, product=self.a)
+        self.count([(self.a, 5)])
+        self.assertEqual(self.approve().status_code, 400)
+        self.assertEqual(self.on_hand(self.a), 2)
+
+    def test_short_count_releases_the_newest_holds(self):
+        old = services.reserve(self.a.pk, self.warehouse.pk, Decimal(4))
+        new = services.reserve(self.a.pk, self.warehouse.pk, Decimal(3))
+        self.count([(self.a, 5)])
+        response = self.approve()
+        self.assertEqual(response.data["released_reservations"], [new.pk])
+        record = self.record(self.a)
+        self.assertEqual((record.quantity_on_hand, record.quantity_reserved), (5, 4))
+        self.assertEqual(Reservation.objects.get(pk=old.pk).status, Reservation.ACTIVE)
+        self.assertEqual(Reservation.objects.get(pk=new.pk).status, Reservation.RELEASED)
+
+    def test_cancelled_count_posts_nothing(self):
+        self.count([(self.a, 1)])
+        self.assertEqual(self.client.post(f"/api/cycle-counts/{self.session}/cancel/").status_code, 200)
+        self.assertEqual(self.approve().status_code, 400)
+        self.assertEqual(self.on_hand(self.a), 10)
+
+
+class ScanTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        scan.invalidate([self.product.pk])  # a cached payload may predate this test's rows
+        self.post_movement("intake", 10)
+        self.post_movement("intake", 4, warehouse=self.other_warehouse)
+
+    def test_lookup_reports_every_warehouse(self):
+        response = self.client.get("/api/scan/MILK/")
+        self.assertEqual(response.data["product"]["id"], self.product.pk)
+        self.assertEqual([s["on_hand"] for s in response.data["stock"]], [10, 4])
+        self.assertEqual(response.data["totals"], {"on_hand": 14, "available": 14})
+        self.assertEqual(self.client.get("/api/scan/NOPE/").status_code, 404)
+
+    def test_cached_payload_follows_stock_changes(self):
+        self.client.get("/api/scan/MILK/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/scan/MILK/")
+
+        self.post_movement("depletion", 3)
+        services.reserve(self.product.pk, self.other_warehouse.pk, Decimal(1))
+        self.assertEqual(self.client.get("/api/scan/MILK/").data["totals"], {"on_hand": 11, "available": 10})
+
+        self.product.name = "Whole milk"
+        self.product.save()
+        self.assertEqual(self.client.get("/api/scan/MILK/").data["product"]["name"], "Whole milk")
+
+
+class LegacyMigrationTests(TransactionTestCase):
+    # The command's closing reconciliation runs on a thread pool
+    databases = "__all__"
+
+    def setUp(self):
+        uom.invalidate()
+        warehouse = legacy_models.Warehouse.objects.create(name="North", location="A")
+        bolts = legacy_models.Product.objects.create(name="Bolt", sku="BOLT", default_uom="ea")
+        nuts = legacy_models.Product.objects.create(name="Nut", sku="NUT", default_uom="ea")
+        self.bolts = legacy_models.Inventory.objects.create(product=bolts, warehouse=warehouse, quantity_on_hand=31, reorder_point=5)
+        self.nuts = legacy_models.Inventory.objects.create(product=nuts, warehouse=warehouse, quantity_on_hand=2)
+        rows = [
+            (self.bolts, 10, "ea", "intake"),
+            (self.bolts, 3, "ea", "depletion"),
+            (self.bolts, -1, "ea", "adjustment"),
+            (self.nuts, 4, "ea", "intake"),
+            (self.bolts, 2, "box", "intake"),  # no conversion yet
+            (self.nuts, 3, "ea", "depletion"),
+        ]
+        legacy_models.Transaction.objects.bulk_create(
+            legacy_models.Transaction(inventory=inv, quantity=q, uom=unit, type=kind, source="till") for inv, q, unit, kind in rows
+        )
+        legacy_models.Transaction.objects.update(created_at=datetime(2020, 5, 1, tzinfo=dt_timezone.utc))
+
+    def migrate(self):
+        call_command("migrate_legacy_inventory", chunk_size=2, stdout=StringIO())
+
+    def test_copy_stops_at_an_unknown_unit_and_resumes(self):
+        with self.assertRaises(CommandError):
+            self.migrate()
+        self.assertEqual(InventoryTransaction.objects.count(), 4)
+
+        UnitConversion.objects.create(from_uom="box", to_uom="ea", factor=12)
+        self.migrate()
+        bolts = InventoryRecord.objects.get(product__sku="BOLT")
+        nuts = InventoryRecord.objects.get(product__sku="NUT")
+        # Bolts: 10 - 3 - 1 + 24 = 30 from the ledger, +1 opening adjustment
+        # Nuts: 4 - 3 = 1 from the ledger, +1 opening adjustment
+        self.assertEqual((bolts.quantity_on_hand, bolts.reorder_point), (31, 5))
+        self.assertEqual(nuts.quantity_on_hand, 2)
+        self.assertEqual(InventoryTransaction.objects.filter(reference="legacy:opening").count(), 2)
+        self.assertEqual(
+            InventoryTransaction.objects.filter(reference="legacy:till").values_list("created_at", flat=True).distinct().get(),
+            datetime(2020, 5, 1, tzinfo=dt_timezone.utc),
+        )
+        # Migrated rows are announced like any other movement
+        self.assertEqual(OutboxEvent.objects.filter(topic=outbox.TOPIC).count(), 8)
+
+        # A rerun copies nothing twice
+        self.migrate()
+        self.assertEqual(InventoryTransaction.objects.count(), 8)
+
+
+class AllocationTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.near = Warehouse.objects.create(name="Near", location="a", latitude=32.3, longitude=-106.7)
+        self.mid = Warehouse.objects.create(name="Mid", location="b", latitude=33.0, longitude=-106.7)
+        self.far = Warehouse.objects.create(name="Far", location="c", latitude=40.0, longitude=-100.0)
+        self.a, self.b, self.c = (Product.objects.create(name=n, sku=n, default_uom="ea") for n in "ABC")
+        for product, warehouse, quantity in (
+            (self.a, self.near, 10), (self.b, self.near, 1),
+            (self.a, self.mid, 10), (self.b, self.mid, 10),
+            (self.c, self.far, 5),
+        ):
+            InventoryRecord.objects.create(product=product, warehouse=warehouse, quantity_on_hand=quantity)
+
+    def allocate(self, lines, **options):
+        return self.client.post("/api/allocations/", {
+            "lines":     [{"product_id": p.pk, "quantity": str(q)} for p, q in lines],
+            "latitude":  32.31,
+            "longitude": -106.75,
+            **options,
+        }, format="json")
+
+    def test_haversine(self):
+        self.assertAlmostEqual(float(allocation.haversine_km(0, 0, np.array([1.0]), np.array([0.0]))[0]), 111.195, places=2)
+
+    def test_fewest_shipments_beat_the_nearest_warehouse(self):
+        data = self.allocate([(self.a, 5), (self.b, 5)]).data
+        self.assertEqual(data["shipment_count"], 1)
+        self.assertEqual(data["shipments"][0]["warehouse_id"], self.mid.pk)
+        self.assertEqual(data["unfilled"], [])
+
+    def test_radius_limits_the_candidates(self):
+        data = self.allocate([(self.a, 5), (self.c, 8)], max_distance_km=200).data
+        self.assertEqual([s["warehouse_id"] for s in data["shipments"]], [self.near.pk])
+        self.assertEqual(data["unfilled"], [{"product_id": self.c.pk, "quantity": 8}])
+
+    def test_reserve_commits_the_plan(self):
+        lines = [(self.a, 15), (self.c, 8)]
+        self.assertEqual(self.allocate(lines, action="reserve").status_code, 400)  # C is short
+        self.assertFalse(Reservation.objects.exists())
+
+        response = self.allocate(lines, action="reserve", allow_partial=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["reservation_ids"]), 3)
+        reserved = InventoryRecord.objects.filter(quantity_reserved__gt=0).values("product_id").annotate(total=Sum("quantity_reserved"))
+        self.assertEqual({r["product_id"]: r["total"] for r in reserved}, {self.a.pk: 15, self.c.pk: 5})
+        # Held stock is not offered again
+        self.assertEqual(self.allocate([(self.a, 20)]).data["unfilled"], [{"product_id": self.a.pk, "quantity": 15}])
+
+    def test_deplete_posts_client_orders(self):
+        response = self.allocate([(self.a, 12)], action="deplete")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(InventoryTransaction.objects.filter(reason="client_order").values_list("base_quantity", flat=True)),
+            [2, 10],
+        )
+
+
+class WriteCoalescingTests(TransactionTestCase):
+    # Posts arrive from concurrent threads, which need committed rows
+    databases = "__all__"
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Milk", sku="MILK", default_uom="ea")
+        self.warehouse = Warehouse.objects.create(name="North", location="A")
+        services.post_transaction(self.product.pk, self.warehouse.pk, transaction_type="intake", quantity=Decimal(10), uom="ea")
+
+    def test_concurrent_posts_share_one_batch(self):
+        outcomes = []
+
+        def deplete():
+            try:
+                coalescing.post_transaction(self.product.pk, self.warehouse.pk, transaction_type="depletion", quantity=Decimal(2), uom="ea")
+                outcomes.append("posted")
+            except services.InsufficientStock:
+                outcomes.append("short")
+            finally:
+                close_old_connections()
+
+        # A window long enough for every thread to join the first batch
+        with mock.patch.object(coalescing, "WINDOW", 0.5), mock.patch.object(coalescing, "_apply", wraps=coalescing._apply) as apply:
+            threads = [threading.Thread(target=deplete) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(apply.call_count, 1)
+        self.assertEqual(sorted(outcomes), ["posted"] * 5 + ["short"] * 3)
+        record = InventoryRecord.objects.get()
+        self.assertEqual(record.quantity_on_hand, 0)
+        self.assertEqual(record.transactions.filter(transaction_type="depletion").count(), 5)
+        self.assertEqual(reconciliation.check()[1], [])
+
+
+class LotTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        self.post_movement("intake", 10, lot_number="A", expires_on=str(today + timedelta(days=20)))
+        self.post_movement("intake", 5, lot_number="B", expires_on=str(today + timedelta(days=3)))
+        self.post_movement("intake", 4, lot_number="C")
+        self.post_movement("intake", 5)  # received without a lot
+
+    def lots(self, warehouse=None):
+        return dict(Lot.objects.filter(record__warehouse=warehouse or self.warehouse).values_list("lot_number", "quantity_on_hand"))
+
+    def test_depletions_take_the_first_expiring_lots(self):
+        self.post_movement("depletion", 7)
+        self.assertEqual(self.lots(), {"A": 8, "B": 0, "C": 4})
+        self.post_movement("depletion", 14)
+        # Lots without an expiry go last, then stock received without a lot
+        self.assertEqual(self.lots(), {"A": 0, "B": 0, "C": 0})
+        self.assertEqual(self.on_hand(), 3)
+        depletion = InventoryTransaction.objects.filter(transaction_type="depletion").earliest("pk")
+        self.assertEqual(sorted(depletion.lot_movements.values_list("lot__lot_number", "quantity")), [("A", 2), ("B", 5)])
+
+    def test_transfer_carries_the_lots_it_drew(self):
+        response = self.client.post("/api/inventory/transfers/", {
+            "from_warehouse_id": self.warehouse.pk,
+            "to_warehouse_id":   self.other_warehouse.pk,
+            "lines":             [{"product_id": self.product.pk, "quantity": "7", "uom": "ea"}],
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.lots(self.other_warehouse), {"B": 5, "A": 2})
+        arrived = Lot.objects.get(record__warehouse=self.other_warehouse, lot_number="B")
+        self.assertEqual(arrived.expires_on, timezone.localdate() + timedelta(days=3))
+
+    def test_lot_fields_are_validated(self):
+        self.assertEqual(self.post_movement("depletion", 1, lot_number="A").status_code, 400)
+        self.assertEqual(self.post_movement("intake", 1, expires_on=str(timezone.localdate())).status_code, 400)
+
+    def test_expiring_lists_soonest_first(self):
+        data = self.client.get("/api/lots/expiring/?days=30").data
+        self.assertEqual([lot["lot_number"] for lot in data["results"]], ["B", "A"])
+        self.assertEqual([lot["lot_number"] for lot in self.client.get("/api/lots/expiring/?days=5").data["results"]], ["B"])
+        self.assertEqual(self.client.get("/api/lots/expiring/?days=soon").status_code, 400)
+
+    def test_record_balances_are_read_only(self):
+        record = self.record()
+        response = self.client.patch(f"/api/inventory/{record.pk}/", {"quantity_on_hand": "500", "quantity_reserved": "3", "reorder_point": "2"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        record.refresh_from_db()
+        self.assertEqual((record.quantity_on_hand, record.quantity_reserved, record.reorder_point), (24, 0, 2))
+
+
+class RouterTests(InventoryAPITestCase):
+    def test_tables_go_to_the_database_that_writes_them(self):
+        router = routers.InventoryRouter()
+        with mock.patch.object(routers, "LEDGER", "ledger"), mock.patch.object(routers, "ANALYTICS", "analytics"):
+            for model, alias in (
+                (InventoryRecord, "ledger"),
+                (Product,         "ledger"),
+                (MovementRollup,  "analytics"),
+                (User,            "default"),
+                (legacy_models.Inventory, "default"),
+            ):
+                self.assertEqual((router.db_for_read(model), router.db_for_write(model)), (alias, alias), model)
+                self.assertTrue(router.allow_migrate(alias, model._meta.app_label, model._meta.model_name))
+                self.assertFalse(router.allow_migrate("other", model._meta.app_label, model._meta.model_name))
+
+            # A checkpoint is saved back to the database it was read from
+            checkpoint = Checkpoint(name="rollups")
+            checkpoint._state.db = "analytics"
+            self.assertEqual(router.db_for_write(Checkpoint, instance=checkpoint), "analytics")
+            self.assertTrue(router.allow_migrate("ledger", "inventory", "checkpoint"))
+            self.assertTrue(router.allow_migrate("analytics", "inventory", "checkpoint"))
+
+    def test_deletes_clean_up_across_databases(self):
+        clerk = User.objects.create_user("clerk", role="warehouse-staff")
+        self.client.force_authenticate(clerk)
+        self.post_movement("intake", 5)
+        WarehouseAssignment.objects.create(user=clerk, warehouse=self.warehouse)
+        InventoryTransaction.objects.update(created_at=timezone.now() - timedelta(hours=1))  # settled
+        analytics.catch_up()
+        self.assertTrue(MovementRollup.objects.filter(product=self.product).exists())
+
+        clerk.delete()
+        self.assertIsNone(InventoryTransaction.objects.get().created_by_id)
+        self.assertFalse(WarehouseAssignment.objects.exists())
+
+        self.product.delete()
+        self.assertFalse(MovementRollup.objects.filter(product_id=self.product.pk).exists())
+        self.assertFalse(InventoryRecord.objects.exists())
+
+
+class SeriesTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.inventory = InventoryRecord.objects.create(product=self.product, warehouse=self.warehouse)
+        balance, movements = 0, []
+        for i in range(300):
+            quantity = i % 11 + 1
+            transaction_type = "intake" if balance < 30 or i % 2 else "depletion"
+            balance += quantity if transaction_type == "intake" else -quantity
+            movements.append(InventoryTransaction(
+                record=self.inventory, transaction_type=transaction_type, quantity=quantity, base_quantity=quantity, uom="ea",
+            ))
+        for i, movement in enumerate(InventoryTransaction.objects.bulk_create(movements)):
+            InventoryTransaction.objects.filter(pk=movement.pk).update(created_at=self.start + timedelta(hours=i))
+        InventoryRecord.objects.filter(pk=self.inventory.pk).update(quantity_on_hand=balance)
+        self.balance = balance
+
+    def series(self, **params):
+        return self.client.get(f"/api/inventory/{self.inventory.pk}/series/", params)
+
+    def replay(self, start, end):
+        balance, points = 0, []
+        for movement in InventoryTransaction.objects.order_by("created_at", "pk"):
+            balance += movement.base_quantity if movement.transaction_type == "intake" else -movement.base_quantity
+            if start <= movement.created_at <= end:
+                points.append(float(balance))
+        return points
+
+    def test_series_ends_at_on_hand(self):
+        response = self.series(points=50)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["transactions"], 300)
+        self.assertEqual(len(response.data["series"]), 52)  # opening, 50 points, closing
+        self.assertEqual(response.data["series"][0][1], 0)
+        self.assertEqual(response.data["series"][-1][1], self.balance)
+
+    def test_window_matches_a_replay_of_the_ledger(self):
+        start, end = self.start + timedelta(hours=100), self.start + timedelta(hours=140)
+        response = self.series(**{"from": start.isoformat(), "to": end.isoformat(), "points": 1000})
+        expected = self.replay(start, end)
+        self.assertEqual([balance for _, balance in response.data["series"][1:-1]], expected)
+        self.assertEqual(response.data["series"][-1][1], expected[-1])
+
+        # A window without movements is flat at the balance it falls on
+        response = self.series(**{"from": "2030-01-01", "to": "2030-01-02"})
+        self.assertEqual([balance for _, balance in response.data["series"]], [self.balance, self.balance])
+
+    def test_downsampling_keeps_spikes(self):
+        x = np.arange(10.0)
+        y = np.array([0, 0, 9, 0, 0, 0, -9, 0, 0, 0.0])
+        self.assertEqual(list(series.lttb(x, y, 4)), [0, 2, 6, 9])
+        self.assertEqual(len(series.lttb(x, y, 20)), 10)
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({"from": "2025-13-01"}, {"to": "soon"}, {"points": "many"}):
+            self.assertEqual(self.series(**params).status_code, 400, params)
+
+
+class FakeWebhook:
+    """Stands in for outbox.Pool: records each POST and answers with ``statuses`` in turn, then ``default``."""
+
+    def __init__(self, *statuses, default=200):
+        self.statuses, self.default = list(statuses), default
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def post(self, body, headers):
+        with self.lock:
+            self.requests.append((json.loads(gzip.decompress(body)), headers))
+            return self.statuses.pop(0) if self.statuses else self.default
+
+
+class OutboxTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.eggs = Product.objects.create(name="Eggs", sku="EGGS", default_uom="ea")
+        for product, quantity in ((self.product, 5), (self.eggs, 4), (self.product, 3), (self.eggs, 2), (self.product, 1)):
+            self.post_movement("intake", quantity, product=product)
+        OutboxEvent.objects.update(created_at=timezone.now() - timedelta(minutes=1))  # settled
+        self.executor = ThreadPoolExecutor(max_workers=outbox.LANES)
+        self.addCleanup(self.executor.shutdown)
+        stack = ExitStack()
+        stack.enter_context(mock.patch.object(outbox, "BATCH_SIZE", 2))
+        stack.enter_context(mock.patch.object(outbox.time, "sleep"))  # no backoff
+        self.addCleanup(stack.close)
+
+    def deliver(self, webhook, metrics=None):
+        return outbox.deliver(webhook, self.executor, metrics or outbox.Metrics())
+
+    def test_each_movement_queues_an_event(self):
+        events = list(OutboxEvent.objects.order_by("pk"))
+        self.assertEqual(len(events), 5)
+        self.assertEqual({event.topic for event in events}, {outbox.TOPIC})
+        payload = events[1].payload
+        self.assertEqual((payload["product_id"], payload["transaction_type"], payload["base_quantity"]), (self.eggs.pk, "intake", "4.000"))
+        self.assertEqual(payload["transaction_id"], InventoryTransaction.objects.order_by("pk")[1].pk)
+
+    def test_events_are_batched_in_order_per_record(self):
+        webhook = FakeWebhook()
+        self.assertEqual(self.deliver(webhook), 5)
+        self.assertEqual(self.deliver(webhook), 0)  # checkpoint moved past them
+        self.assertEqual(outbox.lag(), 0)
+
+        by_record = {}
+        for body, headers in webhook.requests:
+            ids = [event["id"] for event in body["events"]]
+            self.assertLessEqual(len(ids), 2)
+            self.assertEqual(set(body["events"][0]), {"id", "topic", "created_at", "data"})
+            self.assertEqual(headers["Idempotency-Key"], outbox.batch_key(reversed(ids)))
+            for event in body["events"]:
+                by_record.setdefault(event["data"]["record_id"], []).append(event["id"])
+        expected = {}
+        for pk, record_id in OutboxEvent.objects.order_by("pk").values_list("pk", "record_id"):
+            expected.setdefault(record_id, []).append(pk)
+        self.assertEqual(by_record, expected)
+
+    def test_failed_batches_are_retried_then_hold_the_checkpoint(self):
+        metrics = outbox.Metrics()
+        with mock.patch.object(outbox, "LANES", 1):  # a pass reads one batch
+            self.assertEqual(self.deliver(FakeWebhook(500, 503), metrics), 2)
+        self.assertEqual((metrics.retries, metrics.failures, metrics.events), (2, 0, 2))
+
+        with self.assertRaises(outbox.DeliveryError):
+            self.deliver(FakeWebhook(default=500))
+        self.assertEqual(outbox.lag(), 3)
+
+    def test_batch_key_depends_on_the_events_only(self):
+        self.assertEqual(outbox.batch_key([3, 1, 2]), outbox.batch_key([1, 2, 3]))
+        self.assertNotEqual(outbox.batch_key([1, 3]), outbox.batch_key([1, 2, 3]))
+        self.assertNotIn(outbox.TOPIC, outbox.batch_key([1]))
+
+    def test_only_recent_latencies_are_kept(self):
+        with mock.patch.object(outbox, "LATENCY_SAMPLES", 3):
+            metrics = outbox.Metrics()
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            metrics.request(seconds)
+        self.assertEqual(list(metrics.latencies), [0.2, 0.3, 0.4])
+        self.assertAlmostEqual(metrics.summary()["p50_ms"], 300.0)
+
+
+class CostLayerTests(InventoryAPITestCase):
+    def layers(self, warehouse=None):
+        return [
+            (layer.unit_cost, layer.quantity_remaining)
+            for layer in CostLayer.objects.filter(record=self.record(warehouse=warehouse), quantity_remaining__gt=0)
+        ]
+
+    def valuation(self, **params):
+        return self.client.get("/api/inventory/valuation/", params)
+
+    def test_depletions_consume_the_oldest_layers(self):
+        self.post_movement("intake", 10, unit_cost="2")
+        self.post_movement("intake", 5, unit_cost="3")
+        response = self.post_movement("depletion", 12)
+        self.assertEqual(Decimal(response.data["cost"]), Decimal("26"))  # 10 at 2, then 2 at 3
+        self.assertEqual(self.layers(), [(Decimal("3"), Decimal("3"))])
+        self.assertEqual(sum(q for _, q in self.layers()), self.on_hand())
+        self.assertEqual(self.valuation().data["total_value"], Decimal("9.00"))
+
+    def test_unit_cost_follows_the_entered_unit(self):
+        UnitConversion.objects.create(from_uom="case", to_uom="ea", factor=12)
+        self.post_movement("intake", 1, uom="case", unit_cost="24")
+        self.assertEqual(self.layers(), [(Decimal("2"), Decimal("12"))])
+        # An intake without a cost takes the latest known one
+        self.post_movement("intake", 3)
+        self.assertEqual(self.layers()[-1], (Decimal("2"), Decimal("3")))
+        self.assertEqual(self.post_movement("depletion", 1, unit_cost="5").status_code, 400)
+
+    def test_unknown_cost_is_reported_apart(self):
+        self.post_movement("intake", 4)
+        self.post_movement("intake", 6, unit_cost="1.5")
+        self.assertIsNone(self.post_movement("depletion", 5).data["cost"])  # draws on the uncosted layer
+        row = self.valuation().data["rows"][0]
+        self.assertEqual((row["quantity"], row["uncosted_quantity"], row["value"]), (Decimal(5), Decimal(0), Decimal("7.50")))
+
+    def test_transfers_carry_their_layers(self):
+        self.post_movement("intake", 4, unit_cost="1")
+        self.post_movement("intake", 4, unit_cost="5")
+        self.client.post("/api/inventory/transfers/", {
+            "from_warehouse_id": self.warehouse.pk,
+            "to_warehouse_id":   self.other_warehouse.pk,
+            "lines":             [{"product_id": self.product.pk, "quantity": "6", "uom": "ea"}],
+        }, format="json")
+        self.assertEqual(self.layers(), [(Decimal("5"), Decimal("2"))])
+        self.assertEqual(self.layers(self.other_warehouse), [(Decimal("1"), Decimal("4")), (Decimal("5"), Decimal("2"))])
+
+        eggs = Product.objects.create(name="Eggs", sku="EGGS", default_uom="ea")
+        self.post_movement("intake", 2, product=eggs, unit_cost="0.25")
+        data = self.valuation(group="product").data
+        self.assertEqual(data["total_value"], Decimal("24.50"))
+        self.assertEqual(
+            [(row["warehouse"], row["sku"], row["value"]) for row in data["rows"]],
+            [("North", "MILK", Decimal("10.00")), ("North", "EGGS", Decimal("0.50")), ("South", "MILK", Decimal("14.00"))],
+        )
+        self.assertEqual(len(self.valuation(warehouse=self.other_warehouse.pk).data["rows"]), 1)
+        self.assertEqual(self.valuation(group="lot").status_code, 400)
+
+
+class ScopingTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        expires_on = str(timezone.localdate() + timedelta(days=5))
+        self.post_movement("intake", 4, unit_cost="1", lot_number="N1", expires_on=expires_on)
+        self.post_movement("intake", 6, warehouse=self.other_warehouse, unit_cost="1", lot_number="S1", expires_on=expires_on)
+        self.south = self.record(warehouse=self.other_warehouse)
+
+    def as_user(self, username=None, role=None, warehouses=()):
+        if username is None:
+            self.client.force_authenticate(None)
+            return None
+        user = User.objects.create_user(username, role=role)
+        for warehouse in warehouses:
+            WarehouseAssignment.objects.create(user=user, warehouse=warehouse)
+        self.client.force_authenticate(user)
+        return user
+
+    def visible(self):
+        """Warehouse names seen by the record list, the dashboard and the valuation."""
+        listed = {row["warehouse"]["name"] for row in self.client.get("/api/inventory/").data}
+        dashboard = {row["name"] for row in self.client.get("/api/inventory/dashboard/").data["warehouses"]}
+        valued = {row["warehouse"] for row in self.client.get("/api/inventory/valuation/").data["rows"]}
+        self.assertEqual(listed, dashboard)
+        self.assertEqual(listed, valued)
+        return listed
+
+    def test_unscoped_roles_see_every_warehouse(self):
+        self.assertEqual(self.visible(), {"North", "South"})
+        self.as_user("rep", role="sales-rep", warehouses=[self.warehouse])
+        self.assertEqual(self.visible(), {"North", "South"})
+        # Staff nobody has assigned yet keep seeing everything
+        self.as_user("new-hire", role="warehouse-staff")
+        self.assertEqual(self.visible(), {"North", "South"})
+
+    def test_assigned_staff_see_their_warehouses(self):
+        picker = self.as_user("picker", role="warehouse-staff", warehouses=[self.warehouse])
+        self.assertEqual(self.visible(), {"North"})
+        self.assertEqual(self.client.get(f"/api/inventory/{self.south.pk}/").status_code, 404)
+        self.assertEqual(self.client.get("/api/inventory/dashboard/").data["kpis"]["total_units"], 4)
+        self.assertEqual(self.client.get("/api/inventory/valuation/").data["total_value"], Decimal("4.00"))
+
+        # A new assignment shows up without waiting for the cache to expire
+        WarehouseAssignment.objects.create(user=picker, warehouse=self.other_warehouse)
+        self.assertEqual(self.visible(), {"North", "South"})
+
+    def test_anonymous_reads_see_nothing(self):
+        self.as_user(None)
+        self.assertEqual(self.visible(), set())
+        self.assertEqual(self.client.get("/api/inventory/dashboard/").data["kpis"]["total_units"], 0)
+        self.assertEqual(self.client.get(f"/api/inventory/{self.south.pk}/").status_code, 404)
+        self.assertEqual(self.post_movement("intake", 1).status_code, 401)
+
+    def test_reservations_are_scoped(self):
+        holds = [
+            self.client.post("/api/reservations/", {
+                "product_id": self.product.pk, "warehouse_id": warehouse.pk, "quantity": "1",
+            }, format="json").data["id"]
+            for warehouse in (self.warehouse, self.other_warehouse)
+        ]
+        self.as_user("picker", role="warehouse-staff", warehouses=[self.warehouse])
+        self.assertEqual([hold["id"] for hold in self.client.get("/api/reservations/").data], holds[:1])
+        self.assertEqual(self.client.post(f"/api/reservations/{holds[1]}/release/").status_code, 404)
+
+    def test_lots_are_scoped(self):
+        self.as_user("picker", role="warehouse-staff", warehouses=[self.warehouse])
+        self.assertEqual([lot["lot_number"] for lot in self.client.get("/api/lots/").data["results"]], ["N1"])
+        self.assertEqual([lot["lot_number"] for lot in self.client.get("/api/lots/expiring/").data["results"]], ["N1"])
+
+    def test_cycle_counts_are_scoped(self):
+        sessions = [
+            self.client.post("/api/cycle-counts/", {"warehouse_id": warehouse.pk}, format="json").data["id"]
+            for warehouse in (self.warehouse, self.other_warehouse)
+        ]
+        self.as_user("picker", role="warehouse-staff", warehouses=[self.warehouse])
+        self.assertEqual([count["id"] for count in self.client.get("/api/cycle-counts/").data], sessions[:1])
+        self.assertEqual(self.client.get(f"/api/cycle-counts/{sessions[1]}/lines/").status_code, 404)
+        self.assertEqual(self.client.post(f"/api/cycle-counts/{sessions[1]}/cancel/").status_code, 404)
+
+    def test_reorder_suggestions_are_scoped(self):
+        forecasting.run()
+        self.as_user("picker", role="warehouse-staff", warehouses=[self.warehouse])
+        rows = self.client.get("/api/reorder-suggestions/").data["results"]
+        self.assertEqual([row["record_id"] for row in rows], [self.record().pk])
+
+    def test_scan_lists_only_the_users_warehouses(self):
+        scan.invalidate([self.product.pk])
+        self.assertEqual(self.client.get("/api/scan/MILK/").data["totals"]["on_hand"], 10)
+        self.as_user("picker", role="warehouse-staff", warehouses=[self.warehouse])
+        data = self.client.get("/api/scan/MILK/").data  # served from the shared cache
+        self.assertEqual([row["warehouse"] for row in data["stock"]], ["North"])
+        self.assertEqual(data["totals"], {"on_hand": 4, "available": 4})
+
+
+class SnapshotTests(InventoryAPITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        self.eggs = Product.objects.create(name="Eggs", sku="EGGS", default_uom="ea")
+        self.post_movements(datetime(2025, 1, 20, tzinfo=dt_timezone.utc), [
+            ("intake", 10, self.product, self.warehouse, "2"),
+            ("intake", "2.5", self.eggs, self.other_warehouse, None),
+            ("depletion", 3, self.product, self.warehouse, None),
+        ])
+        self.post_movements(datetime(2025, 2, 3, tzinfo=dt_timezone.utc), [
+            ("intake", 4, self.product, self.other_warehouse, "1"),
+        ])
+
+    def post_movements(self, when, movements):
+        """Post ``movements`` and date them ``when``, well past the settle delay."""
+        first = InventoryTransaction.objects.aggregate(last=Max("pk"))["last"] or 0
+        for transaction_type, quantity, product, warehouse, unit_cost in movements:
+            fields = {"unit_cost": unit_cost} if unit_cost else {}
+            self.post_movement(transaction_type, quantity, product=product, warehouse=warehouse, **fields)
+        InventoryTransaction.objects.filter(pk__gt=first).update(created_at=when)
+
+    def ledger_ids(self, snap):
+        return [int(i) for _, cols in snap.scan(names=["id"]) for i in cols["id"]]
+
+    def test_append_writes_monthly_columns(self):
+        self.assertEqual(snapshot.append(self.path), 4)
+        snap = snapshot.Snapshot(self.path)
+        self.assertEqual(snap.partitions, ["2025-01", "2025-02"])
+        self.assertEqual(snap.net_by("product"), {self.product.pk: 11.0, self.eggs.pk: 2.5})
+        self.assertEqual(snap.net_by("warehouse", start="2025-02"), {self.other_warehouse.pk: 4.0})
+
+        january = snap.columns("2025-01")
+        self.assertEqual(list(snap.signed(january)), [10000, 2500, -3000])
+        self.assertEqual(list(snap.values("type")[january["type"]]), ["intake", "intake", "depletion"])
+        self.assertEqual(january["cost"][0], 20.0)
+        self.assertTrue(np.isnan(january["cost"][1]))
+
+    def test_append_is_incremental_and_waits_for_settled_rows(self):
+        snapshot.append(self.path, chunk_size=3)
+        self.assertEqual(snapshot.append(self.path), 0)
+        self.post_movement("depletion", 1)  # too recent to copy yet
+        self.assertEqual(snapshot.append(self.path), 0)
+        self.assertEqual(snapshot.append(self.path, settle_delay=timedelta(0)), 1)
+        snap = snapshot.Snapshot(self.path)
+        self.assertEqual(self.ledger_ids(snap), list(InventoryTransaction.objects.order_by("pk").values_list("pk", flat=True)))
+        self.assertEqual(snap.net_by("product")[self.product.pk], float(self.on_hand() + self.on_hand(warehouse=self.other_warehouse)))
+
+    def test_truncated_run_is_repaired(self):
+        snapshot.append(self.path)
+        # A run that died after writing some column bytes but before the manifest
+        for name in ("id", "quantity"):
+            with open(f"{self.path}/2025-02/{name}.bin", "ab") as fh:
+                fh.write(b"\xff" * 13)
+        self.post_movements(datetime(2025, 2, 10, tzinfo=dt_timezone.utc), [("depletion", 2, self.product, self.other_warehouse, None)])
+
+        self.assertEqual(snapshot.append(self.path), 1)
+        snap = snapshot.Snapshot(self.path)
+        self.assertEqual(snap.manifest["partitions"], {"2025-01": 3, "2025-02": 2})
+        self.assertEqual(self.ledger_ids(snap), list(InventoryTransaction.objects.order_by("pk").values_list("pk", flat=True)))
+        self.assertEqual(snap.net_by("warehouse", start="2025-02"), {self.other_warehouse.pk: 2.0})
+
+    def test_command_rebuilds_from_scratch(self):
+        snapshot.append(self.path)
+        out = StringIO()
+        call_command("snapshot_ledger", path=self.path, rebuild=True, stdout=out)
+        self.assertIn("Appended 4 ledger row(s)", out.getvalue())
+        self.assertEqual(snapshot.Snapshot(self.path).manifest["rows"], 4)
@@ -0,0 +1,69 @@
+# inventory/uom.py
+#
+# Unit-of-measure conversion registry. UnitConversion rows are loaded once
+# into process memory (refreshed on change and after CACHE_TTL) and ledger
+# rows are converted at write time into InventoryTransaction.base_quantity,
+# expressed in the product's default UOM, so aggregates stay plain SUMs.
+
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import UnitConversion
+
+CACHE_TTL = getattr(settings, "INVENTORY_UOM_CACHE_TTL", 300)  # seconds
+QUANTUM   = Decimal("0.001")
+
+_lock  = threading.Lock()
+_cache = {"factors": None, "loaded_at": 0.0}
+
+
+class UnitConversionError(ValueError):
+    pass
+
+
+def normalize(uom):
+    return (uom or "").strip().lower()
+
+
+def _load():
+    # {(product_id or None, from, to): factor}; explicit rows beat inverses
+    rows = list(UnitConversion.objects.values_list("product_id", "from_uom", "to_uom", "factor"))
+    factors = {}
+    for product_id, from_uom, to_uom, factor in rows:
+        factors[(product_id, normalize(to_uom), normalize(from_uom))] = Decimal(1) / factor
+    for product_id, from_uom, to_uom, factor in rows:
+        factors[(product_id, normalize(from_uom), normalize(to_uom))] = factor
+    return factors
+
+
+def _factors():
+    with _lock:
+        if _cache["factors"] is None or time.monotonic() - _cache["loaded_at"] > CACHE_TTL:
+            _cache["factors"] = _load()
+            _cache["loaded_at"] = time.monotonic()
+        return _cache["factors"]
+
+
+def invalidate(**kwargs):
+    """Signal receiver: drop the cached registry after any UnitConversion change."""
+    with _lock:
+        _cache["factors"] = None
+
+
+def factor(product_id, from_uom, to_uom):
+    source, target = normalize(from_uom), normalize(to_uom)
+    if source == target:
+        return Decimal(1)
+    factors = _factors()
+    for key in ((product_id, source, target), (None, source, target)):
+        if key in factors:
+            return factors[key]
+    raise UnitConversionError(f"No conversion from '{from_uom}' to '{to_uom}'.")
+
+
+def to_base(product, uom, quantity):
+    """``quantity`` of ``uom`` expressed in ``product.default_uom``."""
+    return (quantity * factor(product.pk, uom, product.default_uom)).quantize(QUANTUM)
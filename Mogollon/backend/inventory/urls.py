@@ -2,16 +2,37 @@
 
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet, WarehouseViewSet, InventoryRecordViewSet
-from rfqs.views import RFQViewSet
+from .views import (
+    ProductViewSet,
+    UnitConversionViewSet,
+    WarehouseViewSet,
+    InventoryRecordViewSet,
+    ReservationViewSet,
+    ReorderSuggestionViewSet,
+    CycleCountViewSet,
+    LotViewSet,
+    MovementAnalyticsView,
+    ScanView,
+    AllocationView,
+)
+from rfqs.views import RFQAttachmentViewSet, RFQViewSet
 
 router = DefaultRouter()
 router.register(r'products',   ProductViewSet,        basename='product')
 router.register(r'warehouses', WarehouseViewSet,      basename='warehouse')
+router.register(r'uom-conversions', UnitConversionViewSet, basename='uom-conversion')
 router.register(r'inventory',  InventoryRecordViewSet, basename='inventory')
+router.register(r'reservations', ReservationViewSet,  basename='reservation')
+router.register(r'reorder-suggestions', ReorderSuggestionViewSet, basename='reorder-suggestion')
+router.register(r'cycle-counts', CycleCountViewSet,  basename='cycle-count')
+router.register(r'lots',        LotViewSet,            basename='lot')
 router.register(r'rfqs',        RFQViewSet,            basename='rfq')
+router.register(r'rfq-attachments', RFQAttachmentViewSet, basename='rfq-attachment')
 
 
 urlpatterns = [
+    path('analytics/movements/', MovementAnalyticsView.as_view(), name='movement-analytics'),
+    path('scan/<str:sku>/',       ScanView.as_view(),              name='scan'),
+    path('allocations/',          AllocationView.as_view(),        name='allocations'),
     path('', include(router.urls)),
 ]
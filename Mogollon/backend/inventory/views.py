@@ -1,16 +1,64 @@
-from rest_framework import viewsets, status
+from datetime import datetime, time
+
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db.models import Count, F, Q
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
 
-from .models import Product, Warehouse, InventoryRecord, InventoryTransaction
+from . import allocation, analytics, coalescing, costing, cycle_counts, lots, scan, scoping, series
+from .idempotency import idempotent
+from .models import (
+    Product,
+    Warehouse,
+    InventoryRecord,
+    InventoryTransaction,
+    Reservation,
+    ReorderSuggestion,
+    MovementRollup,
+    UnitConversion,
+    CycleCount,
+    Lot,
+)
 from .serializers import (
     ProductSerializer,
     WarehouseSerializer,
     InventoryRecordSerializer,
     InventoryTransactionSerializer,
+    BulkTransactionSerializer,
+    TransferSerializer,
+    TransferTransactionSerializer,
+    ReservationSerializer,
+    ReorderSuggestionSerializer,
+    UnitConversionSerializer,
+    AllocationSerializer,
+    CycleCountSerializer,
+    CycleCountLineSerializer,
+    CycleCountSubmitSerializer,
+    LotSerializer,
 )
+from .services import (
+    InsufficientStock,
+    ReservationNotActive,
+    fulfil_reservation,
+    post_bulk,
+    post_transaction,
+    post_transfer,
+    release_reservation,
+    reserve,
+    reserve_lines,
+)
+from .uom import UnitConversionError
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
@@ -22,13 +70,87 @@ class WarehouseViewSet(viewsets.ModelViewSet):
     serializer_class = WarehouseSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+class UnitConversionViewSet(viewsets.ModelViewSet):
+    """
+    GET, POST, PUT, DELETE on /api/uom-conversions/ (filter: product)
+    """
+    serializer_class = UnitConversionSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        qs = UnitConversion.objects.all()
+        product_id = self.request.query_params.get("product")
+        if product_id:
+            qs = qs.filter(product_id=product_id)
+        return qs
+
 class InventoryRecordViewSet(viewsets.ModelViewSet):
     queryset = InventoryRecord.objects.select_related("product", "warehouse")
     serializer_class = InventoryRecordSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    # Reads cover the user's warehouses only (inventory.scoping)
+    def get_queryset(self):
+        return scoping.scope(super().get_queryset(), self.request)
+
+    # Everything the inventory page needs in one response: records as flat
+    # id-based rows plus the deduplicated product/warehouse tables they
+    # reference and the KPIs.
+    # Three queries whatever the size; gzipped when the client accepts it.
+    DASHBOARD_COLUMNS = [
+        "id", "product_id", "warehouse_id",
+        "quantity_on_hand", "reorder_point", "quantity_reserved",
+    ]
+
+    @action(detail=False, methods=["get"], url_path="dashboard")
+    @method_decorator(gzip_page)
+    def dashboard(self, request):
+        records = scoping.scope(InventoryRecord.objects.order_by("pk"), request)
+        warehouse_id = request.query_params.get("warehouse")
+        if warehouse_id:
+            records = records.filter(warehouse_id=warehouse_id)
+        rows = list(records.values_list(*self.DASHBOARD_COLUMNS))
+
+        total_units = sum(row[3] for row in rows)
+        low_stock = sum(1 for row in rows if row[3] <= row[4])
+        return Response({
+            "columns":    self.DASHBOARD_COLUMNS,
+            "records":    rows,
+            "products":   list(
+                Product.objects.filter(pk__in=records.values("product_id"))
+                .order_by("pk")
+                .values("id", "name", "sku", "default_uom")
+            ),
+            "warehouses": list(
+                scoping.scope(Warehouse.objects.order_by("pk"), request, field="pk")
+                .values("id", "name", "location", "latitude", "longitude")
+            ),
+            "kpis": {
+                "total_units":     total_units,
+                "low_stock":       low_stock,
+                "active_skus":     len({row[1] for row in rows}),
+                "warehouse_count": len({row[2] for row in rows}),
+            },
+        })
+
+    # Stock value at FIFO cost from the open cost layers, per warehouse or,
+    # with ?group=product, per warehouse and product
+    @action(detail=False, methods=["get"])
+    def valuation(self, request):
+        group = request.query_params.get("group", "warehouse")
+        if group not in ("warehouse", "product"):
+            return Response({"error": "group must be warehouse or product."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(costing.valuation(
+            by_product=group == "product",
+            warehouse_id=request.query_params.get("warehouse"),
+            product_id=request.query_params.get("product"),
+            warehouse_ids=scoping.for_request(request),
+        ))
+
     # Global transactions endpoint: create intake or depletion, auto-creating records
+    # Scanners retry on flaky networks: send an Idempotency-Key header to post once
     @action(detail=False, methods=["post"], url_path="transactions")
+    @idempotent("inventory.transactions")
     def transactions(self, request):
         product_id = request.data.get("product_id")
         warehouse_id = request.data.get("warehouse_id")
@@ -39,43 +161,114 @@ class InventoryRecordViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Fetch the product so we know its default UOM
-        product = get_object_or_404(Product, pk=product_id)
+        product   = get_object_or_404(Product, pk=product_id)
+        warehouse = get_object_or_404(Warehouse, pk=warehouse_id)
 
-        # Auto-create (or get) the InventoryRecord, supplying the product's default UOM
+        # Auto-create (or get) the InventoryRecord so the serializer can validate against it
         record, created = InventoryRecord.objects.get_or_create(
-            product_id=product_id,
-            warehouse_id=warehouse_id,
-               defaults={
-           "quantity_on_hand": 0,
-           "reorder_point": 0,
-       },
-    )
+            product=product,
+            warehouse=warehouse,
+        )
 
         payload = request.data.copy()
         payload["record_id"] = record.id
         serializer = InventoryTransactionSerializer(data=payload)
         serializer.is_valid(raise_exception=True)
-        transaction = serializer.save(created_by=request.user)
-
-        if transaction.transaction_type == "intake":
-            record.quantity_on_hand += transaction.quantity
-        else:
-            if record.quantity_on_hand < transaction.quantity:
-                transaction.delete()
-                return Response(
-                    {"error": "Insufficient stock for depletion."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            record.quantity_on_hand -= transaction.quantity
-        record.save()
+        fields = dict(serializer.validated_data)
+        fields.pop("record")
+
+        # Balance check, ledger row and balance update happen under one row lock,
+        # or, with write coalescing on, in a micro-batch with concurrent posts
+        post = coalescing.post_transaction if coalescing.ENABLED else post_transaction
+        try:
+            txn = post(product.id, warehouse.id, created_by=request.user, **fields)
+        except InsufficientStock:
+            return Response(
+                {"error": "Insufficient stock for depletion."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except UnitConversionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(InventoryTransactionSerializer(txn).data, status=status.HTTP_201_CREATED)
+
+    # Many intake/depletion rows across records, posted atomically
+    @action(detail=False, methods=["post"], url_path="transactions/bulk")
+    @idempotent("inventory.transactions.bulk")
+    def bulk_transactions(self, request):
+        serializer = BulkTransactionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        try:
+            movements = post_bulk(serializer.validated_data["transactions"], created_by=request.user)
+        except InsufficientStock as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        except UnitConversionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {"transactions": InventoryTransactionSerializer(movements, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    # Inter-warehouse transfer: one or many lines moved atomically
+    @action(detail=False, methods=["post"], url_path="transfers")
+    @idempotent("inventory.transfers")
+    def transfers(self, request):
+        serializer = TransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            transfer, movements = post_transfer(created_by=request.user, **serializer.validated_data)
+        except InsufficientStock as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        except UnitConversionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = TransferSerializer(transfer).data
+        data["transactions"] = TransferTransactionSerializer(movements, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    # CSV export of inventory, written by the background worker
+    @action(detail=False, methods=["post"], url_path="exports")
+    def exports(self, request):
+        job = enqueue(
+            "inventory.export",
+            {"warehouse_id": request.data.get("warehouse_id"), "warehouse_ids": scoping.for_request(request)},
+            created_by=request.user,
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    # Stock level over time for charts, downsampled on the server:
+    # ?from=&to= (dates or datetimes) &points=N
+    @action(detail=True, methods=["get"])
+    def series(self, request, pk=None):
+        record = get_object_or_404(self.get_queryset(), pk=pk)
+        params = request.query_params
+        bounds = {}
+        for name, end_of_day in (("from", False), ("to", True)):
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                moment, day = parse_datetime(value), parse_date(value)
+            except ValueError:
+                moment = day = None
+            if moment is None and day:
+                moment = datetime.combine(day, time.max if end_of_day else time.min)
+            if moment is None:
+                return Response({"error": f"{name} must be a date or datetime."}, status=status.HTTP_400_BAD_REQUEST)
+            bounds[name] = moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+        try:
+            points = int(params.get("points", 500))
+        except ValueError:
+            return Response({"error": "points must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(series.balance_series(record, bounds.get("from"), bounds.get("to"), points))
 
     # Record-level transactions: only GET history
     @action(detail=True, methods=["get"], url_path="transactions")
     def list_transactions(self, request, pk=None):
-        record = get_object_or_404(InventoryRecord, pk=pk)
+        record = get_object_or_404(self.get_queryset(), pk=pk)
         qs = record.transactions.all()
         page = self.paginate_queryset(qs)
         if page is not None:
@@ -83,3 +276,330 @@ class InventoryRecordViewSet(viewsets.ModelViewSet):
             return self.get_paginated_response(ser.data)
         ser = InventoryTransactionSerializer(qs, many=True)
         return Response(ser.data)
+
+class ReservationViewSet(mixins.CreateModelMixin,
+                         mixins.ListModelMixin,
+                         mixins.RetrieveModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    GET, POST on /api/reservations/
+    plus POST /api/reservations/{pk}/fulfil/ and /api/reservations/{pk}/release/
+    """
+    serializer_class = ReservationSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        qs = Reservation.objects.prefetch_related("created_by")  # users may be in another database
+        status_param = self.request.query_params.get("status")
+        if status_param:
+            qs = qs.filter(status=status_param)
+        record_id = self.request.query_params.get("record")
+        if record_id:
+            qs = qs.filter(record_id=record_id)
+        return scoping.scope(qs, self.request, field="record__warehouse_id")
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        product = data.pop("product")
+        warehouse = data.pop("warehouse")
+        try:
+            reservation = reserve(product.id, warehouse.id, created_by=request.user, **data)
+        except InsufficientStock as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["post"])
+    def fulfil(self, request, pk=None):
+        reservation = get_object_or_404(self.get_queryset(), pk=pk)
+        try:
+            reservation = fulfil_reservation(reservation.pk, created_by=request.user)
+        except ReservationNotActive as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(reservation).data)
+
+    @action(detail=True, methods=["post"])
+    def release(self, request, pk=None):
+        reservation = get_object_or_404(self.get_queryset(), pk=pk)
+        try:
+            reservation = release_reservation(reservation.pk)
+        except ReservationNotActive as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(reservation).data)
+
+class ReorderSuggestionPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+class ReorderSuggestionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    GET on /api/reorder-suggestions/ (filters: warehouse, product, below=1)
+    Rows are produced by the forecast_reorder_points management command.
+    """
+    serializer_class = ReorderSuggestionSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ReorderSuggestionPagination
+    lookup_field = "record_id"
+
+    def get_queryset(self):
+        qs = ReorderSuggestion.objects.select_related(
+            "record__product", "record__warehouse"
+        ).order_by("record_id")
+        params = self.request.query_params
+        if params.get("warehouse"):
+            qs = qs.filter(record__warehouse_id=params["warehouse"])
+        if params.get("product"):
+            qs = qs.filter(record__product_id=params["product"])
+        if params.get("below"):
+            # Only records already at or under their suggested reorder point
+            qs = qs.filter(record__quantity_on_hand__lte=F("suggested_reorder_point"))
+        return scoping.scope(qs, self.request, field="record__warehouse_id")
+
+class LotPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+class LotViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    GET on /api/lots/ (filters: record, product, warehouse; lots with stock
+    unless ?empty=1) plus GET /api/lots/expiring/?days=30 (same filters),
+    soonest expiry first, already-expired lots included.
+    """
+    serializer_class = LotSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = LotPagination
+
+    def get_queryset(self):
+        qs = Lot.objects.select_related("record__product", "record__warehouse")
+        params = self.request.query_params
+        if params.get("record"):
+            qs = qs.filter(record_id=params["record"])
+        if params.get("product"):
+            qs = qs.filter(record__product_id=params["product"])
+        if params.get("warehouse"):
+            qs = qs.filter(record__warehouse_id=params["warehouse"])
+        if not params.get("empty"):
+            qs = qs.filter(quantity_on_hand__gt=0)
+        return scoping.scope(qs, self.request, field="record__warehouse_id")
+
+    @action(detail=False, methods=["get"])
+    def expiring(self, request):
+        params = request.query_params
+        try:
+            days = int(params.get("days", 30))
+        except ValueError:
+            return Response({"error": "days must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        qs = lots.expiring(days, warehouse_id=params.get("warehouse"), product_id=params.get("product"))
+        qs = scoping.scope(qs, request, field="record__warehouse_id")
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+class CycleCountViewSet(mixins.CreateModelMixin,
+                        mixins.ListModelMixin,
+                        mixins.RetrieveModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    GET, POST on /api/cycle-counts/ (filters: warehouse, status)
+    plus GET  /api/cycle-counts/{pk}/lines/   (?variance=1: only lines that differ)
+         POST /api/cycle-counts/{pk}/counts/  {"counts": [{product_id, quantity}, ...]}
+         POST /api/cycle-counts/{pk}/approve/ and /api/cycle-counts/{pk}/cancel/
+    """
+    serializer_class = CycleCountSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        qs = CycleCount.objects.select_related("warehouse").prefetch_related("created_by", "approved_by").annotate(
+            line_count=Count("lines"),
+            counted_count=Count("lines", filter=Q(lines__counted_qty__isnull=False)),
+            variance_count=Count("lines", filter=Q(lines__variance__isnull=False) & ~Q(lines__variance=0)),
+        )
+        params = self.request.query_params
+        if params.get("warehouse"):
+            qs = qs.filter(warehouse_id=params["warehouse"])
+        if params.get("status"):
+            qs = qs.filter(status=params["status"])
+        return scoping.scope(qs, self.request)
+
+    def get_session(self, pk):
+        return get_object_or_404(scoping.scope(CycleCount.objects.all(), self.request), pk=pk)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        session = cycle_counts.open_session(
+            data["warehouse"],
+            product_ids=data.get("product_ids"),
+            created_by=request.user,
+            notes=data.get("notes"),
+        )
+        return Response(self.get_serializer(self.get_queryset().get(pk=session.pk)).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["get"])
+    def lines(self, request, pk=None):
+        session = self.get_session(pk)
+        qs = session.lines.select_related("record__product")
+        if request.query_params.get("variance"):
+            qs = qs.exclude(variance__isnull=True).exclude(variance=0)
+        paginator = ReorderSuggestionPagination()
+        page = paginator.paginate_queryset(qs, request, view=self)
+        return paginator.get_paginated_response(CycleCountLineSerializer(page, many=True).data)
+
+    @action(detail=True, methods=["post"])
+    def counts(self, request, pk=None):
+        session = self.get_session(pk)
+        serializer = CycleCountSubmitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        counts = {c["product_id"]: c["quantity"] for c in serializer.validated_data["counts"]}
+        try:
+            updated = cycle_counts.submit_counts(session.pk, counts)
+        except cycle_counts.CycleCountError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"updated": updated, **self.get_serializer(self.get_queryset().get(pk=session.pk)).data})
+
+    @action(detail=True, methods=["post"])
+    def approve(self, request, pk=None):
+        session = self.get_session(pk)
+        try:
+            adjustments, released = cycle_counts.approve(session.pk, approved_by=request.user)
+        except cycle_counts.CycleCountError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "adjustments":           len(adjustments),
+            "released_reservations": [hold.pk for hold in released],
+            **self.get_serializer(self.get_queryset().get(pk=session.pk)).data,
+        })
+
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        session = self.get_session(pk)
+        try:
+            cycle_counts.cancel(session.pk)
+        except cycle_counts.CycleCountError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_queryset().get(pk=session.pk)).data)
+
+class AllocationView(APIView):
+    """
+    POST /api/allocations/
+    {lines: [{product_id, quantity}], latitude, longitude, max_distance_km?,
+     action: plan|reserve|deplete, allow_partial?, reference?, notes?}
+    Plans which warehouses ship which lines (fewest shipments, then
+    nearest); reserve/deplete also commit the plan in one transaction.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def post(self, request):
+        serializer = AllocationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = allocation.plan(
+            data["lines"], data["latitude"], data["longitude"], data.get("max_distance_km"),
+        )
+        action_name = data["action"]
+        if action_name == AllocationSerializer.PLAN:
+            return Response(result)
+        if result["unfilled"] and not data["allow_partial"]:
+            return Response(
+                {"error": "The order can't be filled in full; pass allow_partial to commit the rest.", **result},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        lines = allocation.allocation_lines(result)
+        common = {"reference": data.get("reference") or None, "notes": data.get("notes") or None}
+        try:
+            if action_name == AllocationSerializer.RESERVE:
+                reservations = reserve_lines(lines, created_by=request.user, **common)
+                result["reservation_ids"] = [r.pk for r in reservations]
+            else:
+                products = {p.pk: p for p in Product.objects.filter(pk__in={l["product_id"] for l in lines})}
+                movements = post_bulk(
+                    [
+                        {
+                            **line,
+                            "transaction_type": "depletion",
+                            "uom":              products[line["product_id"]].default_uom,
+                            "reason":           "client_order",
+                            **common,
+                        }
+                        for line in lines
+                    ],
+                    created_by=request.user,
+                )
+                result["transaction_ids"] = [m.pk for m in movements]
+        except InsufficientStock as exc:
+            # Stock moved between planning and committing; the client may re-plan
+            return Response(exc.as_response_data(), status=status.HTTP_409_CONFLICT)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+class ScanView(APIView):
+    """
+    GET /api/scan/<sku>/
+    Product and its balance in each of the user's warehouses for a
+    scanned barcode, served from the hot-SKU cache in inventory.scan.
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request, sku):
+        payload = scan.lookup(sku.strip())
+        if payload is None:
+            return Response({"error": f"No product with SKU '{sku}'."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(scan.narrow(payload, scoping.for_request(request)))
+
+class MovementAnalyticsView(APIView):
+    """
+    GET /api/analytics/movements/?from=YYYY-MM-DD&to=YYYY-MM-DD
+        &bucket=day|week|month&product=&warehouse=&reason=&group_by=product,warehouse,reason
+    Served from MovementRollup (see the rollup_movements command).
+    """
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            start = parse_date(params.get("from", ""))
+            end = parse_date(params.get("to", ""))
+        except ValueError:  # well-formed but impossible, e.g. 2024-02-30
+            start = end = None
+        bucket = params.get("bucket", MovementRollup.DAY)
+        group_by = [g for g in params.get("group_by", "").split(",") if g]
+
+        if not start or not end or start > end:
+            return Response(
+                {"error": "from and to are required dates (YYYY-MM-DD), from <= to."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if bucket not in dict(MovementRollup.GRANULARITIES):
+            return Response({"error": "bucket must be day, week or month."}, status=status.HTTP_400_BAD_REQUEST)
+        if any(g not in analytics.GROUP_BY for g in group_by):
+            return Response(
+                {"error": f"group_by accepts: {', '.join(analytics.GROUP_BY)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        filters = {}
+        for name, column in analytics.GROUP_BY.items():
+            value = params.get(name)
+            if not value:
+                continue
+            if name != "reason":
+                try:
+                    value = int(value)
+                except ValueError:
+                    return Response({"error": f"{name} must be an integer id."}, status=status.HTTP_400_BAD_REQUEST)
+            filters[column] = value
+
+        series = analytics.movement_series(start, end, bucket, filters=filters, group_by=group_by)
+        totals = {f: sum(row[f] for row in series) for f in analytics.FIELDS}
+        return Response({
+            "from":   start,
+            "to":     end,
+            "bucket": bucket,
+            "series": series,
+            "totals": totals,
+        })
@@ -0,0 +1,20 @@
+# jobs/management/commands/run_jobs.py
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run the background job worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the jobs that are due now, then exit.")
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options["threads"], poll_interval=options["poll_interval"])
+        processed = worker.run(once=options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
@@ -0,0 +1,42 @@
+# jobs/models.py
+
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+class Job(models.Model):
+    QUEUED    = "queued"
+    RUNNING   = "running"
+    SUCCEEDED = "succeeded"
+    FAILED    = "failed"
+    STATUS_CHOICES = [
+        (QUEUED,    "Queued"),
+        (RUNNING,   "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED,    "Failed"),
+    ]
+
+    kind         = models.CharField(max_length=100)
+    payload      = models.JSONField(default=dict, blank=True)
+    result       = models.JSONField(blank=True, null=True)
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Enqueueing twice with the same key returns the existing job
+    key          = models.CharField(max_length=200, unique=True, blank=True, null=True)
+    attempts     = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after    = models.DateTimeField()
+    last_error   = models.TextField(blank=True, default="")
+    locked_at    = models.DateTimeField(blank=True, null=True)
+    created_by   = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    finished_at  = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
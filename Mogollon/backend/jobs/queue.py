@@ -0,0 +1,135 @@
+# jobs/queue.py
+#
+# Durable, DB-backed job queue. Handlers are registered per job kind and
+# run by the run_jobs worker; they must be idempotent because a job may be
+# retried after a partial run (at-least-once delivery).
+
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+BACKOFF_BASE  = getattr(settings, "JOBS_BACKOFF_BASE", timedelta(seconds=10))
+BACKOFF_MAX   = getattr(settings, "JOBS_BACKOFF_MAX", timedelta(hours=1))
+# A running job whose worker went silent this long is put back in the
+# queue, counting as a failed attempt; workers refresh locked_at every
+# HEARTBEAT while their jobs run, so a slow job is never reclaimed
+STALE_TIMEOUT = getattr(settings, "JOBS_STALE_TIMEOUT", timedelta(minutes=15))
+HEARTBEAT     = getattr(settings, "JOBS_HEARTBEAT", STALE_TIMEOUT / 3)
+
+_handlers = {}
+
+
+class Handler:
+    def __init__(self, func, batch_size):
+        self.func = func
+        self.batch_size = batch_size
+
+
+def register(kind, batch_size=None):
+    """
+    Decorator registering the handler for ``kind``.
+
+    A plain handler is called as ``func(job)`` and returns a JSON-able
+    result. With ``batch_size`` the handler is called as ``func(jobs)``
+    with up to that many claimed jobs and returns ``{job.pk: result}``;
+    any job missing from the dict, or mapped to an exception, is retried.
+    """
+    def decorator(func):
+        _handlers[kind] = Handler(func, batch_size)
+        return func
+    return decorator
+
+
+def get_handler(kind):
+    return _handlers.get(kind)
+
+
+def enqueue(kind, payload=None, key=None, run_after=None, max_attempts=5, created_by=None):
+    """
+    Queue a job. With ``key`` the call is idempotent: an existing job with
+    that key is returned as-is, except a failed one, which is re-queued.
+    """
+    fields = {
+        "kind":         kind,
+        "payload":      payload or {},
+        "run_after":    run_after or timezone.now(),
+        "max_attempts": max_attempts,
+        "created_by":   created_by,
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+
+    with transaction.atomic():
+        job, created = Job.objects.select_for_update().get_or_create(key=key, defaults=fields)
+        if not created and job.status == Job.FAILED:
+            job.status = Job.QUEUED
+            job.attempts = 0
+            job.run_after = fields["run_after"]
+            job.save(update_fields=["status", "attempts", "run_after"])
+    return job
+
+
+def _reclaim(now):
+    """Requeue running jobs whose worker went silent, or fail them once out of attempts."""
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - STALE_TIMEOUT)
+    stale.filter(attempts__gte=F("max_attempts") - 1).update(
+        status=Job.FAILED,
+        attempts=F("attempts") + 1,
+        last_error="Worker stopped responding while running this job.",
+        finished_at=now,
+    )
+    stale.update(status=Job.QUEUED, attempts=F("attempts") + 1)
+
+
+def claim(limit):
+    """Mark up to ``limit`` due jobs as running and return them."""
+    now = timezone.now()
+    _reclaim(now)
+
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=now)
+            .order_by("run_after")
+            .values_list("pk", flat=True)[:limit]
+        )
+        # Conditional update per job so two workers can never both win one
+        claimed = [
+            pk for pk in candidates
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(status=Job.RUNNING, locked_at=now)
+        ]
+    return list(Job.objects.filter(pk__in=claimed).order_by("run_after"))
+
+
+def heartbeat(jobs):
+    """Refresh locked_at on those of ``jobs`` still running, so they aren't reclaimed."""
+    return Job.objects.filter(pk__in=[job.pk for job in jobs], status=Job.RUNNING).update(locked_at=timezone.now())
+
+
+def complete(job, result=None):
+    job.status = Job.SUCCEEDED
+    job.result = result
+    job.attempts += 1
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "result", "attempts", "finished_at"])
+
+
+def fail(job, exc):
+    """Schedule a retry with exponential backoff, or give up after max_attempts."""
+    job.attempts += 1
+    job.last_error = "".join(traceback.format_exception(exc))[-4000:]
+    if job.attempts >= job.max_attempts:
+        job.status = Job.FAILED
+        job.finished_at = timezone.now()
+    else:
+        delay = min(BACKOFF_BASE * 2 ** (job.attempts - 1), BACKOFF_MAX)
+        job.status = Job.QUEUED
+        job.run_after = timezone.now() + delay * random.uniform(0.8, 1.2)
+    job.save(update_fields=["status", "attempts", "last_error", "run_after", "finished_at"])
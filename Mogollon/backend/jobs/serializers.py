@@ -0,0 +1,20 @@
+# jobs/serializers.py
+from rest_framework import serializers
+from .models import Job
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "attempts",
+            "max_attempts",
+            "run_after",
+            "result",
+            "last_error",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,123 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+from .worker import Worker
+
+
+@queue.register("tests.echo")
+def echo(job):
+    return job.payload
+
+
+@queue.register("tests.broken")
+def broken(job):
+    raise RuntimeError("boom")
+
+
+@queue.register("tests.partial", batch_size=10)
+def partial(jobs):
+    # Answers only for even payloads; the rest must be retried
+    return {job.pk: "ok" for job in jobs if job.payload["n"] % 2 == 0}
+
+
+class QueueTests(TestCase):
+    def test_keyed_enqueue_is_idempotent(self):
+        job = queue.enqueue("tests.echo", {"n": 1}, key="k")
+        self.assertEqual(queue.enqueue("tests.echo", {"n": 2}, key="k").pk, job.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+        # ... except that a failed job is queued again
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, attempts=5)
+        again = queue.enqueue("tests.echo", key="k")
+        self.assertEqual((again.pk, again.status, again.attempts), (job.pk, Job.QUEUED, 0))
+
+    def test_claim_takes_due_jobs_once(self):
+        due = queue.enqueue("tests.echo")
+        queue.enqueue("tests.echo", run_after=timezone.now() + timedelta(hours=1))
+        self.assertEqual([j.pk for j in queue.claim(10)], [due.pk])
+        self.assertEqual(queue.claim(10), [])
+
+    def test_failures_back_off_then_give_up(self):
+        job = queue.enqueue("tests.broken", max_attempts=2)
+        queue.fail(job, RuntimeError("first"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now() + queue.BACKOFF_BASE * 0.7)
+        self.assertIn("first", job.last_error)
+
+        queue.fail(job, RuntimeError("second"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_jobs_are_reclaimed_as_failed_attempts(self):
+        stale = timezone.now() - queue.STALE_TIMEOUT - timedelta(minutes=1)
+        retried = queue.enqueue("tests.echo", max_attempts=3)
+        exhausted = queue.enqueue("tests.echo", max_attempts=1)
+        alive = queue.enqueue("tests.echo")
+        Job.objects.update(status=Job.RUNNING, locked_at=stale)
+        queue.heartbeat([alive])
+
+        queue.claim(0)
+        states = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(states, {retried.pk: Job.QUEUED, exhausted.pk: Job.FAILED, alive.pk: Job.RUNNING})
+        self.assertEqual(Job.objects.get(pk=retried.pk).attempts, 1)
+        self.assertEqual(Job.objects.get(pk=exhausted.pk).attempts, 1)
+
+
+class WorkerTests(TransactionTestCase):
+    # Jobs run on the worker's own threads, which need committed rows
+
+    def test_outcomes(self):
+        ok = queue.enqueue("tests.echo", {"n": 1})
+        failing = queue.enqueue("tests.broken")
+        unknown = queue.enqueue("tests.nobody")
+        even, odd = queue.enqueue("tests.partial", {"n": 2}), queue.enqueue("tests.partial", {"n": 3})
+        with self.assertLogs("jobs.worker", "ERROR"):
+            self.assertEqual(Worker(threads=2).run(once=True), 5)
+
+        jobs = Job.objects.in_bulk()
+        self.assertEqual((jobs[ok.pk].status, jobs[ok.pk].result), (Job.SUCCEEDED, {"n": 1}))
+        self.assertEqual(jobs[even.pk].status, Job.SUCCEEDED)
+        for job in (failing, unknown, odd):
+            self.assertEqual((jobs[job.pk].status, jobs[job.pk].attempts), (Job.QUEUED, 1))
+        self.assertIn("No handler registered", jobs[unknown.pk].last_error)
+
+    def test_running_jobs_heartbeat(self):
+        seen = []
+
+        @queue.register("tests.slow")
+        def slow(job):
+            time.sleep(0.3)
+            seen.append(Job.objects.get(pk=job.pk).locked_at)
+
+        job = queue.enqueue("tests.slow")
+        with mock.patch.object(queue, "HEARTBEAT", timedelta(seconds=0.05)):
+            Worker(threads=1).run(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        # locked_at was refreshed while the handler was still sleeping
+        self.assertGreater(seen[0], job.run_after + timedelta(seconds=0.1))
+
+    def test_slow_job_does_not_hold_back_new_ones(self):
+        @queue.register("tests.sleepy")
+        def sleepy(job):
+            time.sleep(0.5)
+
+        @queue.register("tests.spawn")
+        def spawn(job):
+            queue.enqueue("tests.echo", {"spawned": True})
+
+        slow = queue.enqueue("tests.sleepy")
+        queue.enqueue("tests.spawn")
+        self.assertEqual(Worker(threads=2).run(once=True), 3)
+        # The job queued mid-run was claimed by the free thread, not after the slow one
+        spawned = Job.objects.get(kind="tests.echo")
+        self.assertEqual(spawned.status, Job.SUCCEEDED)
+        self.assertLess(spawned.finished_at, Job.objects.get(pk=slow.pk).finished_at)
@@ -0,0 +1,16 @@
+from rest_framework import viewsets, permissions
+from .models import Job
+from .serializers import JobSerializer
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/jobs/ and /api/jobs/{pk}/ — poll background jobs you queued
+    """
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = Job.objects.all()
+        if not self.request.user.is_staff:
+            qs = qs.filter(created_by=self.request.user)
+        return qs
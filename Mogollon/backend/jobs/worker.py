@@ -0,0 +1,103 @@
+# jobs/worker.py
+
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+from . import queue
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownJobKind(Exception):
+    pass
+
+
+class Worker:
+    """
+    Claims due jobs and runs them on a thread pool. Jobs of a kind whose
+    handler takes batches are handed over together (e.g. one SMTP
+    connection for many messages); the rest run one per thread.
+    """
+
+    def __init__(self, threads=4, poll_interval=1.0):
+        self.threads = threads
+        self.poll_interval = poll_interval
+
+    def run(self, once=False):
+        """
+        Keep the pool busy: whenever a thread is free, claim more due jobs,
+        so one slow job never holds back the ones queued behind it. The
+        claimed units still waiting or running are heartbeated meanwhile.
+        """
+        processed, pending = 0, {}
+        beat = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            while True:
+                if len(pending) < self.threads:
+                    for unit in self._units(queue.claim(limit=self.threads * 10)):
+                        pending[pool.submit(self._run_unit, unit)] = unit
+                    if not pending:
+                        if once:
+                            return processed
+                        time.sleep(self.poll_interval)
+                        continue
+                # With a thread idle, look for new jobs every poll_interval
+                timeout = queue.HEARTBEAT.total_seconds()
+                if len(pending) < self.threads and not once:
+                    timeout = min(timeout, self.poll_interval)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    processed += len(pending.pop(future))
+                if pending and time.monotonic() - beat >= queue.HEARTBEAT.total_seconds():
+                    queue.heartbeat(job for unit in pending.values() for job in unit)
+                    beat = time.monotonic()
+
+    def _units(self, jobs):
+        by_kind = defaultdict(list)
+        for job in jobs:
+            by_kind[job.kind].append(job)
+        for kind, group in by_kind.items():
+            handler = queue.get_handler(kind)
+            size = handler.batch_size if handler and handler.batch_size else 1
+            for i in range(0, len(group), size):
+                yield group[i:i + size]
+
+    def _run_unit(self, jobs):
+        try:
+            handler = queue.get_handler(jobs[0].kind)
+            if handler is None:
+                for job in jobs:
+                    queue.fail(job, UnknownJobKind(f"No handler registered for '{job.kind}'."))
+            elif handler.batch_size:
+                self._run_batch(handler, jobs)
+            else:
+                self._run_single(handler, jobs[0])
+        finally:
+            # Worker threads hold their own DB connections
+            close_old_connections()
+
+    def _run_single(self, handler, job):
+        try:
+            result = handler.func(job)
+        except Exception as exc:
+            logger.exception("Job %s failed", job)
+            queue.fail(job, exc)
+        else:
+            queue.complete(job, result)
+
+    def _run_batch(self, handler, jobs):
+        try:
+            results = handler.func(jobs)
+        except Exception as exc:
+            logger.exception("Batch of %d %s job(s) failed", len(jobs), jobs[0].kind)
+            results = {job.pk: exc for job in jobs}
+        for job in jobs:
+            outcome = results.get(job.pk, RuntimeError("Handler returned no result for this job."))
+            if isinstance(outcome, Exception):
+                queue.fail(job, outcome)
+            else:
+                queue.complete(job, outcome)
@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class RfqsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rfqs'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save, pre_save
+
+        from inventory.models import Product
+        from . import attachments, matching, stats
+        from .models import RFQ, RFQAttachment
+
+        # Keep the in-memory catalog index in step with product edits
+        post_save.connect(matching.product_saved, sender=Product)
+        post_delete.connect(matching.product_deleted, sender=Product)
+        # Remove the uploaded file with its row
+        post_delete.connect(attachments.attachment_deleted, sender=RFQAttachment)
+        # Board counters follow every saved or deleted RFQ
+        pre_save.connect(stats.rfq_pre_save, sender=RFQ)
+        post_save.connect(stats.rfq_saved, sender=RFQ)
+        post_delete.connect(stats.rfq_deleted, sender=RFQ)
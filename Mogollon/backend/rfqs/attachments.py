@@ -0,0 +1,162 @@
+# rfqs/attachments.py
+#
+# Chunked, resumable RFQ attachments. start() reserves a sparse file of the
+# declared size; each part is streamed from the request straight to its
+# offset in BUFFER-sized reads while its sha256 is updated, so neither an
+# upload nor a download ever holds more than BUFFER bytes of the file.
+# Parts may arrive in any order and be re-sent; the attachment lists the
+# parts it has, so a client that lost its connection uploads only the
+# missing ones. complete() combines the stored part digests into the
+# attachment checksum without reading the file again.
+
+import hashlib
+import os
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RFQAttachment, RFQAttachmentPart
+
+PART_SIZE     = getattr(settings, "RFQ_ATTACHMENT_PART_SIZE", 8 * 1024 * 1024)
+MIN_PART_SIZE = 64 * 1024
+MAX_SIZE      = getattr(settings, "RFQ_ATTACHMENT_MAX_SIZE", 1024 ** 3)
+MAX_PARTS     = 10000
+BUFFER        = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def start(rfq, filename, size, content_type=None, part_size=None, uploaded_by=None):
+    """Create the attachment and its empty file; the client then sends part_count parts."""
+    if size > MAX_SIZE:
+        raise UploadError(f"Attachments are limited to {MAX_SIZE} bytes.")
+    part_size = max(part_size or PART_SIZE, MIN_PART_SIZE, -(-size // MAX_PARTS))
+    name = f"rfq_attachments/{rfq.pk}/{uuid.uuid4().hex}"
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.truncate(size)  # sparse; parts land at their offsets
+    return RFQAttachment.objects.create(
+        rfq=rfq,
+        filename=os.path.basename(filename),
+        content_type=content_type or "application/octet-stream",
+        size=size,
+        part_size=part_size,
+        file=name,
+        uploaded_by=uploaded_by,
+    )
+
+
+def part_length(attachment, number):
+    if not 1 <= number <= attachment.part_count:
+        raise UploadError(f"Part numbers run from 1 to {attachment.part_count}.")
+    return min(attachment.part_size, attachment.size - (number - 1) * attachment.part_size)
+
+
+def write_part(attachment, number, stream, checksum=None):
+    """
+    Stream part ``number`` from ``stream`` (the request body) to its offset.
+    The part is only recorded once all its bytes arrived and, if the client
+    sent one, its sha256 matched; otherwise UploadError and the client
+    re-sends it. Returns the RFQAttachmentPart.
+    """
+    if attachment.status != RFQAttachment.UPLOADING:
+        raise UploadError("Attachment is already complete.")
+    expected = part_length(attachment, number)
+    digest, received = hashlib.sha256(), 0
+    with open(attachment.file.path, "r+b") as fh:
+        fh.seek((number - 1) * attachment.part_size)
+        while received < expected and stream is not None:
+            chunk = stream.read(min(BUFFER, expected - received))
+            if not chunk:
+                break
+            fh.write(chunk)
+            digest.update(chunk)
+            received += len(chunk)
+    if received != expected or (stream is not None and stream.read(1)):
+        raise UploadError(f"Part {number} must be exactly {expected} bytes.")
+    if checksum and checksum.lower() != digest.hexdigest():
+        raise UploadError(f"Part {number} does not match its checksum.")
+    part, _ = RFQAttachmentPart.objects.update_or_create(
+        attachment=attachment,
+        number=number,
+        defaults={"size": received, "sha256": digest.hexdigest()},
+    )
+    return part
+
+
+def composite_checksum(digests):
+    """sha256 over the concatenated binary part digests, suffixed with the part count."""
+    combined = hashlib.sha256(b"".join(bytes.fromhex(d) for d in digests))
+    return f"{combined.hexdigest()}-{len(digests)}"
+
+
+def complete(attachment_id, checksum=None):
+    """Seal the attachment once every part is in; calling it again is harmless."""
+    with transaction.atomic():
+        attachment = RFQAttachment.objects.select_for_update().get(pk=attachment_id)
+        if attachment.status == RFQAttachment.COMPLETE:
+            return attachment
+        digests = dict(attachment.parts.values_list("number", "sha256"))
+        missing = sorted(set(range(1, attachment.part_count + 1)) - digests.keys())
+        if missing:
+            raise UploadError(f"Missing part(s): {missing[:50]}")
+        value = composite_checksum([digests[n] for n in sorted(digests)])
+        if checksum and checksum.lower() != value:
+            raise UploadError("Upload does not match the checksum given.")
+        attachment.checksum = value
+        attachment.status = RFQAttachment.COMPLETE
+        attachment.completed_at = timezone.now()
+        attachment.save(update_fields=["checksum", "status", "completed_at"])
+    return attachment
+
+
+# Signal receiver (connected in RfqsConfig.ready): also covers RFQ cascades
+def attachment_deleted(sender, instance, **kwargs):
+    name = instance.file.name
+    transaction.on_commit(lambda: default_storage.delete(name))
+
+
+_range = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """
+    (first, last) byte positions for a single-range Range header, or None
+    to send the whole file (no header, several ranges, or not bytes).
+    Raises RangeNotSatisfiable.
+    """
+    match = _range.match((header or "").strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        first, last = int(first), min(int(last) if last else size - 1, size - 1)
+    else:
+        first, last = max(size - int(last), 0), size - 1  # suffix: the final N bytes
+    if first > last:
+        raise RangeNotSatisfiable()
+    return first, last
+
+
+def read_range(path, first, last):
+    """Yield bytes first..last of the file, BUFFER at a time."""
+    with open(path, "rb") as fh:
+        fh.seek(first)
+        remaining = last - first + 1
+        while remaining:
+            chunk = fh.read(min(BUFFER, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
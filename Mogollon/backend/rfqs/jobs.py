@@ -0,0 +1,72 @@
+# rfqs/jobs.py
+#
+# Background handlers for the RFQ app (run by the run_jobs worker).
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+
+from jobs.queue import register
+from . import matching, stats
+from .models import RFQ
+
+DISPATCH_BATCH_SIZE = getattr(settings, "RFQ_DISPATCH_BATCH_SIZE", 50)
+
+
+def recipients(rfq):
+    return list(dict.fromkeys(e for e in (rfq.rep_email, rfq.email) if e))
+
+
+def dispatch_message(rfq, connection):
+    body = "\n".join([
+        f"Customer:     {rfq.customer} <{rfq.email}>",
+        f"Product:      {rfq.product}",
+        f"Type:         {rfq.product_type or '—'}",
+        f"Urgency:      {rfq.urgency}",
+        f"Due date:     {rfq.due_date}",
+        f"Needed by:    {rfq.needed_by}",
+        "",
+        rfq.description,
+    ])
+    return EmailMessage(
+        subject=f"RFQ #{rfq.pk}: {rfq.product}",
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipients(rfq),
+        reply_to=[rfq.email],
+        connection=connection,
+    )
+
+
+@register("rfq.dispatch", batch_size=DISPATCH_BATCH_SIZE)
+def dispatch_rfqs(jobs):
+    """Send a batch of RFQs over one SMTP connection; mark each sent on delivery."""
+    rfqs = RFQ.objects.in_bulk([job.payload["rfq_id"] for job in jobs])
+    results = {}
+    with get_connection() as connection:
+        for job in jobs:
+            rfq = rfqs.get(job.payload["rfq_id"])
+            # Idempotent: a retried or duplicate job never re-sends
+            if rfq is None or rfq.status != RFQ.DRAFT:
+                results[job.pk] = {"skipped": "deleted" if rfq is None else f"already {rfq.status}"}
+                continue
+            try:
+                dispatch_message(rfq, connection).send()
+            except Exception as exc:
+                results[job.pk] = exc
+                continue
+            with transaction.atomic():
+                if RFQ.objects.filter(pk=rfq.pk, status=RFQ.DRAFT).update(status=RFQ.SENT):
+                    before = stats.row(rfq)
+                    rfq.status = RFQ.SENT
+                    stats.changed([(before, stats.row(rfq))])
+            results[job.pk] = {"sent_to": recipients(rfq)}
+    return results
+
+
+@register("rfq.match", batch_size=500)
+def match_rfqs(jobs):
+    """Store top catalog matches for newly created RFQs (index stays warm in the worker)."""
+    rfqs = RFQ.objects.in_bulk([job.payload["rfq_id"] for job in jobs])
+    matching.store_matches(rfqs.values())
+    return {job.pk: {"rfq_id": job.payload["rfq_id"]} for job in jobs}
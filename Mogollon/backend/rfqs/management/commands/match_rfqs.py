@@ -0,0 +1,34 @@
+# rfqs/management/commands/match_rfqs.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from rfqs import matching
+from rfqs.models import RFQ
+
+
+class Command(BaseCommand):
+    help = "Compute and store top catalog matches for RFQs in batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Re-match every RFQ, not only those without matches.")
+        parser.add_argument("--status", choices=[code for code, _ in RFQ.STATUS_CHOICES])
+        parser.add_argument("--k", type=int, default=matching.TOP_K)
+
+    def handle(self, *args, **options):
+        qs = RFQ.objects.only("pk", "product", "description").order_by("pk")
+        if not options["all"]:
+            qs = qs.filter(matches__isnull=True)
+        if options["status"]:
+            qs = qs.filter(status=options["status"])
+
+        started = time.perf_counter()
+        matching.get_index()
+        indexed = time.perf_counter()
+        count = matching.store_matches(qs.iterator(chunk_size=2000), k=options["k"])
+        done = time.perf_counter()
+        self.stdout.write(self.style.SUCCESS(
+            f"Matched {count} RFQ(s) in {done - indexed:.2f}s (index built in {indexed - started:.2f}s)."
+        ))
@@ -0,0 +1,27 @@
+# rfqs/management/commands/rollover_rfq_stats.py
+#
+# Run daily (cron / scheduler), shortly after midnight, to move the RFQ
+# board's date-based counters (overdue, past needed-by) on to the new day.
+# --rebuild recounts every counter from the RFQ table instead.
+
+from django.core.management.base import BaseCommand
+
+from rfqs import stats
+
+
+class Command(BaseCommand):
+    help = "Roll the RFQ board's overdue counters over to today (or rebuild all counters)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Recount every counter from scratch.")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            counts = stats.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {len(counts)} counter(s) over {counts['total']} RFQ(s)."
+            ))
+            return
+        added = stats.rollover()
+        self.stdout.write(self.style.SUCCESS(f"Rolled over: {added} RFQ date(s) newly passed."))
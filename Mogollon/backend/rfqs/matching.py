@@ -0,0 +1,239 @@
+# rfqs/matching.py
+#
+# Matches free-text RFQs to catalog products. An in-memory inverted index
+# maps character trigrams and word tokens of product names/SKUs to product
+# positions; a query scores every candidate at once with one idf-weighted
+# bincount over the postings of its grams instead of a pairwise scan.
+
+import math
+import re
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from inventory.models import InventoryRecord, Product
+from .models import RFQMatch
+
+MAX_AGE   = getattr(settings, "RFQ_MATCHER_MAX_AGE", 600)  # seconds before a full rebuild
+TOP_K     = getattr(settings, "RFQ_MATCHER_TOP_K", 5)
+# Grams found in more than this share of products carry no signal; skip them
+STOP_DF   = 0.2
+# Posting entries scored per query; rarest grams go first, so the budget
+# only ever drops the least selective ones
+POSTINGS_BUDGET = getattr(settings, "RFQ_MATCHER_POSTINGS_BUDGET", 50_000)
+MIN_SCORE = 0.05
+
+_non_alnum = re.compile(r"[^0-9a-z]+")
+
+
+def tokens(text):
+    return [t for t in _non_alnum.sub(" ", (text or "").lower()).split() if t]
+
+
+def sku_words(text):
+    # "TW-1," -> "tw1": whitespace-delimited words with punctuation removed
+    return {"".join(tokens(word)) for word in (text or "").split()}
+
+
+def grams(text):
+    out = set()
+    for token in tokens(text):
+        out.add(f"w:{token}")
+        padded = f" {token} "
+        out.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+class CatalogIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built_at = None
+        self._reset()
+
+    def _reset(self):
+        self.ids = []          # position -> product id
+        self.pos_of = {}       # product id -> position
+        self.sizes = []        # position -> number of grams
+        self.alive = []        # position -> bool (deleted products stay as tombstones)
+        self.n_alive = 0
+        self.sku_of = []       # position -> normalized SKU
+        self.postings = {}     # gram -> list of positions
+        self.sku_pos = {}      # normalized SKU -> position
+        self._arrays = {}      # gram -> np.ndarray, compiled lazily from postings
+        self._scale_np = None  # alive / sqrt(gram count), compiled lazily
+
+    # —— building ——
+
+    def rebuild(self):
+        rows = list(Product.objects.values_list("pk", "name", "sku"))
+        with self._lock:
+            self._reset()
+            for pk, name, sku in rows:
+                self._add(pk, name, sku)
+            self.built_at = time.monotonic()
+
+    def _add(self, pk, name, sku):
+        pos = len(self.ids)
+        doc = grams(f"{name} {sku}")
+        self.ids.append(pk)
+        self.pos_of[pk] = pos
+        self.sizes.append(len(doc))
+        self.alive.append(True)
+        self.n_alive += 1
+        for g in doc:
+            self.postings.setdefault(g, []).append(pos)
+            self._arrays.pop(g, None)
+        sku_key = "".join(tokens(sku))
+        self.sku_of.append(sku_key)
+        self.sku_pos[sku_key] = pos
+        self._scale_np = None
+
+    def _remove(self, pk):
+        pos = self.pos_of.pop(pk, None)
+        if pos is None:
+            return
+        self.alive[pos] = False
+        self.n_alive -= 1
+        if self.sku_pos.get(self.sku_of[pos]) == pos:
+            del self.sku_pos[self.sku_of[pos]]
+        self._scale_np = None
+
+    def update(self, product):
+        with self._lock:
+            if self.built_at is None:
+                return
+            self._remove(product.pk)
+            self._add(product.pk, product.name, product.sku)
+
+    def remove(self, product_id):
+        with self._lock:
+            if self.built_at is not None:
+                self._remove(product_id)
+
+    # —— querying ——
+
+    def _posting(self, gram):
+        arr = self._arrays.get(gram)
+        if arr is None:
+            arr = self._arrays[gram] = np.asarray(self.postings[gram], dtype=np.int64)
+        return arr
+
+    def search(self, text, k=TOP_K):
+        """Return up to k (product_id, score) pairs, best first."""
+        with self._lock:
+            n = len(self.ids)
+            if not n:
+                return []
+            if self._scale_np is None:
+                # Length-normalize by gram count (cheap cosine proxy); tombstones scale to 0
+                alive = np.asarray(self.alive, dtype=np.float64)
+                self._scale_np = alive / np.sqrt(np.maximum(np.asarray(self.sizes, dtype=np.float64), 1.0))
+            n_alive = self.n_alive or 1
+
+            query = sorted(
+                (self._posting(g) for g in grams(text) if g in self.postings),
+                key=len,
+            )
+            arrays, weights = [], []
+            q_norm, spent = 0.0, 0
+            for i, arr in enumerate(query):
+                w = (math.log((n_alive + 1) / (len(arr) + 1)) + 1) ** 2
+                q_norm += w
+                if i and (len(arr) > STOP_DF * n_alive or spent + len(arr) > POSTINGS_BUDGET):
+                    continue
+                spent += len(arr)
+                arrays.append(arr)
+                weights.append(np.full(len(arr), w))
+
+            if arrays:
+                scores = np.bincount(np.concatenate(arrays), weights=np.concatenate(weights), minlength=n)
+                scores *= self._scale_np / math.sqrt(q_norm)
+            else:
+                scores = np.zeros(n)
+
+            # An exact SKU mentioned in the text always ranks first
+            mentioned = [self.sku_pos[w] for w in sku_words(text) if w in self.sku_pos]
+            if mentioned:
+                scores[mentioned] = scores.max() + 1.0
+
+            # Rank only the near-best candidates instead of partitioning all n
+            best = scores.max()
+            if best < MIN_SCORE:
+                return []
+            candidates = np.flatnonzero(scores >= max(best * 0.5, MIN_SCORE))
+            if len(candidates) < k:
+                candidates = np.flatnonzero(scores >= MIN_SCORE)
+            top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+            return [(self.ids[i], round(float(scores[i]), 4)) for i in top]
+
+
+_index = CatalogIndex()
+
+
+def get_index():
+    if _index.built_at is None or time.monotonic() - _index.built_at > MAX_AGE:
+        _index.rebuild()
+    return _index
+
+
+# Signal receivers (connected in RfqsConfig.ready)
+def product_saved(sender, instance, **kwargs):
+    _index.update(instance)
+
+
+def product_deleted(sender, instance, **kwargs):
+    _index.remove(instance.pk)
+    # Products may live in the ledger database, so no cascade reaches here
+    RFQMatch.objects.filter(product_id=instance.pk).delete()
+
+
+def rfq_text(rfq):
+    return f"{rfq.product} {rfq.description[:300]}"
+
+
+def store_matches(rfqs, k=TOP_K, chunk_size=1000):
+    """Compute and store the top-k catalog matches for an iterable of RFQs."""
+    index = get_index()
+    matched = 0
+    batch_ids, batch = [], []
+
+    def flush():
+        with transaction.atomic():
+            RFQMatch.objects.filter(rfq_id__in=batch_ids).delete()
+            RFQMatch.objects.bulk_create(batch)
+
+    for rfq in rfqs:
+        batch_ids.append(rfq.pk)
+        for rank, (product_id, score) in enumerate(index.search(rfq_text(rfq), k), start=1):
+            batch.append(RFQMatch(rfq_id=rfq.pk, product_id=product_id, score=score, rank=rank))
+        matched += 1
+        if len(batch_ids) >= chunk_size:
+            flush()
+            batch_ids, batch = [], []
+    if batch_ids:
+        flush()
+    return matched
+
+
+def stock_by_product(product_ids):
+    """{product_id: {"on_hand", "available", "warehouses": [...]}} in one query."""
+    stock = {pid: {"on_hand": 0, "available": 0, "warehouses": []} for pid in product_ids}
+    rows = (
+        InventoryRecord.objects.filter(product_id__in=product_ids)
+        .order_by("warehouse__name")
+        .values_list("product_id", "warehouse_id", "warehouse__name", "quantity_on_hand", "quantity_reserved")
+    )
+    for product_id, warehouse_id, warehouse_name, on_hand, reserved in rows:
+        entry = stock[product_id]
+        entry["on_hand"] += on_hand
+        entry["available"] += on_hand - reserved
+        entry["warehouses"].append({
+            "warehouse_id": warehouse_id,
+            "name":         warehouse_name,
+            "on_hand":      on_hand,
+            "available":    on_hand - reserved,
+        })
+    return stock
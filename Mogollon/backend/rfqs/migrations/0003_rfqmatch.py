@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_unitconversion_base_quantity'),
+        ('rfqs', '0002_rfq_internal_notes_rfq_needed_by_rfq_other_desc_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RFQMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rfq_matches', to='inventory.product')),
+                ('rfq', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='rfqs.rfq')),
+            ],
+            options={
+                'ordering': ['rfq', 'rank'],
+                'unique_together': {('rfq', 'product')},
+            },
+        ),
+    ]
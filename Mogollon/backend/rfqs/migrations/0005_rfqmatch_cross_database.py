@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_cross_database_relations'),
+        ('rfqs', '0004_rfqattachment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rfqmatch',
+            name='product',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='rfq_matches', to='inventory.product'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfqs', '0005_rfqmatch_cross_database'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RFQCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('as_of', models.DateField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['due_date'], name='rfq_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(condition=models.Q(('status', 'completed'), _negated=True), fields=['needed_by'], name='rfq_open_needed_idx'),
+        ),
+    ]
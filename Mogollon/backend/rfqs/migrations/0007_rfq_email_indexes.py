@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:51
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rfqs', '0006_rfqcounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(django.db.models.functions.text.Lower('rep_email'), name='rfq_rep_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='rfq_email_idx'),
+        ),
+    ]
@@ -1,8 +1,14 @@
 # rfqs/models.py
 
 from django.db import models
+from django.db.models.functions import Lower
+from django.contrib.auth import get_user_model
 from datetime import date
 
+from inventory.models import Product
+
+User = get_user_model()
+
 class RFQ(models.Model):
     # Status choices
     DRAFT     = "draft"
@@ -13,6 +19,11 @@ class RFQ(models.Model):
         (SENT,      "Sent"),
         (COMPLETED, "Completed"),
     ]
+    # Allowed workflow moves: source status -> target statuses
+    TRANSITIONS = {
+        DRAFT: {SENT},
+        SENT:  {COMPLETED},
+    }
 
     # Step 1: Contact
     email    = models.EmailField()
@@ -59,5 +70,89 @@ class RFQ(models.Model):
     # Timestamp
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Open RFQs by date, for the overdue list and rfqs.stats.rollover
+            models.Index(fields=["due_date"], condition=~models.Q(status="completed"), name="rfq_open_due_idx"),
+            models.Index(fields=["needed_by"], condition=~models.Q(status="completed"), name="rfq_open_needed_idx"),
+            # Who may see an RFQ (rfqs.scoping)
+            models.Index(Lower("rep_email"), name="rfq_rep_email_idx"),
+            models.Index(Lower("email"), name="rfq_email_idx"),
+        ]
+
     def __str__(self):
         return f"{self.customer} @ {self.created_at.date()}"
+
+
+class RFQCounter(models.Model):
+    # One board count ("total", "status:sent", "urgency:3", "overdue", ...),
+    # kept current by rfqs.stats
+    key   = models.CharField(max_length=40, unique=True)
+    count = models.BigIntegerField(default=0)
+    # Date-based counts hold for this day until rfqs.stats.rollover moves them on
+    as_of = models.DateField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.count}"
+
+
+class RFQMatch(models.Model):
+    # Suggested catalog products for an RFQ, written by rfqs.matching
+    rfq     = models.ForeignKey(RFQ, related_name="matches", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="rfq_matches", on_delete=models.DO_NOTHING, db_constraint=False)
+    score   = models.FloatField()
+    rank    = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["rfq", "rank"]
+        unique_together = ("rfq", "product")
+
+    def __str__(self):
+        return f"RFQ #{self.rfq_id} -> {self.product_id} ({self.score:.2f})"
+
+
+class RFQAttachment(models.Model):
+    # A file sent with an RFQ, uploaded in parts by rfqs.attachments
+    UPLOADING = "uploading"
+    COMPLETE  = "complete"
+    STATUS_CHOICES = [
+        (UPLOADING, "Uploading"),
+        (COMPLETE,  "Complete"),
+    ]
+
+    rfq          = models.ForeignKey(RFQ, related_name="attachments", on_delete=models.CASCADE)
+    filename     = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default="application/octet-stream")
+    size         = models.BigIntegerField()
+    part_size    = models.PositiveIntegerField()
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    file         = models.FileField(upload_to="rfq_attachments/", max_length=255)
+    # sha256 over the part digests, "-<part count>" appended (as S3 multipart ETags)
+    checksum     = models.CharField(max_length=80, blank=True, default="")
+    uploaded_by  = models.ForeignKey(User, related_name="+", on_delete=models.SET_NULL, null=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["rfq", "created_at"]
+
+    @property
+    def part_count(self):
+        return max(1, -(-self.size // self.part_size))
+
+    def __str__(self):
+        return f"{self.filename} on RFQ #{self.rfq_id} ({self.status})"
+
+
+class RFQAttachmentPart(models.Model):
+    attachment = models.ForeignKey(RFQAttachment, related_name="parts", on_delete=models.CASCADE)
+    number     = models.PositiveIntegerField()  # 1-based
+    size       = models.PositiveIntegerField()
+    sha256     = models.CharField(max_length=64)
+
+    class Meta:
+        ordering = ["attachment", "number"]
+        unique_together = ("attachment", "number")
+
+    def __str__(self):
+        return f"Part {self.number} of attachment #{self.attachment_id}"
@@ -0,0 +1,33 @@
+# rfqs/scoping.py
+#
+# Which RFQs a user may see. Sales reps see the RFQs assigned to them (and
+# unassigned ones to pick up), clients and vendors the ones sent from their
+# address, matched along the lower(email) indexes; admins and warehouse
+# staff see every RFQ. Attachments follow their RFQ.
+
+from django.db.models.functions import Lower
+
+from .models import RFQ
+
+CLIENT_ROLES = {"neighbor-client", "other-client", "vendor"}
+REP_ROLE     = "sales-rep"
+
+
+def is_scoped(user):
+    """Whether ``user`` sees only some RFQs."""
+    return not user.is_authenticated or (
+        not user.is_superuser and getattr(user, "role", None) in CLIENT_ROLES | {REP_ROLE}
+    )
+
+
+def visible(user, qs=None):
+    """``qs`` (default: every RFQ) narrowed to what ``user`` may see."""
+    qs = RFQ.objects.all() if qs is None else qs
+    if not user.is_authenticated:
+        return qs.none()
+    if not is_scoped(user):
+        return qs
+    email = (user.email or "").lower()
+    if user.role == REP_ROLE:
+        return qs.alias(rep=Lower("rep_email")).filter(rep__in=[email, ""])
+    return qs.alias(sender=Lower("email")).filter(sender=email)
@@ -1,6 +1,7 @@
 # rfqs/serializers.py
 from rest_framework import serializers
-from .models import RFQ
+from . import scoping
+from .models import RFQ, RFQAttachment
 
 class RFQSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,3 +25,88 @@ class RFQSerializer(serializers.ModelSerializer):
             "status",
         ]
         read_only_fields = ["id", "created_at", "status"]
+
+
+class RFQBulkFilterSerializer(serializers.Serializer):
+    # Typed filter values, so a bad one is a 400 rather than a failing query
+    status         = serializers.ChoiceField(choices=RFQ.STATUS_CHOICES, required=False)
+    customer       = serializers.CharField(max_length=200, required=False)
+    rep_email      = serializers.EmailField(required=False, allow_blank=True)
+    urgency        = serializers.IntegerField(min_value=0, max_value=32767, required=False)
+    due_before     = serializers.DateField(required=False)
+    created_before = serializers.DateField(required=False)
+
+    def to_internal_value(self, data):
+        unknown = sorted(set(data) - set(self.fields)) if isinstance(data, dict) else []
+        if unknown:
+            raise serializers.ValidationError(f"Unknown filter key(s): {unknown}")
+        return super().to_internal_value(data)
+
+
+class RFQBulkTransitionSerializer(serializers.Serializer):
+    # Fields a bulk edit may set on every selected RFQ
+    EDITABLE = ["product_type", "rep_email", "urgency", "due_date", "needed_by", "internal_notes"]
+    # filter key -> ORM lookup
+    FILTERS = {
+        "status":         "status",
+        "customer":       "customer__iexact",
+        "rep_email":      "rep_email__iexact",
+        "urgency":        "urgency",
+        "due_before":     "due_date__lt",
+        "created_before": "created_at__date__lt",
+    }
+
+    ids     = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=10000)
+    filter  = RFQBulkFilterSerializer(required=False)
+    status  = serializers.ChoiceField(choices=RFQ.STATUS_CHOICES, required=False)
+    changes = serializers.DictField(required=False)
+
+    def validate_filter(self, value):
+        return {self.FILTERS[k]: v for k, v in value.items()}
+
+    def validate_changes(self, value):
+        unknown = sorted(set(value) - set(self.EDITABLE))
+        if unknown:
+            raise serializers.ValidationError(f"Field(s) not bulk-editable: {unknown}")
+        fields = RFQSerializer(data=value, partial=True)
+        fields.is_valid(raise_exception=True)
+        return fields.validated_data
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise serializers.ValidationError("Pass exactly one of ids or filter.")
+        if not attrs.get("status") and not attrs.get("changes"):
+            raise serializers.ValidationError("Pass a target status, changes, or both.")
+        if attrs.get("status") == RFQ.DRAFT:
+            raise serializers.ValidationError("RFQs cannot be moved back to draft.")
+        return attrs
+
+
+class VisibleRFQField(serializers.PrimaryKeyRelatedField):
+    # An RFQ the requesting user may see (rfqs.scoping)
+    def get_queryset(self):
+        request = self.context.get("request")
+        return scoping.visible(request.user) if request else RFQ.objects.none()
+
+
+class RFQAttachmentSerializer(serializers.ModelSerializer):
+    # write‐only
+    rfq_id    = VisibleRFQField(source="rfq", write_only=True)
+    part_size = serializers.IntegerField(min_value=1, required=False)
+    # read‐only
+    rfq            = serializers.IntegerField(source="rfq_id", read_only=True)
+    part_count     = serializers.IntegerField(read_only=True)
+    parts_received = serializers.IntegerField(read_only=True)
+    uploaded_by    = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model  = RFQAttachment
+        fields = [
+            "id", "rfq_id", "rfq",
+            "filename", "content_type", "size",
+            "part_size", "part_count", "parts_received",
+            "status", "checksum",
+            "uploaded_by", "created_at", "completed_at",
+        ]
+        read_only_fields = ["status", "checksum", "created_at", "completed_at"]
+        extra_kwargs = {"size": {"min_value": 0}, "content_type": {"required": False}}
@@ -0,0 +1,185 @@
+# rfqs/stats.py
+#
+# Counters behind the RFQ board header, so it reads a dozen RFQCounter
+# rows instead of counting (or downloading) every RFQ. Each RFQ counts
+# towards:
+#
+#   total, status:<status>          always
+#   urgency:<n>                     while open (not completed)
+#   overdue, past_needed_by         while open and due_date / needed_by is
+#                                   before the counters' as_of day
+#
+# Every write path passes the tracked fields before and after the change
+# to changed(), which applies only the difference, in the same transaction
+# as the write where the caller has one: saves and deletes through the
+# signal receivers below, bulk_transition and the dispatch job explicitly
+# (queryset.update() sends no signals).
+#
+# The date-based counts go stale at midnight. rollover(), run daily by the
+# rollover_rfq_stats command and lazily by snapshot(), adds the open RFQs
+# whose date fell between as_of and today, via the partial indexes on
+# open RFQs, and moves as_of to today.
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import RFQ, RFQCounter
+
+TRACKED = ("status", "urgency", "due_date", "needed_by")
+DATED   = {"overdue": "due_date", "past_needed_by": "needed_by"}
+
+
+def row(rfq):
+    return tuple(getattr(rfq, field) for field in TRACKED)
+
+
+def buckets(values, as_of):
+    """Counter keys an RFQ with ``values`` (see TRACKED) counts towards."""
+    status, urgency, due_date, needed_by = values
+    keys = ["total", f"status:{status}"]
+    if status != RFQ.COMPLETED:
+        keys.append(f"urgency:{urgency}")
+        keys += [key for key, day in zip(DATED, (due_date, needed_by)) if day and day < as_of]
+    return keys
+
+
+def _as_of():
+    """The day the date-based counts hold for (locks them); None before the first rebuild."""
+    return (
+        RFQCounter.objects.select_for_update()
+        .filter(key__in=DATED)
+        .values_list("as_of", flat=True)
+        .first()
+    )
+
+
+def changed(pairs):
+    """
+    Apply (before, after) pairs of TRACKED values; before is None for a new
+    RFQ, after is None for a deleted one.
+    """
+    pairs = [(before, after) for before, after in pairs if before != after]
+    if not pairs:
+        return
+    with transaction.atomic():
+        as_of = _as_of()
+        if as_of is None:
+            return  # nothing counted yet: snapshot() rebuilds from scratch
+        delta = Counter()
+        for before, after in pairs:
+            if before:
+                delta.subtract(buckets(before, as_of))
+            if after:
+                delta.update(buckets(after, as_of))
+        for key, n in delta.items():
+            if n and not RFQCounter.objects.filter(key=key).update(count=F("count") + n):
+                RFQCounter.objects.create(key=key, count=n)
+
+
+def rollover(today=None):
+    """Move the date-based counts on to ``today``; returns how many RFQs became due."""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        as_of = _as_of()
+        if as_of is None or as_of >= today:
+            return 0
+        open_rfqs = RFQ.objects.exclude(status=RFQ.COMPLETED)
+        added = 0
+        for key, field in DATED.items():
+            n = open_rfqs.filter(**{f"{field}__gte": as_of, f"{field}__lt": today}).count()
+            RFQCounter.objects.filter(key=key).update(count=F("count") + n, as_of=today)
+            added += n
+    return added
+
+
+def _tally(qs, today):
+    """Counter keys -> counts over the RFQs in ``qs``, counted from scratch."""
+    open_rfqs = qs.exclude(status=RFQ.COMPLETED)
+    counts = Counter({"total": 0, **{key: 0 for key in DATED}})
+    for status, n in qs.values_list("status").annotate(n=Count("pk")).order_by():
+        counts["total"] += n
+        counts[f"status:{status}"] = n
+    for urgency, n in open_rfqs.values_list("urgency").annotate(n=Count("pk")).order_by():
+        counts[f"urgency:{urgency}"] = n
+    for key, field in DATED.items():
+        counts[key] = open_rfqs.filter(**{f"{field}__lt": today}).count()
+    return counts
+
+
+def rebuild(today=None):
+    """Recount everything from the RFQ table (first use, or to repair drift)."""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        counts = _tally(RFQ.objects.all(), today)
+        RFQCounter.objects.all().delete()
+        RFQCounter.objects.bulk_create(
+            RFQCounter(key=key, count=n, as_of=today if key in DATED else None)
+            for key, n in counts.items()
+        )
+    return counts
+
+
+def snapshot():
+    """The board counts, rolled over to today first if the daily job hasn't run."""
+    counters = list(RFQCounter.objects.values_list("key", "count", "as_of"))
+    as_of = {key: day for key, _, day in counters}
+    if "total" not in as_of:
+        rebuild()
+    elif as_of.get("overdue") and as_of["overdue"] < timezone.localdate():
+        rollover()
+    else:
+        as_of = None
+    if as_of is not None:
+        counters = RFQCounter.objects.values_list("key", "count", "as_of")
+    return _board(counters)
+
+
+def count(qs):
+    """The board counts over ``qs`` alone, counted on the spot (for small, scoped sets)."""
+    today = timezone.localdate()
+    return _board((key, n, today if key in DATED else None) for key, n in _tally(qs, today).items())
+
+
+def _board(counters):
+    by_status = {code: 0 for code, _ in RFQ.STATUS_CHOICES}
+    by_urgency, dated, total, as_of = {}, {}, 0, None
+    for key, n, day in counters:
+        kind, _, value = key.partition(":")
+        if kind == "status":
+            by_status[value] = n
+        elif kind == "urgency":
+            if n:
+                by_urgency[int(value)] = n
+        elif key in DATED:
+            dated[key], as_of = n, day
+        elif key == "total":
+            total = n
+    return {
+        "total":      total,
+        "open":       total - by_status[RFQ.COMPLETED],
+        "by_status":  by_status,
+        "by_urgency": dict(sorted(by_urgency.items())),
+        **dated,
+        "as_of":      as_of,
+    }
+
+
+# Signal receivers (connected in RfqsConfig.ready)
+def rfq_pre_save(sender, instance, update_fields=None, **kwargs):
+    instance._stats_before = None
+    if instance.pk and (update_fields is None or set(update_fields) & set(TRACKED)):
+        instance._stats_before = RFQ.objects.filter(pk=instance.pk).values_list(*TRACKED).first()
+
+
+def rfq_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        changed([(None, row(instance))])
+    elif instance._stats_before:
+        changed([(instance._stats_before, row(instance))])
+
+
+def rfq_deleted(sender, instance, **kwargs):
+    changed([(row(instance), None)])
@@ -1,3 +1,346 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from inventory.models import InventoryRecord, Product, Warehouse
+from jobs.models import Job
+from jobs.worker import Worker
+from . import attachments, matching, stats
+from .models import RFQ, RFQAttachment, RFQCounter, RFQMatch
+
+User = get_user_model()
+
+
+def make_rfq(**fields):
+    return RFQ.objects.create(**{
+        "email":       "client@example.com",
+        "customer":    "Acme",
+        "product":     "Hex bolt",
+        "description": "M8 x 40, zinc",
+        "rep_email":   "rep@example.com",
+        **fields,
+    })
+
+
+class RFQAPITestCase(APITestCase):
+    # RFQs link to catalog products, which may share a database with the ledger
+    databases = "__all__"
+
+    def setUp(self):
+        self.user = User.objects.create_user("admin", role="admin")
+        self.client.force_authenticate(self.user)
+
+
+class DispatchTests(TransactionTestCase):
+    # Jobs run on the worker's own threads, which need committed rows
+    databases = "__all__"
+
+    def test_send_queues_one_dispatch_and_mails_once(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", role="admin"))
+        rfq = make_rfq()
+        self.assertEqual(client.post(f"/api/rfqs/{rfq.pk}/send/").status_code, 202)
+        self.assertEqual(client.post(f"/api/rfqs/{rfq.pk}/send/").status_code, 202)
+        self.assertEqual(Job.objects.filter(kind="rfq.dispatch").count(), 1)
+
+        Worker(threads=2).run(once=True)
+        rfq.refresh_from_db()
+        self.assertEqual(rfq.status, RFQ.SENT)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["rep@example.com", "client@example.com"])
+        self.assertEqual(client.post(f"/api/rfqs/{rfq.pk}/send/").status_code, 400)
+
+
+class BulkTransitionTests(RFQAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.draft, self.sent, self.done = (make_rfq(status=s) for s in (RFQ.DRAFT, RFQ.SENT, RFQ.COMPLETED))
+
+    def bulk(self, **body):
+        return self.client.post("/api/rfqs/bulk-transition/", body, format="json")
+
+    def test_ids_that_cannot_move_are_skipped(self):
+        response = self.bulk(ids=[self.draft.pk, self.sent.pk, self.done.pk, 999], status=RFQ.COMPLETED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], [self.sent.pk])
+        self.assertEqual(response.data["skipped"], [
+            {"id": self.draft.pk, "status": RFQ.DRAFT, "reason": "cannot move from draft to completed"},
+            {"id": self.done.pk, "status": RFQ.COMPLETED, "reason": "cannot move from completed to completed"},
+            {"id": 999, "status": None, "reason": "not found"},
+        ])
+        self.assertEqual(RFQ.objects.get(pk=self.draft.pk).status, RFQ.DRAFT)
+
+    def test_filter_with_changes(self):
+        make_rfq(customer="Zed")
+        response = self.bulk(filter={"customer": "ACME", "status": RFQ.DRAFT}, status=RFQ.SENT, changes={"urgency": 1})
+        self.assertEqual(response.data["updated"], [self.draft.pk])
+        self.draft.refresh_from_db()
+        self.assertEqual((self.draft.status, self.draft.urgency), (RFQ.SENT, 1))
+
+        # A plain edit touches every match, whatever its status
+        response = self.bulk(filter={"customer": "acme"}, changes={"rep_email": "other@example.com"})
+        self.assertEqual(len(response.data["updated"]), 3)
+        self.assertEqual(RFQ.objects.filter(rep_email="other@example.com").count(), 3)
+
+    def test_invalid_requests_are_rejected(self):
+        for body in (
+            {"filter": {"urgency": "high"}, "status": RFQ.SENT},
+            {"filter": {"due_before": "2024-02-30"}, "status": RFQ.SENT},
+            {"filter": {"colour": "red"}, "status": RFQ.SENT},
+            {"ids": [self.draft.pk], "changes": {"status": RFQ.SENT}},
+            {"ids": [self.draft.pk], "changes": {"urgency": "x"}},
+            {"ids": [self.sent.pk], "status": RFQ.DRAFT},
+            {"ids": [self.draft.pk], "filter": {"customer": "Acme"}, "status": RFQ.SENT},
+            {"ids": [self.draft.pk]},
+        ):
+            self.assertEqual(self.bulk(**body).status_code, 400, body)
+        self.assertEqual(RFQ.objects.filter(status=RFQ.DRAFT).count(), 1)
+
+
+class MatchingTests(RFQAPITestCase):
+    def setUp(self):
+        super().setUp()
+        names = ["Stainless hex bolt M8", "Brass pipe elbow", "Rubber hose clamp", "Galvanized wood screw", "Copper pipe"]
+        self.products = [Product.objects.create(name=name, sku=f"SKU-{i}", default_uom="ea") for i, name in enumerate(names)]
+        self.index = matching.CatalogIndex()
+        self.index.rebuild()
+
+    def best(self, text):
+        return [pk for pk, _ in self.index.search(text)][:1]
+
+    def test_closest_name_ranks_first(self):
+        self.assertEqual(self.best("need hex bolts, stainless, m8"), [self.products[0].pk])
+        self.assertEqual(self.best("brass elbows for pipe"), [self.products[1].pk])
+        self.assertEqual(self.index.search("zzzz qqqq"), [])
+
+    def test_mentioned_sku_ranks_first(self):
+        self.assertEqual(self.best("copper pipe, same as SKU-1"), [self.products[1].pk])
+
+    def test_index_follows_catalog_edits(self):
+        renamed = self.products[2]
+        renamed.name = "Titanium widget"
+        self.index.update(renamed)
+        self.assertEqual(self.best("titanium widgets"), [renamed.pk])
+        self.index.remove(renamed.pk)
+        self.assertNotIn(renamed.pk, [pk for pk, _ in self.index.search("titanium widgets")])
+
+    def test_matches_endpoint_reports_stock(self):
+        matching.get_index().rebuild()  # the shared index may predate this test's products
+        warehouse = Warehouse.objects.create(name="North", location="A")
+        InventoryRecord.objects.create(product=self.products[3], warehouse=warehouse, quantity_on_hand=7, quantity_reserved=2)
+        rfq = make_rfq(product="wood screws", description="galvanized")
+        response = self.client.get(f"/api/rfqs/{rfq.pk}/matches/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["product"]["id"], self.products[3].pk)
+        self.assertEqual((response.data[0]["stock"]["on_hand"], response.data[0]["stock"]["available"]), (7, 5))
+        self.assertEqual(RFQMatch.objects.filter(rfq=rfq, rank=1).get().product_id, self.products[3].pk)
+
+    def test_editing_the_request_text_rematches(self):
+        matching.get_index().rebuild()
+        rfq = make_rfq(product="wood screws", description="galvanized")
+        matching.store_matches([rfq])
+        self.client.patch(f"/api/rfqs/{rfq.pk}/", {"urgency": 2}, format="json")
+        self.assertFalse(Job.objects.filter(kind="rfq.match").exists())
+
+        self.client.patch(f"/api/rfqs/{rfq.pk}/", {"product": "brass elbow", "description": "for pipe"}, format="json")
+        self.assertEqual(Job.objects.filter(kind="rfq.match", payload={"rfq_id": rfq.pk}).count(), 1)
+        response = self.client.get(f"/api/rfqs/{rfq.pk}/matches/")
+        self.assertEqual(response.data[0]["product"]["id"], self.products[1].pk)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class AttachmentTests(RFQAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.rfq = make_rfq()
+        self.data = os.urandom(2 * attachments.MIN_PART_SIZE + 17)
+        response = self.client.post("/api/rfq-attachments/", {
+            "rfq_id": self.rfq.pk, "filename": "../x/drawing.dwg", "size": len(self.data), "part_size": 1,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.attachment = response.data["id"]
+        size = response.data["part_size"]
+        self.parts = [self.data[i:i + size] for i in range(0, len(self.data), size)]
+
+    def url(self, suffix=""):
+        return f"/api/rfq-attachments/{self.attachment}/{suffix}"
+
+    def put(self, number, body, **headers):
+        return self.client.put(self.url(f"parts/{number}/"), body, content_type="application/octet-stream", **headers)
+
+    def upload(self):
+        for number, body in enumerate(self.parts, 1):
+            self.assertEqual(self.put(number, body).status_code, 200)
+        checksum = attachments.composite_checksum([hashlib.sha256(p).hexdigest() for p in self.parts])
+        return self.client.post(self.url("complete/"), {"checksum": checksum}, format="json")
+
+    def download(self, **headers):
+        response = self.client.get(self.url("download/"), **headers)
+        return response, b"".join(getattr(response, "streaming_content", []))
+
+    def test_parts_resume_in_any_order(self):
+        self.assertEqual(len(self.parts), 3)  # part_size was raised to the minimum
+        self.assertEqual(self.put(3, self.parts[2]).status_code, 200)
+        self.assertEqual(self.put(1, self.parts[0][:100]).status_code, 400)
+        self.assertEqual(self.put(1, self.parts[0], HTTP_X_PART_CHECKSUM="00").status_code, 400)
+        self.assertEqual(self.put(4, b"x").status_code, 400)
+
+        detail = self.client.get(self.url()).data
+        self.assertEqual((detail["filename"], detail["missing_parts"]), ("drawing.dwg", [1, 2]))
+        self.assertEqual(self.client.post(self.url("complete/")).status_code, 400)
+        self.assertEqual(self.download()[0].status_code, 409)
+
+        digest = hashlib.sha256(self.parts[0]).hexdigest()
+        self.assertEqual(self.put(1, self.parts[0], HTTP_X_PART_CHECKSUM=digest).data["sha256"], digest)
+        self.assertEqual(self.put(2, self.parts[1]).status_code, 200)
+        self.assertEqual(self.client.get(self.url()).data["missing_parts"], [])
+
+    def test_complete_checks_the_composite_checksum(self):
+        for number, body in enumerate(self.parts, 1):
+            self.put(number, body)
+        self.assertEqual(self.client.post(self.url("complete/"), {"checksum": "0-3"}, format="json").status_code, 400)
+        response = self.upload()
+        self.assertEqual((response.status_code, response.data["status"]), (200, RFQAttachment.COMPLETE))
+        self.assertEqual(self.put(1, self.parts[0]).status_code, 400)
+
+    def test_download_honours_ranges(self):
+        self.upload()
+        response, body = self.download()
+        self.assertEqual((response.status_code, body), (200, self.data))
+        self.assertEqual(response["Content-Length"], str(len(self.data)))
+
+        response, body = self.download(HTTP_RANGE="bytes=100-199")
+        self.assertEqual((response.status_code, response["Content-Range"]), (206, f"bytes 100-199/{len(self.data)}"))
+        self.assertEqual(body, self.data[100:200])
+        response, body = self.download(HTTP_RANGE="bytes=-10")
+        self.assertEqual((response.status_code, body), (206, self.data[-10:]))
+        response, _ = self.download(HTTP_RANGE=f"bytes={len(self.data)}-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, f"bytes */{len(self.data)}"))
+
+    def test_list_filter_and_cleanup(self):
+        self.assertEqual(len(self.client.get(f"/api/rfq-attachments/?rfq={self.rfq.pk}").data), 1)
+        self.assertEqual(self.client.get("/api/rfq-attachments/?rfq=abc").status_code, 400)
+        path = RFQAttachment.objects.get(pk=self.attachment).file.path
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rfq.delete()
+        self.assertFalse(os.path.exists(path))
+
+
+class StatsTests(RFQAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        make_rfq(urgency=2, due_date=self.today - timedelta(days=3))
+        make_rfq(status=RFQ.COMPLETED, due_date=self.today - timedelta(days=3))
+
+    def board(self):
+        response = self.client.get("/api/rfqs/stats/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertCountersHold(self):
+        counted = self.board()
+        stats.rebuild()
+        self.assertEqual(counted, self.board())
+        return counted
+
+    def test_counters_follow_every_write_path(self):
+        board = self.assertCountersHold()  # first read builds the counters
+        self.assertEqual((board["total"], board["open"], board["overdue"]), (2, 1, 1))
+
+        ids = [
+            self.client.post("/api/rfqs/", {
+                "email": "client@example.com", "customer": f"C{i}", "product": "Nut", "description": "M8",
+                "urgency": i % 3 + 1, "due_date": str(self.today + timedelta(days=i - 2)),
+            }, format="json").data["id"]
+            for i in range(6)
+        ]
+        self.assertEqual(self.assertCountersHold()["overdue"], 3)
+
+        self.client.patch(f"/api/rfqs/{ids[5]}/", {"needed_by": str(self.today - timedelta(days=1)), "urgency": 5}, format="json")
+        self.assertCountersHold()
+        self.client.post("/api/rfqs/bulk-transition/", {"ids": ids[:3], "status": RFQ.SENT}, format="json")
+        self.client.post("/api/rfqs/bulk-transition/", {"ids": ids[:2], "status": RFQ.COMPLETED, "changes": {"urgency": 1}}, format="json")
+        self.assertEqual(self.assertCountersHold()["by_status"][RFQ.COMPLETED], 3)
+        self.client.delete(f"/api/rfqs/{ids[3]}/")
+        self.assertEqual(self.assertCountersHold()["total"], 7)
+
+    def test_rebuild_repairs_drift_and_rollover_catches_up(self):
+        self.board()
+        RFQCounter.objects.filter(key="total").update(count=99)
+        self.assertEqual(self.board()["total"], 99)
+        stats.rebuild()
+        self.assertEqual(self.board()["total"], 2)
+
+        # The daily job didn't run: an RFQ due yesterday isn't counted yet
+        make_rfq(due_date=self.today - timedelta(days=1))
+        RFQCounter.objects.filter(key__in=stats.DATED).update(as_of=self.today - timedelta(days=2))
+        RFQCounter.objects.filter(key="overdue").update(count=1)
+        board = self.board()
+        self.assertEqual((board["overdue"], board["as_of"]), (2, self.today))
+
+    def test_overdue_lists_open_rfqs_oldest_first(self):
+        late = make_rfq(due_date=self.today - timedelta(days=5))
+        make_rfq(due_date=self.today + timedelta(days=1))
+        make_rfq(needed_by=self.today - timedelta(days=1))
+        response = self.client.get("/api/rfqs/overdue/")
+        self.assertEqual([rfq["id"] for rfq in response.data], [late.pk, RFQ.objects.order_by("pk")[0].pk])
+        self.assertEqual(len(self.client.get("/api/rfqs/overdue/?by=needed_by").data), 1)
+        self.assertEqual(self.client.get("/api/rfqs/overdue/?by=created_at").status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ScopingTests(RFQAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.mine = make_rfq(email="Client@Example.com", rep_email="Rep@Example.com")
+        self.unassigned = make_rfq(email="other@example.com", rep_email="")
+        self.theirs = make_rfq(email="other@example.com", rep_email="someone@example.com", status=RFQ.COMPLETED)
+        self.file = attachments.start(self.theirs, "quote.pdf", 10)
+
+    def as_user(self, role, email):
+        self.client.force_authenticate(User.objects.create_user(f"{role}-{email}", email=email, role=role))
+
+    def visible(self):
+        return sorted(rfq["id"] for rfq in self.client.get("/api/rfqs/").data)
+
+    def test_staff_see_every_rfq(self):
+        everything = sorted(rfq.pk for rfq in (self.mine, self.unassigned, self.theirs))
+        self.assertEqual(self.visible(), everything)
+        self.as_user("warehouse-staff", "picker@example.com")
+        self.assertEqual(self.visible(), everything)
+        self.assertEqual(self.client.get("/api/rfqs/stats/").data["total"], 3)
+
+    def test_reps_see_their_own_and_unassigned_rfqs(self):
+        self.as_user("sales-rep", "rep@example.com")
+        self.assertEqual(self.visible(), [self.mine.pk, self.unassigned.pk])
+        self.assertEqual(self.client.get(f"/api/rfqs/{self.theirs.pk}/").status_code, 404)
+        board = self.client.get("/api/rfqs/stats/").data
+        self.assertEqual((board["total"], board["by_status"][RFQ.COMPLETED]), (2, 0))
+
+    def test_clients_and_vendors_see_what_they_sent(self):
+        self.as_user("other-client", "client@example.com")
+        self.assertEqual(self.visible(), [self.mine.pk])
+        self.as_user("vendor", "OTHER@example.com")
+        self.assertEqual(self.visible(), [self.unassigned.pk, self.theirs.pk])
+        self.assertEqual(self.client.get("/api/rfqs/stats/").data["total"], 2)
+
+    def test_attachments_follow_their_rfq(self):
+        self.as_user("other-client", "client@example.com")
+        self.assertEqual(self.client.get("/api/rfq-attachments/").data, [])
+        self.assertEqual(self.client.get(f"/api/rfq-attachments/{self.file.pk}/").status_code, 404)
+        self.as_user("vendor", "other@example.com")
+        self.assertEqual([a["id"] for a in self.client.get("/api/rfq-attachments/").data], [self.file.pk])
+
+    def test_anonymous_requests_are_refused(self):
+        self.client.force_authenticate(None)
+        for url in ("/api/rfqs/", "/api/rfqs/stats/", "/api/rfq-attachments/"):
+            self.assertIn(self.client.get(url).status_code, (401, 403), url)
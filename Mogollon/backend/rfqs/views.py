@@ -1,8 +1,244 @@
-from rest_framework import viewsets, permissions
-from .models import RFQ
-from .serializers import RFQSerializer
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+from jobs.queue import enqueue
+from jobs.serializers import JobSerializer
+from inventory.serializers import ProductSerializer
+from . import attachments, matching, scoping, stats
+from .models import RFQ, RFQAttachment
+from .serializers import RFQSerializer, RFQBulkTransitionSerializer, RFQAttachmentSerializer
 
 class RFQViewSet(viewsets.ModelViewSet):
     queryset = RFQ.objects.all()
     serializer_class = RFQSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    # Only the RFQs the user's role may see (rfqs.scoping)
+    def get_queryset(self):
+        return scoping.visible(self.request.user, super().get_queryset())
+
+    def perform_create(self, serializer):
+        rfq = serializer.save()
+        # Catalog matching runs in the worker, which keeps the index warm
+        enqueue("rfq.match", {"rfq_id": rfq.pk}, created_by=self.request.user)
+
+    def perform_update(self, serializer):
+        text = matching.rfq_text(serializer.instance)
+        rfq = serializer.save()
+        # Stored matches follow the text they were computed from: drop them
+        # (matches recomputes on demand) and have the worker store new ones
+        if matching.rfq_text(rfq) != text:
+            rfq.matches.all().delete()
+            enqueue("rfq.match", {"rfq_id": rfq.pk}, created_by=self.request.user)
+
+    # Board header counts, read from rfqs.stats counters; users who see only
+    # some RFQs get them counted over those instead
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        if scoping.is_scoped(request.user):
+            return Response(stats.count(self.get_queryset()))
+        return Response(stats.snapshot())
+
+    # Open RFQs past their due date (?by=needed_by for the needed-by date),
+    # oldest first, read along the partial index on open RFQs
+    @action(detail=False, methods=["get"])
+    def overdue(self, request):
+        field = request.query_params.get("by", "due_date")
+        if field not in stats.DATED.values():
+            return Response(
+                {"error": f"by must be one of {sorted(stats.DATED.values())}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        qs = (
+            self.get_queryset()
+            .exclude(status=RFQ.COMPLETED)
+            .filter(**{f"{field}__lt": timezone.localdate()})
+            .order_by(field, "pk")
+        )
+        return Response(self.get_serializer(qs, many=True).data)
+
+    # Suggested catalog products with current stock; ?refresh=1 recomputes now
+    @action(detail=True, methods=["get"])
+    def matches(self, request, pk=None):
+        rfq = self.get_object()
+        if request.query_params.get("refresh") or not rfq.matches.exists():
+            matching.store_matches([rfq])
+        matches = list(rfq.matches.prefetch_related("product"))  # products live with the ledger
+        stock = matching.stock_by_product([m.product_id for m in matches])
+        return Response([
+            {
+                "rank":    m.rank,
+                "score":   m.score,
+                "product": ProductSerializer(m.product).data,
+                "stock":   stock[m.product_id],
+            }
+            for m in matches
+        ])
+
+    # Queue the RFQ for e-mail dispatch; status flips to "sent" once delivered
+    @action(detail=True, methods=["post"])
+    def send(self, request, pk=None):
+        rfq = self.get_object()
+        if rfq.status != RFQ.DRAFT:
+            return Response(
+                {"error": f"RFQ is already {rfq.status}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        job = enqueue(
+            "rfq.dispatch",
+            {"rfq_id": rfq.pk},
+            key=f"rfq.dispatch:{rfq.pk}",
+            created_by=request.user,
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    # Move many RFQs to a new status (and/or apply the same edits) with one
+    # conditional UPDATE per allowed source status
+    @action(detail=False, methods=["post"], url_path="bulk-transition")
+    def bulk_transition(self, request):
+        serializer = RFQBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        target = data.get("status")
+        changes = data.get("changes", {})
+
+        selected = self.get_queryset()
+        if "ids" in data:
+            selected = selected.filter(pk__in=data["ids"])
+        else:
+            selected = selected.filter(**data["filter"])
+
+        if target:
+            sources = [src for src, targets in RFQ.TRANSITIONS.items() if target in targets]
+            changes = {**changes, "status": target}
+        else:
+            sources = [None]  # plain bulk edit: every selected RFQ, whatever its status
+
+        updated = []
+        with transaction.atomic():
+            for source in sources:
+                scoped = selected if source is None else selected.filter(status=source)
+                rows = {pk: values for pk, *values in scoped.select_for_update().values_list("pk", *stats.TRACKED)}
+                if rows:
+                    scoped.filter(pk__in=rows).update(**changes)
+                    updated.extend(rows)
+                    # update() sends no signals: move the board counters here
+                    stats.changed([
+                        (tuple(values), tuple(changes.get(f, v) for f, v in zip(stats.TRACKED, values)))
+                        for values in rows.values()
+                    ])
+
+        done = set(updated)
+        found = dict(selected.exclude(pk__in=done).values_list("pk", "status"))
+        skipped = [
+            {"id": pk, "status": current, "reason": f"cannot move from {current} to {target}"}
+            for pk, current in sorted(found.items())
+        ]
+        if "ids" in data:
+            skipped += [
+                {"id": pk, "status": None, "reason": "not found"}
+                for pk in sorted(set(data["ids"]) - done - found.keys())
+            ]
+        return Response({"updated": sorted(done), "skipped": skipped})
+
+
+class RFQAttachmentViewSet(mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    POST {rfq_id, filename, size, content_type?, part_size?} on /api/rfq-attachments/
+    starts an upload; GET lists them (filter: rfq). Then
+         PUT  /api/rfq-attachments/{pk}/parts/{n}/  raw bytes of part n (1-based),
+              optional X-Part-Checksum: <sha256 hex>; re-sending a part replaces it
+         GET  /api/rfq-attachments/{pk}/            includes missing_parts, to resume
+         POST /api/rfq-attachments/{pk}/complete/   {checksum?}
+         GET  /api/rfq-attachments/{pk}/download/   honours a single Range
+    """
+    serializer_class = RFQAttachmentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = (
+            RFQAttachment.objects.filter(rfq__in=scoping.visible(self.request.user))
+            .select_related("uploaded_by")
+            .annotate(parts_received=Count("parts"))
+        )
+        rfq_id = self.request.query_params.get("rfq")
+        if rfq_id:
+            try:
+                qs = qs.filter(rfq_id=int(rfq_id))
+            except ValueError:
+                raise ValidationError({"error": "rfq must be an integer."})
+        return qs
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            attachment = attachments.start(uploaded_by=request.user, **serializer.validated_data)
+        except attachments.UploadError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_queryset().get(pk=attachment.pk)).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        attachment = self.get_object()
+        received = set(attachment.parts.values_list("number", flat=True))
+        missing = [n for n in range(1, attachment.part_count + 1) if n not in received]
+        return Response({**self.get_serializer(attachment).data, "missing_parts": missing})
+
+    # The body is read straight off the request stream, never via request.data
+    @action(detail=True, methods=["put"], url_path=r"parts/(?P<number>\d+)")
+    def part(self, request, pk=None, number=None):
+        attachment = self.get_object()
+        try:
+            part = attachments.write_part(
+                attachment, int(number), request.stream, request.headers.get("X-Part-Checksum")
+            )
+        except attachments.UploadError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"number": part.number, "size": part.size, "sha256": part.sha256})
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        attachment = self.get_object()
+        try:
+            attachments.complete(attachment.pk, checksum=request.data.get("checksum"))
+        except attachments.UploadError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_queryset().get(pk=attachment.pk)).data)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        attachment = self.get_object()
+        if attachment.status != RFQAttachment.COMPLETE:
+            return Response({"error": "Attachment is still uploading."}, status=status.HTTP_409_CONFLICT)
+        size = attachment.size
+        try:
+            byte_range = attachments.parse_range(request.headers.get("Range"), size)
+        except attachments.RangeNotSatisfiable:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        first, last = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            attachments.read_range(attachment.file.path, first, last),
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type=attachment.content_type,
+        )
+        if byte_range:
+            response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Content-Length"] = str(last - first + 1)
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = f'"{attachment.checksum}"'
+        response["Content-Disposition"] = content_disposition_header(True, attachment.filename)
+        return response
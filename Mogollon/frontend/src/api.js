@@ -34,14 +34,81 @@ api.interceptors.response.use(
 
 // ——— Helper methods for inventory transactions ———
 
+function idempotencyHeaders(key) {
+  return key ? { headers: { "Idempotency-Key": key } } : {};
+}
+
 /**
  * Create an intake or depletion transaction.
  * @param {Object} data
- *   { product_id, warehouse_id, transaction_type, quantity, uom, reason?, reference?, notes? }
+ *   { product_id, warehouse_id, transaction_type, quantity, uom, unit_cost?, reason?, reference?, notes? }
+ *   (unit_cost, per uom, on intakes only; depletions are costed FIFO)
+ * @param {string} [idempotencyKey] reuse the same key when retrying so stock moves only once
+ * @returns {Promise<axios.Response>}
+ */
+export function recordTransaction(data, idempotencyKey) {
+  return api.post("/inventory/transactions/", data, idempotencyHeaders(idempotencyKey));
+}
+
+/**
+ * Post many intake/depletion rows atomically.
+ * @param {Object[]} transactions same shape as recordTransaction's data
+ * @param {string} [idempotencyKey]
+ * @returns {Promise<axios.Response>}
+ */
+export function recordBulkTransactions(transactions, idempotencyKey) {
+  return api.post("/inventory/transactions/bulk/", { transactions }, idempotencyHeaders(idempotencyKey));
+}
+
+/**
+ * Move stock between warehouses in one atomic call.
+ * @param {Object} data
+ *   { from_warehouse_id, to_warehouse_id, lines: [{ product_id, quantity, uom }], reference?, notes? }
+ * @param {string} [idempotencyKey]
+ * @returns {Promise<axios.Response>}
+ */
+export function recordTransfer(data, idempotencyKey) {
+  return api.post("/inventory/transfers/", data, idempotencyHeaders(idempotencyKey));
+}
+
+/**
+ * Records (as id-based rows), the products they hold, warehouses and KPIs in one call.
+ * @param {number|string} [warehouseId] limit records to one warehouse
+ * @returns {Promise<axios.Response>}
+ *   { columns, records: [[...]], products, warehouses, kpis }
+ */
+export function fetchInventoryDashboard(warehouseId) {
+  return api.get("/inventory/dashboard/", { params: warehouseId ? { warehouse: warehouseId } : {} });
+}
+
+/**
+ * Resolve a scanned SKU to its product and per-warehouse balances.
+ * @param {string} sku
+ * @returns {Promise<axios.Response>} { product, stock: [...], totals }
+ */
+export function scanSku(sku) {
+  return api.get(`/scan/${encodeURIComponent(sku)}/`);
+}
+
+/**
+ * Plan (and optionally reserve or deplete) the source warehouses for an order.
+ * @param {Object} data
+ *   { lines: [{ product_id, quantity }], latitude, longitude, max_distance_km?,
+ *     action?: "plan" | "reserve" | "deplete", allow_partial?, reference?, notes? }
+ * @returns {Promise<axios.Response>} { shipments, unfilled, shipment_count, total_distance_km }
+ */
+export function allocateOrder(data) {
+  return api.post("/allocations/", data);
+}
+
+/**
+ * Stock value at FIFO cost, summed over the open cost layers.
+ * @param {Object} [params] { group?: "warehouse"|"product", warehouse?, product? }
  * @returns {Promise<axios.Response>}
+ *   { total_value, rows: [{ warehouse_id, warehouse, product_id?, sku?, quantity, uncosted_quantity, value }] }
  */
-export function recordTransaction(data) {
-  return api.post("/inventory/transactions/", data);
+export function fetchInventoryValuation(params = {}) {
+  return api.get("/inventory/valuation/", { params });
 }
 
 /**
@@ -53,4 +120,117 @@ export function fetchRecordTransactions(recordId) {
   return api.get(`/inventory/${recordId}/transactions/`);
 }
 
+/**
+ * Fetch a record's stock level over time, downsampled for charting.
+ * @param {number|string} recordId
+ * @param {Object} [params] { from?, to?, points? } (ISO dates / datetimes)
+ * @returns {Promise<axios.Response>} { from, to, transactions, series: [[epochMs, balance], ...] }
+ */
+export function fetchRecordSeries(recordId, params = {}) {
+  return api.get(`/inventory/${recordId}/series/`, { params });
+}
+
+/**
+ * Queue an RFQ for e-mail dispatch; its status becomes "sent" once delivered.
+ * @param {number|string} rfqId
+ * @returns {Promise<axios.Response>} the queued background job
+ */
+export function sendRFQ(rfqId) {
+  return api.post(`/rfqs/${rfqId}/send/`);
+}
+
+/**
+ * RFQ board header counts, kept as counters on the server.
+ * @returns {Promise<axios.Response>}
+ *   { total, open, by_status, by_urgency, overdue, past_needed_by, as_of }
+ */
+export function fetchRFQStats() {
+  return api.get("/rfqs/stats/");
+}
+
+/**
+ * Open RFQs past their due date (or needed-by date), oldest first.
+ * @param {"due_date"|"needed_by"} [by]
+ * @returns {Promise<axios.Response>}
+ */
+export function fetchOverdueRFQs(by = "due_date") {
+  return api.get("/rfqs/overdue/", { params: { by } });
+}
+
+/**
+ * Suggested catalog products (with stock per warehouse) for an RFQ.
+ * @param {number|string} rfqId
+ * @param {boolean} [refresh] recompute instead of returning stored matches
+ * @returns {Promise<axios.Response>}
+ */
+export function fetchRFQMatches(rfqId, refresh = false) {
+  return api.get(`/rfqs/${rfqId}/matches/`, { params: refresh ? { refresh: 1 } : {} });
+}
+
+/**
+ * Upload a file to an RFQ in parts (see resumeRFQAttachment).
+ * @param {number|string} rfqId
+ * @param {File|Blob} file
+ * @param {(sent: number, total: number) => void} [onProgress]
+ * @returns {Promise<axios.Response>} the completed attachment
+ */
+export function uploadRFQAttachment(rfqId, file, onProgress) {
+  return api
+    .post("/rfq-attachments/", {
+      rfq_id: rfqId,
+      filename: file.name || "attachment",
+      size: file.size,
+      content_type: file.type || undefined,
+    })
+    .then(({ data }) => resumeRFQAttachment(data.id, file, onProgress));
+}
+
+/**
+ * Send whichever parts the server is missing, one at a time, then complete.
+ * Call again with the same file after a dropped connection.
+ * @param {number|string} attachmentId
+ * @param {File|Blob} file
+ * @param {(sent: number, total: number) => void} [onProgress]
+ * @returns {Promise<axios.Response>} the completed attachment
+ */
+export function resumeRFQAttachment(attachmentId, file, onProgress) {
+  const url = `/rfq-attachments/${attachmentId}/`;
+  return api.get(url).then(({ data }) => {
+    const total = data.missing_parts.length;
+    return data.missing_parts
+      .reduce(
+        (previous, number, index) =>
+          previous.then(() => {
+            const start = (number - 1) * data.part_size;
+            return api
+              .put(`${url}parts/${number}/`, file.slice(start, start + data.part_size), {
+                headers: { "Content-Type": "application/octet-stream" },
+              })
+              .then(() => onProgress && onProgress(index + 1, total));
+          }),
+        Promise.resolve(),
+      )
+      .then(() => api.post(`${url}complete/`));
+  });
+}
+
+/**
+ * Link for downloading a completed RFQ attachment (supports Range requests).
+ * @param {number|string} attachmentId
+ * @returns {string}
+ */
+export function rfqAttachmentDownloadPath(attachmentId) {
+  return `/rfq-attachments/${attachmentId}/download/`;
+}
+
+/**
+ * Lots with stock left that expire within `days` (expired ones included), soonest first.
+ * @param {number} [days]
+ * @param {{warehouse?: number, product?: number, page?: number}} [filters]
+ * @returns {Promise<axios.Response>} paginated lots
+ */
+export function fetchExpiringLots(days = 30, filters = {}) {
+  return api.get("/lots/expiring/", { params: { days, ...filters } });
+}
+
 export default api;
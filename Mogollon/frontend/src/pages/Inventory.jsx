@@ -1,7 +1,11 @@
 // src/pages/Inventory.jsx
 import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
-import api, { recordTransaction, fetchRecordTransactions } from "../api";
+import api, {
+  recordTransaction,
+  fetchRecordTransactions,
+  fetchInventoryDashboard,
+} from "../api";
 import { z } from "zod";
 import { useForm } from "react-hook-form";
 import { zodResolver } from "@hookform/resolvers/zod";
@@ -59,6 +63,11 @@ const intakeSchema = z.object({
   warehouseId: z.string().min(1),
   quantity: z.coerce.number().positive(),
   uom: z.string().min(1),
+  // purchase cost per uom; blank values the stock at its latest known cost
+  unitCost: z.preprocess(
+    (v) => (v === "" ? undefined : v),
+    z.coerce.number().nonnegative().optional()
+  ),
   reference: z.string().optional(),
   notes: z.string().optional(),
   date: z.string().min(1),
@@ -271,32 +280,41 @@ export default function InventoryPage() {
   const [records, setRecords] = useState([]);
   const [warehouses, setWarehouses] = useState([]);
   const [products, setProducts] = useState([]);
+  const [kpis, setKpis] = useState(null);
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
   const { toasts, toast, dismiss } = useToast();
 
-  // centralized data fetch, **normalize snake_case → camelCase + pull IDs from nested objects**
+  // centralized data fetch: /inventory/dashboard/ returns flat record rows
+  // plus the product & warehouse tables they use; join them by id here.
+  // The pickers list the whole catalog, products without stock included.
   const fetchAllData = async () => {
     try {
-      const [invRes, whRes, prRes] = await Promise.all([
-        api.get("/inventory/"),
-        api.get("/warehouses/"),
+      const [{ data }, catalog] = await Promise.all([
+        fetchInventoryDashboard(),
         api.get("/products/"),
       ]);
+      const productsById = new Map(data.products.map((p) => [p.id, p]));
+      const warehousesById = new Map(data.warehouses.map((w) => [w.id, w]));
 
-      const normalized = invRes.data.map((r) => ({
-        ...r,
-        // API returns nested `product` & `warehouse`, so grab their IDs:
-        productId: r.product.id,
-        warehouseId: r.warehouse.id,
-        // guard against strings in JSON:
-        quantityOnHand: Number(r.quantity_on_hand),
-        reorderPoint: Number(r.reorder_point),
-      }));
+      const normalized = data.records.map((row) => {
+        const r = Object.fromEntries(data.columns.map((c, i) => [c, row[i]]));
+        return {
+          ...r,
+          product: productsById.get(r.product_id),
+          warehouse: warehousesById.get(r.warehouse_id),
+          productId: r.product_id,
+          warehouseId: r.warehouse_id,
+          // guard against strings in JSON:
+          quantityOnHand: Number(r.quantity_on_hand),
+          reorderPoint: Number(r.reorder_point),
+        };
+      });
 
       setRecords(normalized);
-      setWarehouses(whRes.data);
-      setProducts(prRes.data);
+      setWarehouses(data.warehouses);
+      setProducts(catalog.data);
+      setKpis(data.kpis);
     } catch (err) {
       console.error(err);
     } finally {
@@ -353,13 +371,11 @@ export default function InventoryPage() {
         return 0;
       });
 
-    const totalUnits = records.reduce((s, r) => s + r.quantityOnHand, 0);
-    const lowCount = records.filter(
-      (r) => r.quantityOnHand <= r.reorderPoint
-    ).length;
-    const uniqueProducts = new Set(records.map((r) => r.productId)).size;
-    const warehouseCount = new Set(records.map((r) => r.warehouseId))
-      .size;
+    // KPIs come precomputed with the dashboard payload
+    const totalUnits = Number(kpis?.total_units ?? 0);
+    const lowCount = kpis?.low_stock ?? 0;
+    const uniqueProducts = kpis?.active_skus ?? 0;
+    const warehouseCount = kpis?.warehouse_count ?? 0;
 
     return (
       <div className="space-y-6">
@@ -593,6 +609,7 @@ export default function InventoryPage() {
   transaction_type: "intake",   // or "depletion"
   quantity: data.quantity,
   uom: data.uom,
+  unit_cost: data.unitCost ?? null,
   reason: data.reason,          // only for depletion
   reference: data.reference,
   notes: data.notes,
@@ -729,6 +746,24 @@ export default function InventoryPage() {
                 </p>
               )}
             </div>
+            {/* unit cost */}
+            <div>
+              <label className="block text-sm font-medium mb-1">
+                Unit Cost <span className="text-gray-400">(per unit of measure, optional)</span>
+              </label>
+              <input
+                type="number"
+                min="0"
+                step="0.0001"
+                {...form.register("unitCost")}
+                className="w-full border rounded px-3 py-2"
+              />
+              {form.formState.errors.unitCost && (
+                <p className="text-red-600 text-sm mt-1">
+                  {form.formState.errors.unitCost.message}
+                </p>
+              )}
+            </div>
             {/* notes */}
             <div>
               <label className="block text-sm font-medium mb-1">Notes</label>
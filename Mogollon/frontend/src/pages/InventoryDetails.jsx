@@ -1,18 +1,52 @@
 // src/pages/InventoryDetail.jsx
 import React, { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
-import api, { fetchRecordTransactions } from "../api";
+import api, { fetchRecordSeries, fetchRecordTransactions } from "../api";
 import { ArrowLeft } from "lucide-react";
 
+function StockChart({ series, uom }) {
+  const width = 800;
+  const height = 160;
+  if (series.length < 2) {
+    return <p className="text-sm text-gray-500">No stock movements yet.</p>;
+  }
+  const xs = series.map(([t]) => t);
+  const ys = series.map(([, v]) => v);
+  const [x0, x1] = [Math.min(...xs), Math.max(...xs)];
+  const [y0, y1] = [Math.min(0, ...ys), Math.max(...ys)];
+  const px = (t) => ((t - x0) / (x1 - x0 || 1)) * width;
+  const py = (v) => height - ((v - y0) / (y1 - y0 || 1)) * height;
+  // Stock holds its level until the next movement: draw steps, not slopes
+  const points = series
+    .map(([t, v], i) => (i ? `${px(t)},${py(series[i - 1][1])} ` : "") + `${px(t)},${py(v)}`)
+    .join(" ");
+
+  return (
+    <div>
+      <svg viewBox={`0 0 ${width} ${height}`} className="w-full h-40" preserveAspectRatio="none">
+        <polyline points={points} fill="none" stroke="currentColor" strokeWidth="1.5"
+                  vectorEffect="non-scaling-stroke" className="text-brown-600" />
+      </svg>
+      <div className="flex justify-between text-xs text-gray-400">
+        <span>{new Date(x0).toLocaleDateString()}</span>
+        <span>max {y1.toLocaleString()} {uom}</span>
+        <span>{new Date(x1).toLocaleDateString()}</span>
+      </div>
+    </div>
+  );
+}
+
 export default function InventoryDetail() {
   const { id } = useParams();
   const navigate = useNavigate();
   const [record, setRecord] = useState(null);
   const [transactions, setTransactions] = useState([]);
+  const [series, setSeries] = useState([]);
 
   useEffect(() => {
     api.get(`/inventory/${id}/`).then((res) => setRecord(res.data));
     fetchRecordTransactions(id).then((res) => setTransactions(res.data));
+    fetchRecordSeries(id, { points: 400 }).then((res) => setSeries(res.data.series));
   }, [id]);
 
   if (!record) {
@@ -68,6 +102,12 @@ export default function InventoryDetail() {
         </div>
       </div>
 
+      {/* Stock Level */}
+      <div className="bg-white border rounded-xl shadow p-6">
+        <h2 className="text-xl font-medium mb-4">Stock Level</h2>
+        <StockChart series={series} uom={record.uom} />
+      </div>
+
       {/* Transaction History */}
       <div className="bg-white border rounded-xl shadow p-6">
         <h2 className="text-xl font-medium mb-4">Transaction History</h2>
@@ -3,7 +3,7 @@ import React, { useState, useEffect } from "react";
 import { useForm } from "react-hook-form";
 import { z } from "zod";
 import { zodResolver } from "@hookform/resolvers/zod";
-import api from "../api";
+import api, { fetchRFQStats } from "../api";
 import {
   ArrowLeft,
   ArrowUpDown,
@@ -58,6 +58,7 @@ export default function RFQ() {
   const [loading, setLoading] = useState(true);
   const [searchText, setSearchText] = useState("");
   const [statusFilter, setStatusFilter] = useState("all");
+  const [stats, setStats] = useState(null);
 
   const fetchRFQs = async () => {
     setLoading(true);
@@ -73,6 +74,9 @@ export default function RFQ() {
 
   useEffect(() => {
     fetchRFQs();
+    fetchRFQStats()
+      .then((res) => setStats(res.data))
+      .catch((err) => console.error("Failed to load RFQ stats", err));
   }, []);
 
   // ---- modal + wizard state ----
@@ -197,6 +201,26 @@ export default function RFQ() {
           <p className="text-gray-500">View and filter all vendor quote requests</p>
         </div>
 
+        {/* Board counts */}
+        {stats && (
+          <div className="grid grid-cols-2 sm:grid-cols-5 gap-4">
+            {[
+              ["Open", stats.open],
+              ["Draft", stats.by_status.draft],
+              ["Sent", stats.by_status.sent],
+              ["Completed", stats.by_status.completed],
+              ["Overdue", stats.overdue],
+            ].map(([label, count]) => (
+              <div key={label} className="border rounded-xl p-3">
+                <p className="text-sm text-gray-500">{label}</p>
+                <p className={`text-2xl font-bold ${label === "Overdue" && count ? "text-red-600" : ""}`}>
+                  {count.toLocaleString()}
+                </p>
+              </div>
+            ))}
+          </div>
+        )}
+
         {/* Search & Filter */}
         <div className="flex flex-col sm:flex-row gap-4">
           <input